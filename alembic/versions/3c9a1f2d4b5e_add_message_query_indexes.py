@@ -0,0 +1,33 @@
+"""add message query indexes
+
+Revision ID: 3c9a1f2d4b5e
+Revises: 7b6b8136e7e2
+Create Date: 2025-04-12 10:21:43.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1f2d4b5e'
+down_revision: Union[str, None] = '7b6b8136e7e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Newest-first listings: /messages/, /channels/{id}/messages/ and protocol queries
+    op.create_index('ix_discord_messages_created_at', 'discord_messages', [sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_discord_messages_channel_id_created_at', 'discord_messages', ['channel_id', sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_discord_messages_protocol_name_created_at', 'discord_messages', ['protocol_name', sa.text('created_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_discord_messages_protocol_name_created_at', table_name='discord_messages')
+    op.drop_index('ix_discord_messages_channel_id_created_at', table_name='discord_messages')
+    op.drop_index('ix_discord_messages_created_at', table_name='discord_messages')
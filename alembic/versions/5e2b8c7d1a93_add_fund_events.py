@@ -0,0 +1,56 @@
+"""add fund events and indexer checkpoints
+
+Revision ID: 5e2b8c7d1a93
+Revises: 9d4e7a61c2f8
+Create Date: 2025-04-22 11:37:48.204615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8c7d1a93'
+down_revision: Union[str, None] = '9d4e7a61c2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fund_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contract_address', sa.String(length=42), nullable=False),
+    sa.Column('event', sa.String(), nullable=False),
+    sa.Column('account', sa.String(length=42), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=78, scale=0), nullable=True),
+    sa.Column('shares_after', sa.Numeric(precision=78, scale=0), nullable=True),
+    sa.Column('block_number', sa.BigInteger(), nullable=False),
+    sa.Column('block_hash', sa.String(length=66), nullable=False),
+    sa.Column('block_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('transaction_hash', sa.String(length=66), nullable=False),
+    sa.Column('log_index', sa.Integer(), nullable=False),
+    sa.Column('indexed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_hash', 'log_index', name='uq_fund_events_transaction_hash_log_index')
+    )
+    op.create_index('ix_fund_events_contract_address_account_block_number', 'fund_events', ['contract_address', 'account', 'block_number'], unique=False)
+    op.create_index('ix_fund_events_contract_address_block_number', 'fund_events', ['contract_address', 'block_number'], unique=False)
+    op.create_table('indexer_checkpoints',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_block', sa.BigInteger(), nullable=False),
+    sa.Column('last_block_hash', sa.String(length=66), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Fill it with: python -m app.blockchain.indexer sync
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('indexer_checkpoints')
+    op.drop_index('ix_fund_events_contract_address_block_number', table_name='fund_events')
+    op.drop_index('ix_fund_events_contract_address_account_block_number', table_name='fund_events')
+    op.drop_table('fund_events')
@@ -0,0 +1,105 @@
+"""add protocol sentiment rollups
+
+Revision ID: 9d4e7a61c2f8
+Revises: 3c9a1f2d4b5e
+Create Date: 2025-04-14 16:02:11.540317
+
+"""
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e7a61c2f8'
+down_revision: Union[str, None] = '3c9a1f2d4b5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of db.rollups as of this revision, so later changes there don't alter the migration
+GRANULARITIES = {
+    '1m': dict(second=0, microsecond=0),
+    '1h': dict(minute=0, second=0, microsecond=0),
+    '1d': dict(hour=0, minute=0, second=0, microsecond=0),
+}
+METRICS = (
+    ('sentiment_score', 'sentiment_sum', 'sentiment_count'),
+    ('confidence', 'confidence_sum', 'confidence_count'),
+    ('community_consensus', 'consensus_sum', 'consensus_count'),
+)
+CHUNK = 2000
+BATCH = 10000
+
+messages = sa.table(
+    'discord_messages',
+    sa.column('protocol_name', sa.String),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+    *(sa.column(field, sa.Float) for field, _, _ in METRICS),
+)
+rollups = sa.table(
+    'protocol_sentiment_rollups',
+    sa.column('protocol_name', sa.String),
+    sa.column('granularity', sa.String),
+    sa.column('bucket_start', sa.DateTime(timezone=True)),
+    sa.column('message_count', sa.Integer),
+    *(sa.column(column) for _, sum_column, count_column in METRICS for column in (sum_column, count_column)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('protocol_sentiment_rollups',
+    sa.Column('protocol_name', sa.String(), nullable=False),
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('sentiment_sum', sa.Float(), nullable=False),
+    sa.Column('sentiment_count', sa.Integer(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('confidence_count', sa.Integer(), nullable=False),
+    sa.Column('consensus_sum', sa.Float(), nullable=False),
+    sa.Column('consensus_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('protocol_name', 'granularity', 'bucket_start')
+    )
+    backfill_rollups(op.get_bind())
+
+
+def backfill_rollups(conn) -> None:
+    """Aggregate the stored messages into the new table, one entry per bucket in memory"""
+    buckets = {}
+    query = sa.select(messages).where(messages.c.protocol_name.isnot(None), messages.c.created_at.isnot(None))
+    for rows in conn.execute(query.execution_options(yield_per=BATCH)).mappings().partitions():
+        for row in rows:
+            created_at = row['created_at']
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            created_at = created_at.astimezone(timezone.utc)
+            for granularity, truncate in GRANULARITIES.items():
+                key = (row['protocol_name'], granularity, created_at.replace(**truncate))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {
+                        'message_count': 0,
+                        **{sum_column: 0.0 for _, sum_column, _ in METRICS},
+                        **{count_column: 0 for _, _, count_column in METRICS},
+                    }
+                bucket['message_count'] += 1
+                for field, sum_column, count_column in METRICS:
+                    if row[field] is not None:
+                        bucket[sum_column] += row[field]
+                        bucket[count_column] += 1
+
+    values = [
+        {'protocol_name': protocol_name, 'granularity': granularity, 'bucket_start': start, **bucket}
+        for (protocol_name, granularity, start), bucket in buckets.items()
+    ]
+    for i in range(0, len(values), CHUNK):
+        conn.execute(rollups.insert(), values[i:i + CHUNK])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('protocol_sentiment_rollups')
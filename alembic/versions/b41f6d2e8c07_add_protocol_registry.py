@@ -0,0 +1,238 @@
+"""add protocol registry and discord_messages.protocol_id
+
+Revision ID: b41f6d2e8c07
+Revises: 5e2b8c7d1a93
+Create Date: 2025-04-28 09:52:16.730482
+
+"""
+import difflib
+import logging
+import re
+from collections import defaultdict, namedtuple
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6d2e8c07'
+down_revision: Union[str, None] = '5e2b8c7d1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK = 500
+
+# Frozen copy of db.protocols as of this revision, so later changes there don't alter the migration
+SEED_PROTOCOLS = {
+    "Celo": ["celo network"],
+    "cUSD": ["celo dollar"],
+    "cEUR": ["celo euro"],
+    "cREAL": ["celo real"],
+    "Mento": ["mento protocol"],
+    "Ubeswap": ["ube"],
+    "Moola": ["moola market", "moo"],
+    "Mobius": ["mobius money"],
+    "Symmetric": [],
+    "Curve": ["curve finance", "crv"],
+    "Uniswap": ["uni"],
+    "SushiSwap": ["sushi"],
+    "Aave": [],
+    "Compound": ["comp"],
+    "Morpho": [],
+    "Valora": [],
+    "MiniPay": [],
+    "ImpactMarket": ["impact market", "pact"],
+    "GoodDollar": ["good dollar", "g$"],
+    "Allbridge": [],
+    "Wormhole": [],
+    "Squid": ["squid router"],
+    "Axelar": [],
+    "Glo Dollar": ["glo", "usdglo"],
+    "USDC": ["usd coin"],
+    "USDT": ["tether"],
+    "Beefy": ["beefy finance"],
+    "Toucan": ["toucan protocol"],
+    "Ethereum": ["eth"],
+    "Bitcoin": ["btc"],
+    "Optimism": ["op"],
+}
+NAME_SUFFIXES = {"protocol", "finance", "network", "dao", "labs"}
+NO_PROTOCOL = {"", "none", "null", "na", "nan", "unknown", "general", "various", "multiple"}
+FUZZY_CUTOFF = 0.85
+MIN_FUZZY_LENGTH = 5
+
+ProtocolRef = namedtuple('ProtocolRef', ['id', 'name'])
+
+protocols = sa.table('protocols', sa.column('id', sa.Integer), sa.column('name', sa.String))
+protocol_aliases = sa.table('protocol_aliases', sa.column('alias', sa.String), sa.column('protocol_id', sa.Integer))
+messages = sa.table(
+    'discord_messages',
+    sa.column('protocol_id', sa.Integer),
+    sa.column('protocol_name', sa.String),
+)
+rollup_counters = [
+    'message_count', 'sentiment_sum', 'sentiment_count',
+    'confidence_sum', 'confidence_count', 'consensus_sum', 'consensus_count',
+]
+rollups = sa.table(
+    'protocol_sentiment_rollups',
+    sa.column('protocol_name', sa.String),
+    sa.column('granularity', sa.String),
+    sa.column('bucket_start', sa.DateTime(timezone=True)),
+    *(sa.column(name) for name in rollup_counters),
+)
+
+
+def chunks(items: list):
+    for i in range(0, len(items), CHUNK):
+        yield items[i:i + CHUNK]
+
+
+def normalize_protocol_name(name):
+    if not name:
+        return ""
+    words = re.findall(r"[a-z0-9$]+", name.lower())
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    key = "".join(words)
+    return "" if key in NO_PROTOCOL else key
+
+
+def match(aliases: dict, key: str):
+    """(ref, exact) for an alias key: exact match, then difflib"""
+    if key in aliases:
+        return aliases[key], True
+    if len(key) >= MIN_FUZZY_LENGTH:
+        close = difflib.get_close_matches(key, aliases.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            return aliases[close[0]], False
+    return None, False
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('protocols',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('protocol_aliases',
+    sa.Column('alias', sa.String(), nullable=False),
+    sa.Column('protocol_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['protocol_id'], ['protocols.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('alias')
+    )
+    op.create_index(op.f('ix_protocol_aliases_protocol_id'), 'protocol_aliases', ['protocol_id'], unique=False)
+    with op.batch_alter_table('discord_messages') as batch_op:
+        batch_op.add_column(sa.Column('protocol_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_discord_messages_protocol_id', 'protocols', ['protocol_id'], ['id'])
+
+    backfill_protocols(op.get_bind())
+
+    op.drop_index('ix_discord_messages_protocol_name_created_at', table_name='discord_messages')
+    op.create_index('ix_discord_messages_protocol_id_created_at', 'discord_messages', ['protocol_id', sa.text('created_at DESC')], unique=False)
+
+
+def backfill_protocols(conn) -> None:
+    """
+    Register the seed protocols and every protocol_name already stored,
+    point messages at them and merge rollups of names that normalize to
+    the same alias. Fuzzy matches are logged as merge candidates only.
+    """
+    aliases = {}
+
+    def register(name: str, keys: list) -> ProtocolRef:
+        protocol_id = conn.execute(
+            protocols.insert().values(name=name).returning(protocols.c.id)
+        ).scalar_one()
+        ref = ProtocolRef(protocol_id, name)
+        alias(keys, ref)
+        return ref
+
+    def alias(keys: list, ref: ProtocolRef):
+        new = [key for key in dict.fromkeys(keys) if key not in aliases]
+        if new:
+            conn.execute(protocol_aliases.insert(), [{'alias': key, 'protocol_id': ref.id} for key in new])
+        for key in new:
+            aliases[key] = ref
+
+    for name, spellings in SEED_PROTOCOLS.items():
+        register(name, [normalize_protocol_name(a) for a in [name] + spellings])
+
+    # Most used spelling first, so it becomes the canonical name
+    counts = defaultdict(int)
+    for name, count in conn.execute(
+        sa.select(messages.c.protocol_name, sa.func.count()).group_by(messages.c.protocol_name)
+    ):
+        if name is not None:
+            counts[name] += count
+    for (name,) in conn.execute(sa.select(rollups.c.protocol_name).distinct()):
+        counts[name] += 0
+
+    resolved = {}
+    for name in sorted(counts, key=lambda n: (-counts[n], n)):
+        key = normalize_protocol_name(name)
+        if not key:
+            resolved[name] = None
+            continue
+        ref, exact = match(aliases, key)
+        if ref is not None and not exact:
+            # Only a candidate, as at runtime: the merge can't be undone by the downgrade
+            logger.warning(
+                f"Protocol name {name!r} looks like {ref.name!r}; registering it separately. If they are "
+                f"the same, run: python -m db.protocols merge {name.strip()!r} {ref.name!r}"
+            )
+            ref = None
+        if ref is None:
+            ref = register(name.strip(), [key])
+        resolved[name] = ref
+
+    by_protocol = defaultdict(list)
+    for name, ref in resolved.items():
+        by_protocol[ref].append(name)
+    for ref, names in by_protocol.items():
+        for batch in chunks(names):
+            conn.execute(
+                messages.update()
+                .where(messages.c.protocol_name.in_(batch))
+                .values(
+                    protocol_id=ref.id if ref else None,
+                    protocol_name=ref.name if ref else None,
+                )
+            )
+
+    if all(ref is not None and ref.name == name for name, ref in resolved.items()):
+        return
+    merged = {}
+    for row in conn.execute(sa.select(rollups)).mappings():
+        ref = resolved[row['protocol_name']]
+        if ref is None:
+            continue
+        key = (ref.name, row['granularity'], row['bucket_start'])
+        if key in merged:
+            for counter in rollup_counters:
+                merged[key][counter] += row[counter]
+        else:
+            merged[key] = {**row, 'protocol_name': ref.name}
+    conn.execute(rollups.delete())
+    for batch in chunks(list(merged.values())):
+        conn.execute(rollups.insert(), batch)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Messages keep their canonical protocol_name; the original spellings are not restored
+    op.drop_index('ix_discord_messages_protocol_id_created_at', table_name='discord_messages')
+    op.create_index('ix_discord_messages_protocol_name_created_at', 'discord_messages', ['protocol_name', sa.text('created_at DESC')], unique=False)
+    with op.batch_alter_table('discord_messages') as batch_op:
+        batch_op.drop_constraint('fk_discord_messages_protocol_id', type_='foreignkey')
+        batch_op.drop_column('protocol_id')
+    op.drop_index(op.f('ix_protocol_aliases_protocol_id'), table_name='protocol_aliases')
+    op.drop_table('protocol_aliases')
+    op.drop_table('protocols')
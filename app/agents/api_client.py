@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+import httpx
+
+try:
+    from rate_limit import backoff_delay
+except ImportError:
+    from app.agents.rate_limit import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+class ApiClient:
+    """
+    Async client for the CeloAIFund API.
+
+    Keeps a pool of persistent connections to API_URL so requests reuse
+    keep-alive connections instead of opening a new one per call. Requests
+    that fail with a connection error or a 5xx response are retried with
+    jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        http2: bool = False,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Root URL of the API
+            timeout: Per-request timeout in seconds
+            max_connections: Maximum number of open connections
+            max_keepalive_connections: Idle connections kept open for reuse
+            http2: Multiplex requests over HTTP/2 (needs the h2 package)
+            max_retries: Retries for connection errors and 5xx responses
+            backoff_base: Base delay in seconds for the retry backoff
+            backoff_max: Maximum delay in seconds between retries
+        """
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+                http2 = False
+
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying connection errors and 5xx responses.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the API root
+            **kwargs: Passed through to httpx
+
+        Returns:
+            The final response (which may still be an error response)
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"{method} {path} failed ({type(e).__name__}), retrying")
+            else:
+                if response.status_code < 500 or attempt == self.max_retries:
+                    return response
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying")
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+    async def post(self, path: str, payload: Any) -> httpx.Response:
+        return await self.request("POST", path, json=payload)
+
+    async def create_user(self, user: dict) -> dict:
+        response = await self.post("/users/", user)
+        response.raise_for_status()
+        return response.json()
+
+    async def create_channel(self, channel: dict) -> dict:
+        response = await self.post("/channels/", channel)
+        response.raise_for_status()
+        return response.json()
+
+    async def create_message(self, message: dict) -> httpx.Response:
+        return await self.post("/messages/", message)
+
+    async def create_messages_bulk(self, messages: List[dict]) -> httpx.Response:
+        return await self.post("/messages/bulk", {"messages": messages})
+
+    async def existing_messages(self, discord_ids: List[str]) -> List[str]:
+        """The subset of `discord_ids` the API has already stored"""
+        response = await self.post("/messages/existing", {"discord_ids": discord_ids})
+        response.raise_for_status()
+        return response.json()["existing"]
+
+    async def close(self):
+        """Close all pooled connections"""
+        await self.client.aclose()
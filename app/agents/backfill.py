@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Checkpoint:
+    """
+    Progress of a backfill, persisted as JSON after every stored page.
+
+    For each channel it records the id and timestamp of the newest message
+    handled so far, so an interrupted backfill resumes right after it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.channels = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.channels = json.load(f).get("channels", {})
+
+    def last_message_id(self, channel_id: int) -> Optional[int]:
+        state = self.channels.get(str(channel_id))
+        return int(state["last_message_id"]) if state else None
+
+    def advance(self, channel_id: int, message, counts: dict):
+        """Record a page as done and write the file"""
+        state = self.channels.setdefault(str(channel_id), {})
+        state["last_message_id"] = str(message.id)
+        state["last_created_at"] = message.created_at.isoformat()
+        for key, value in counts.items():
+            state[key] = state.get(key, 0) + value
+        self.save()
+
+    def save(self):
+        # Write then rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"channels": self.channels}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+async def pages(history: AsyncIterator, page_size: int) -> AsyncIterator[List]:
+    """Group a message stream into lists of up to `page_size` messages"""
+    page = []
+    async for message in history:
+        page.append(message)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+async def prefetch(source: AsyncIterator, depth: int = 2) -> AsyncIterator:
+    """
+    Iterate `source` in a background task, keeping up to `depth` items ready.
+
+    Lets the next history page download while the current one is analyzed.
+    """
+    queue = asyncio.Queue(maxsize=depth)
+    done = object()
+
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put(item)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        task.cancel()
+
+async def backfill_channel(
+    bot,
+    channel_id: int,
+    checkpoint: Checkpoint,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    page_size: int = 100,
+) -> dict:
+    """
+    Ingest the history of one channel through the analysis pipeline.
+
+    Streams messages oldest first, starting after the checkpoint (or at
+    `since`). Each page is deduplicated against the API in one request, the
+    new messages are analyzed together and stored with one bulk write, and
+    only then is the checkpoint advanced.
+
+    Args:
+        bot: SimpleDiscordBot whose client is logged in
+        channel_id: The ID of the channel
+        checkpoint: Progress file shared by all channels of the run
+        since: Oldest message time to ingest when there is no checkpoint
+        until: Stop at messages posted at or after this time
+        page_size: Messages per dedupe, analysis and write round
+
+    Returns:
+        Counters for this run
+    """
+    after = checkpoint.last_message_id(channel_id) or since
+    if after is not None:
+        logger.info(f"Backfilling channel {channel_id} after {after}")
+
+    totals = {"fetched": 0, "duplicates": 0, "stored": 0, "ignored": 0, "no_signal": 0}
+    history = bot.discord_client.iter_channel_history(channel_id, after=after, before=until)
+    async for page in prefetch(pages(history, page_size)):
+        existing = set(await bot.api.existing_messages([str(message.id) for message in page]))
+        new_messages = [message for message in page if str(message.id) not in existing]
+
+        counts = {"fetched": len(page), "duplicates": len(page) - len(new_messages)}
+        counts.update(await bot.process_batch(new_messages))
+        checkpoint.advance(channel_id, page[-1], counts)
+        for key, value in counts.items():
+            totals[key] += value
+        logger.info(
+            f"Channel {channel_id}: {totals['fetched']} fetched, {totals['stored']} stored, "
+            f"{totals['duplicates']} already stored, up to {page[-1].created_at.isoformat()}"
+        )
+    return totals
+
+def parse_time(value: str) -> datetime:
+    """ISO-8601 date or datetime, taken as UTC when it has no offset"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+async def run_backfill(
+    bot,
+    channel_ids: List[int],
+    checkpoint_path: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    page_size: int = 100,
+):
+    """Backfill several channels one after the other, then close the bot"""
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        await bot.discord_client.login()
+        for channel_id in channel_ids:
+            totals = await backfill_channel(bot, channel_id, checkpoint, since, until, page_size)
+            logger.info(f"Finished channel {channel_id}: {totals}")
+    finally:
+        await bot.close()
@@ -0,0 +1,108 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FlushFunction = Callable[[List[Any]], Union[List[Any], Awaitable[List[Any]]]]
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent callers and hands them to a flush
+    function in batches.
+
+    A batch is flushed as soon as it reaches `max_size` items or when the oldest
+    pending item has waited `max_wait` seconds, whichever comes first. Each
+    caller gets back the result at its own position in the list returned by the
+    flush function. Synchronous flush functions are run in a worker thread.
+    """
+
+    def __init__(self, flush_fn: FlushFunction, max_size: int = 16, max_wait: float = 0.5, name: str = "batcher"):
+        """
+        Initialize the batcher.
+
+        Args:
+            flush_fn: Function taking a list of items and returning one result per item
+            max_size: Maximum number of items per batch
+            max_wait: Maximum time in seconds an item waits for its batch to fill
+            name: Name used in log messages
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.name = name
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.stats = {
+            "items": 0,
+            "batches": 0,
+            "errors": 0,
+        }
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Add an item to the current batch and wait for its result.
+
+        Args:
+            item: The item to process
+
+        Returns:
+            The flush function's result for this item
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Send everything pending to the flush function in batches of max_size"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+            task = asyncio.create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the flush function for one batch and resolve the callers' futures"""
+        items = [item for item, _ in batch]
+        self.stats["batches"] += 1
+        self.stats["items"] += len(items)
+        try:
+            if inspect.iscoroutinefunction(self.flush_fn):
+                results = await self.flush_fn(items)
+            else:
+                results = await asyncio.to_thread(self.flush_fn, items)
+            if len(results) != len(items):
+                raise ValueError(f"{self.name}: flush returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"{self.name}: batch of {len(items)} failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Flush whatever is still pending and wait for in-flight batches"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
@@ -1,7 +1,8 @@
 import discord
 import asyncio
 import os
-from typing import List, Optional, Callable, Any
+from datetime import datetime
+from typing import List, Optional, Callable, Any, AsyncIterator, Union
 import logging
 
 logger = logging.getLogger(__name__)
@@ -92,17 +93,52 @@ class DiscordClient:
             limit: Maximum number of messages to retrieve
             
         Returns:
-            List of messages
+            List of messages, newest first
+        """
+        return [
+            message async for message in self.iter_channel_history(channel_id, limit=limit, oldest_first=False)
+        ]
+    
+    async def iter_channel_history(
+        self,
+        channel_id: int,
+        after: Optional[Union[datetime, int]] = None,
+        before: Optional[Union[datetime, int]] = None,
+        limit: Optional[int] = None,
+        oldest_first: bool = True,
+    ) -> AsyncIterator[discord.Message]:
+        """
+        Stream the message history of a channel.
+        
+        Messages are fetched page by page as the caller iterates, so whole
+        channel histories can be walked in constant memory. Works on a client
+        that is only logged in (see `login`), without a gateway connection.
+        
+        Args:
+            channel_id: The ID of the channel
+            after: Only messages after this time or message id
+            before: Only messages before this time or message id
+            limit: Maximum number of messages to retrieve (None for all)
+            oldest_first: Yield messages in chronological order
+            
+        Yields:
+            Messages of the channel
         """
         channel = self.client.get_channel(channel_id)
         if not channel:
-            raise ValueError(f"Channel with ID {channel_id} not found")
+            try:
+                channel = await self.client.fetch_channel(channel_id)
+            except discord.NotFound:
+                raise ValueError(f"Channel with ID {channel_id} not found")
         
-        messages = []
-        async for message in channel.history(limit=limit):
-            messages.append(message)
-        
-        return messages
+        after = discord.Object(id=after) if isinstance(after, int) else after
+        before = discord.Object(id=before) if isinstance(before, int) else before
+        async for message in channel.history(limit=limit, after=after, before=before, oldest_first=oldest_first):
+            yield message
+    
+    async def login(self):
+        """Authenticate for REST calls (e.g. reading history) without connecting to the gateway"""
+        await self.client.login(self.token)
     
     def run(self):
         """Run the Discord client (blocking)"""
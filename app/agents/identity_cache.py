@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+class BoundedMap:
+    """LRU map from Discord snowflake to internal database id"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, discord_id: str) -> Optional[int]:
+        internal_id = self._items.get(discord_id)
+        if internal_id is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(discord_id)
+        self.hits += 1
+        return internal_id
+
+    def put(self, discord_id: str, internal_id: int):
+        self._items[discord_id] = internal_id
+        self._items.move_to_end(discord_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, discord_id: str):
+        self._items.pop(discord_id, None)
+
+    def load(self, rows: Iterable[dict]):
+        """Fill the map from API response objects with discord_id and id fields"""
+        for row in rows:
+            self.put(row["discord_id"], row["id"])
+
+    def __len__(self):
+        return len(self._items)
+
+class IdentityCache:
+    """
+    Internal ids of the Discord users and channels the bot has already saved.
+
+    Lets the bot skip the /users/ and /channels/ round-trips for authors and
+    channels it has seen before. Entries are dropped when the API reports
+    the id no longer exists.
+    """
+
+    def __init__(self, max_size: int = 50000):
+        self.users = BoundedMap(max_size)
+        self.channels = BoundedMap(max_size)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.users),
+            "channels": len(self.channels),
+            "hits": self.users.hits + self.channels.hits,
+            "misses": self.users.misses + self.channels.misses,
+        }
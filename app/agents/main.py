@@ -1,18 +1,42 @@
+import argparse
 import asyncio
 import logging
 import os
-import requests
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Set
 from dotenv import load_dotenv
 load_dotenv()
 
 try:
     from discord_bot import DiscordClient
-    from sentiment_analyzer import SentimentAnalyzer, TextInformation
+    from sentiment_analyzer import AsyncSentimentAnalyzer, TextInformation
+    from batcher import MicroBatcher
+    from sentiment_cache import SentimentCache
+    from api_client import ApiClient
+    from identity_cache import IdentityCache
+    from prefilter import MessagePrefilter, NO_SIGNAL
+    from backfill import parse_time, run_backfill
+    from outbox import Outbox
+    from metrics import (
+        BOT_MESSAGES, BOT_MESSAGE_LAG_SECONDS, BOT_OUTBOX_PENDING, BOT_PREFILTER_DECISIONS, BOT_QUEUE_DEPTH, BOT_STAGE_SECONDS,
+        start_metrics_server, time_stage,
+    )
 except ImportError:
     from app.agents.discord_bot import DiscordClient
-    from app.agents.sentiment_analyzer import SentimentAnalyzer, TextInformation
+    from app.agents.sentiment_analyzer import AsyncSentimentAnalyzer, TextInformation
+    from app.agents.batcher import MicroBatcher
+    from app.agents.sentiment_cache import SentimentCache
+    from app.agents.api_client import ApiClient
+    from app.agents.identity_cache import IdentityCache
+    from app.agents.prefilter import MessagePrefilter, NO_SIGNAL
+    from app.agents.backfill import parse_time, run_backfill
+    from app.agents.outbox import Outbox
+    from app.agents.metrics import (
+        BOT_MESSAGES, BOT_MESSAGE_LAG_SECONDS, BOT_OUTBOX_PENDING, BOT_PREFILTER_DECISIONS, BOT_QUEUE_DEPTH, BOT_STAGE_SECONDS,
+        start_metrics_server, time_stage,
+    )
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,24 +49,267 @@ class SimpleDiscordBot:
     A Discord bot that reads messages, analyzes sentiment, and saves to the database.
     """
     
-    def __init__(self, discord_token: str):
+    def __init__(self, discord_token: str, use_outbox: bool = True):
         """Initialize the bot"""
         self.discord_client = DiscordClient(discord_token)
         self.api_url = os.getenv("API_URL", "http://app:8000")
         
+        # Shared connection pool for all API calls
+        self.api = ApiClient(
+            self.api_url,
+            timeout=float(os.getenv("API_TIMEOUT", "10")),
+            max_connections=int(os.getenv("API_MAX_CONNECTIONS", "20")),
+            http2=os.getenv("API_HTTP2", "false").lower() == "true",
+            max_retries=int(os.getenv("API_MAX_RETRIES", "3")),
+        )
+        
+        # Cache analysis results so repeated messages skip the LLM call
+        self.sentiment_cache = None
+        if os.getenv("SENTIMENT_CACHE_ENABLED", "true").lower() == "true":
+            self.sentiment_cache = SentimentCache(
+                max_entries=int(os.getenv("SENTIMENT_CACHE_SIZE", "10000")),
+                ttl=float(os.getenv("SENTIMENT_CACHE_TTL", "86400")),
+                path=os.getenv("SENTIMENT_CACHE_PATH") or None,
+            )
+        
         # Initialize sentiment analyzer
-        self.sentiment_analyzer = SentimentAnalyzer(
+        self.sentiment_analyzer = AsyncSentimentAnalyzer(
             api_key=os.getenv("OPENAI_API_KEY"),
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06"),
+            cache=self.sentiment_cache,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+            requests_per_minute=float(os.getenv("OPENAI_RPM", "500")),
+            tokens_per_minute=float(os.getenv("OPENAI_TPM", "200000")),
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "5")),
         )
         
+        # Messages without any investment signal are stored without an LLM call
+        self.prefilter = None
+        if os.getenv("PREFILTER_ENABLED", "true").lower() == "true":
+            extra_keywords = os.getenv("PREFILTER_EXTRA_KEYWORDS", "")
+            self.prefilter = MessagePrefilter(
+                min_score=float(os.getenv("PREFILTER_MIN_SCORE", "1.0")),
+                extra_keywords=[k.strip() for k in extra_keywords.split(",") if k.strip()],
+            )
+        
+        # Optionally pack several messages into one LLM request. Batches only
+        # fill up when enough workers are analyzing at the same time, so
+        # BOT_WORKERS should be at least SENTIMENT_BATCH_SIZE.
+        batch_size = int(os.getenv("SENTIMENT_BATCH_SIZE", "1"))
+        self.sentiment_batcher = None
+        if batch_size > 1:
+            self.sentiment_batcher = MicroBatcher(
+                self.sentiment_analyzer.analyze_batch,
+                max_size=batch_size,
+                max_wait=float(os.getenv("SENTIMENT_BATCH_WAIT", "0.5")),
+                name="sentiment",
+            )
+        
+        # Writes to the API are batched into /messages/bulk unless disabled
+        self.write_batcher = None
+        if os.getenv("API_BULK_WRITES", "true").lower() == "true":
+            self.write_batcher = MicroBatcher(
+                self._post_bulk,
+                max_size=int(os.getenv("API_WRITE_BATCH_SIZE", "50")),
+                max_wait=float(os.getenv("API_WRITE_BATCH_WAIT", "0.2")),
+                name="api-writer",
+            )
+        
+        # Internal ids of known users and channels for the per-item write path
+        # (API_BULK_WRITES=false); /messages/bulk upserts them server-side
+        self.identities = IdentityCache(int(os.getenv("IDENTITY_CACHE_SIZE", "50000")))
+        
+        # Work queue settings: messages are enqueued by on_message and
+        # processed by a pool of workers so the gateway loop never blocks
+        # Workers mostly wait on I/O and LLM concurrency is capped separately by
+        # OPENAI_MAX_CONCURRENCY, so there can be many more workers than LLM
+        # slots; they are also what fills the write and sentiment batches.
+        self.worker_count = int(os.getenv("BOT_WORKERS", "32"))
+        self.queue_size = int(os.getenv("BOT_QUEUE_SIZE", "1000"))
+        self.enqueue_timeout = float(os.getenv("BOT_ENQUEUE_TIMEOUT", "5"))
+        self.drain_timeout = float(os.getenv("BOT_DRAIN_TIMEOUT", "30"))
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "deferred": 0,
+            "replayed": 0,
+        }
+        
+        # Durable journal of received messages: failed, overflowing and
+        # unfinished messages are retried from it instead of being lost.
+        # Off unless BOT_OUTBOX_PATH is set; backfills (use_outbox=False)
+        # never open the journal a running listener is leasing from.
+        self.outbox = None
+        outbox_path = os.getenv("BOT_OUTBOX_PATH", "")
+        if use_outbox and outbox_path:
+            self.outbox = Outbox(
+                os.path.abspath(outbox_path),
+                lease=float(os.getenv("BOT_OUTBOX_LEASE", "300")),
+                max_attempts=int(os.getenv("BOT_OUTBOX_MAX_ATTEMPTS", "20")),
+            )
+        self.outbox_batch = int(os.getenv("BOT_OUTBOX_BATCH", "200"))
+        self.outbox_interval = float(os.getenv("BOT_OUTBOX_INTERVAL", "1.0"))
+        self.outbox_flusher: Optional[asyncio.Task] = None
+        # pending/dead as of the flusher's last pass
+        self.outbox_counts = {"pending": 0, "dead": 0}
+        # Outbox ids queued or being processed, which claim_due must not hand out again
+        self.in_flight: Set[str] = set()
+        
         # Register message handler
-        self.discord_client.add_message_handler(self.handle_message)
+        self.discord_client.add_message_handler(self.enqueue_message)
         
         logger.info("Bot initialized with sentiment analysis capabilities")
     
-    async def handle_message(self, message):
-        """Handle incoming Discord messages by analyzing sentiment and saving to the database"""
+    async def start_workers(self):
+        """Create the work queue and spawn the worker pool on the running loop"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        BOT_QUEUE_DEPTH.set_function(self.queue.qsize)
+        self.workers = [
+            asyncio.create_task(self._worker(i), name=f"message-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        if self.outbox is not None:
+            # Whatever was pending when the bot last stopped is replayed first
+            replay = await asyncio.to_thread(self.outbox.release_all)
+            if replay:
+                logger.info(f"Replaying {replay} messages from the outbox")
+            self.outbox_flusher = asyncio.create_task(self._flush_outbox(), name="outbox-flusher")
+        logger.info(f"Started {self.worker_count} message workers (queue size {self.queue_size})")
+    
+    async def enqueue_message(self, message):
+        """
+        Put an incoming message on the work queue.
+        
+        With the outbox enabled the message is journaled first; if the queue
+        is full it stays there for the outbox flusher instead of blocking the
+        gateway. Without it, waits up to BOT_ENQUEUE_TIMEOUT seconds for a free
+        slot so a full queue slows intake down instead of growing without
+        bound; messages that still don't fit are dropped and counted.
+        """
+        if self.queue is None:
+            await self.start_workers()
+        if self.outbox is not None:
+            if not await asyncio.to_thread(self.outbox.append, message):
+                logger.info(f"Message {message.id} is already in the outbox")
+                return
+            try:
+                self.queue.put_nowait((time.perf_counter(), message))
+                self.in_flight.add(str(message.id))
+                self.stats["enqueued"] += 1
+                BOT_MESSAGES.labels("enqueued").inc()
+            except asyncio.QueueFull:
+                await asyncio.to_thread(self.outbox.release, str(message.id))
+                self.stats["deferred"] += 1
+                BOT_MESSAGES.labels("deferred").inc()
+            return
+        try:
+            await asyncio.wait_for(self.queue.put((time.perf_counter(), message)), timeout=self.enqueue_timeout)
+            self.stats["enqueued"] += 1
+            BOT_MESSAGES.labels("enqueued").inc()
+        except asyncio.TimeoutError:
+            self.stats["dropped"] += 1
+            BOT_MESSAGES.labels("dropped").inc()
+            logger.warning(f"Work queue full ({self.queue.qsize()}), dropping message {message.id}")
+    
+    async def _worker(self, worker_id: int):
+        """Drain the work queue until cancelled"""
+        while True:
+            enqueued_at, message = await self.queue.get()
+            BOT_STAGE_SECONDS.labels("queue").observe(time.perf_counter() - enqueued_at)
+            try:
+                error = "processing failed"
+                try:
+                    stored = await self.handle_message(message)
+                except Exception as e:
+                    stored = False
+                    error = str(e)
+                    logger.error(f"Worker {worker_id} failed on message {message.id}: {str(e)}")
+                if self.outbox is not None:
+                    if stored is False:
+                        await asyncio.to_thread(self.outbox.fail, str(message.id), error)
+                    else:
+                        await asyncio.to_thread(self.outbox.ack, str(message.id))
+            finally:
+                self.in_flight.discard(str(message.id))
+                self.queue.task_done()
+            self.stats["failed" if stored is False else "processed"] += 1
+            BOT_MESSAGES.labels({True: "stored", False: "failed", None: "skipped"}[stored]).inc()
+    
+    async def _flush_outbox(self):
+        """Feed due outbox messages (retries, overflow, replay) back into the work queue"""
+        while True:
+            if self.queue.maxsize <= 0:
+                limit = self.outbox_batch
+            else:
+                # Leave half of the free slots to live messages, but always use a free one
+                free = self.queue.maxsize - self.queue.qsize()
+                limit = min(self.outbox_batch, max(free // 2, min(free, 1)))
+            claimed = await asyncio.to_thread(self.outbox.claim_due, limit, frozenset(self.in_flight))
+            for i, message in enumerate(claimed):
+                try:
+                    self.queue.put_nowait((time.perf_counter(), message))
+                except asyncio.QueueFull:
+                    # Live messages took the slots meanwhile; retry the rest on the next pass
+                    for rest in claimed[i:]:
+                        await asyncio.to_thread(self.outbox.release, str(rest.id))
+                    claimed = claimed[:i]
+                    break
+                self.in_flight.add(str(message.id))
+            self.stats["replayed"] += len(claimed)
+            # Read here, off the event loop, for queue_stats
+            self.outbox_counts = await asyncio.to_thread(
+                lambda: {"pending": self.outbox.pending(), "dead": self.outbox.dead()}
+            )
+            BOT_OUTBOX_PENDING.set(self.outbox_counts["pending"])
+            # Keep going while a backlog is due, otherwise poll
+            await asyncio.sleep(0 if claimed and len(claimed) == limit else self.outbox_interval)
+    
+    def queue_stats(self) -> dict:
+        """Current queue depth and message counters"""
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "workers": len(self.workers),
+            **self.stats,
+            "sentiment_cache": self.sentiment_cache.stats if self.sentiment_cache else None,
+            "openai": self.sentiment_analyzer.stats,
+            "identities": self.identities.stats(),
+            "prefilter": self.prefilter.stats if self.prefilter else None,
+            "outbox": {**self.outbox.stats, **self.outbox_counts} if self.outbox else None,
+        }
+    
+    async def analyze(self, content: str) -> TextInformation:
+        """
+        Analyze a message, through the micro-batcher when batching is enabled.
+        
+        Messages the prefilter finds no signal in get the empty NO_SIGNAL result.
+        """
+        if self.prefilter is not None:
+            verdict = self.prefilter.check(content)
+            if not verdict.has_signal:
+                BOT_PREFILTER_DECISIONS.labels("no_signal").inc()
+                logger.info(f"No investment signal (score {verdict.score}), skipping analysis")
+                return NO_SIGNAL
+            BOT_PREFILTER_DECISIONS.labels("analyzed").inc()
+        if self.sentiment_batcher is not None:
+            return await self.sentiment_batcher.submit(content)
+        return await self.sentiment_analyzer.analyze_message(content, TextInformation)
+    
+    async def handle_message(self, message) -> Optional[bool]:
+        """
+        Handle incoming Discord messages by analyzing sentiment and saving to the database.
+        
+        Returns True once the message is stored, False if processing failed and
+        None if the message was skipped.
+        """
         # Format the message with timestamp, author, and content
         timestamp = message.created_at.strftime("%Y-%m-%d %H:%M:%S")
         author = message.author.name
@@ -54,71 +321,201 @@ class SimpleDiscordBot:
         logger.info(f"Message from {author} in {channel}: {content}")
         
         # Skip very short messages or bot messages
-        if len(content) < 10 or message.author.bot:
+        if not should_process(message):
             logger.info(f"Skipping message: too short or from bot")
-            return
+            return None
         
         try:
             # Analyze sentiment
             logger.info(f"Analyzing sentiment for message: {message.id}")
-            sentiment_data = self.sentiment_analyzer.analyze_message(content, TextInformation)
+            with time_stage("analyze"):
+                sentiment_data = await self.analyze(content)
             logger.info(f"Sentiment analysis complete: {sentiment_data}")
             
-            # Save the user if not exists
-            user_data = {
-                "discord_id": str(message.author.id),
-                "username": message.author.name
-            }
-            user_response = requests.post(f"{self.api_url}/users/", json=user_data)
-            user = user_response.json()
-            
-            # Save the channel if not exists
-            channel_data = {
-                "discord_id": str(message.channel.id),
-                "name": message.channel.name
-            }
-            channel_response = requests.post(f"{self.api_url}/channels/", json=channel_data)
-            channel = channel_response.json()
-            
-            # Prepare technical indicators as JSON string
-            technical_indicators = json.dumps(sentiment_data.technical_indicators) if sentiment_data.technical_indicators else None
-            
-            # Save the message with sentiment analysis
-            message_data = {
-                "discord_id": str(message.id),
-                "user_id": user["id"],
-                "channel_id": channel["id"],
-                "content": message.content,
-                "created_at": message.created_at.isoformat(),
-                
-                # Sentiment analysis data
-                "sentiment_score": sentiment_data.sentiment_score,
-                "protocol_name": sentiment_data.protocol_name,
-                "confidence": sentiment_data.confidence,
-                "technical_indicators": technical_indicators,
-                "risk_assessment": sentiment_data.risk_assessment,
-                "community_consensus": sentiment_data.community_consensus
-            }
-            
-            response = requests.post(f"{self.api_url}/messages/", json=message_data)
-            
-            if response.status_code == 200:
+            with time_stage("store"):
+                stored = await self.store(message_payload(message, sentiment_data))
+            if stored:
                 logger.info(f"Message saved to database with sentiment analysis: {message.id}")
-            else:
-                logger.error(f"Failed to save message: {response.status_code} - {response.text}")
+                BOT_MESSAGE_LAG_SECONDS.observe(message_lag(message))
+                return True
+            return False
                 
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
+            return False
+    
+    async def process_batch(self, messages: list) -> dict:
+        """
+        Analyze and store a batch of messages with a single bulk write.
+        
+        Used for backfills: all messages are analyzed concurrently (and packed
+        into shared LLM requests when the sentiment batcher is enabled), then
+        saved with one /messages/bulk request. Errors propagate so the caller
+        can stop without recording the batch as done.
+        
+        Returns:
+            Counts of stored messages, messages ignored as too short or from
+            bots, and stored messages the prefilter found no signal in
+        """
+        analyzable = [message for message in messages if should_process(message)]
+        counts = {"stored": len(analyzable), "ignored": len(messages) - len(analyzable), "no_signal": 0}
+        if not analyzable:
+            return counts
+        results = await asyncio.gather(*(self.analyze(message.content) for message in analyzable))
+        await self._post_bulk([
+            message_payload(message, sentiment_data)
+            for message, sentiment_data in zip(analyzable, results)
+        ])
+        counts["no_signal"] = sum(1 for result in results if result is NO_SIGNAL)
+        return counts
+    
+    async def store(self, payload: dict) -> bool:
+        """Save an analyzed message through the bulk writer or the per-item endpoints"""
+        if self.write_batcher is not None:
+            return await self.write_batcher.submit(payload)
+        return await self._post_message(payload)
+    
+    async def _post_message(self, payload: dict) -> bool:
+        """Save one message with the /messages/ endpoint, creating its user and channel if needed"""
+        message_data = {k: v for k, v in payload.items() if k not in ("author", "channel")}
+        
+        for attempt in range(2):
+            message_data["user_id"] = await self._user_id(payload["author"])
+            message_data["channel_id"] = await self._channel_id(payload["channel"])
+            response = await self.api.create_message(message_data)
+            
+            if response.status_code == 404 and attempt == 0:
+                # Cached ids are stale (e.g. the database was reset), look them up again
+                logger.warning("API does not know the cached user or channel, refreshing identities")
+                self.identities.users.invalidate(payload["author"]["discord_id"])
+                self.identities.channels.invalidate(payload["channel"]["discord_id"])
+                continue
+            break
+        
+        if response.status_code != 200:
+            logger.error(f"Failed to save message: {response.status_code} - {response.text}")
+            return False
+        return True
+    
+    async def _user_id(self, author: dict) -> int:
+        """Internal id of a message author, saving the user if not known yet"""
+        user_id = self.identities.users.get(author["discord_id"])
+        if user_id is None:
+            user_id = (await self.api.create_user(author))["id"]
+            self.identities.users.put(author["discord_id"], user_id)
+        return user_id
+    
+    async def _channel_id(self, channel: dict) -> int:
+        """Internal id of a channel, saving the channel if not known yet"""
+        channel_id = self.identities.channels.get(channel["discord_id"])
+        if channel_id is None:
+            channel_id = (await self.api.create_channel(channel))["id"]
+            self.identities.channels.put(channel["discord_id"], channel_id)
+        return channel_id
+    
+    async def warm_identities(self):
+        """Preload the identity cache with the users and channels the API already has"""
+        try:
+            for path, cache in (("/users/", self.identities.users), ("/channels/", self.identities.channels)):
+                response = await self.api.request("GET", path)
+                response.raise_for_status()
+                cache.load(response.json())
+            logger.info(f"Identity cache warmed: {self.identities.stats()}")
+        except Exception as e:
+            logger.warning(f"Could not warm identity cache: {str(e)}")
+    
+    async def _post_bulk(self, payloads: List[dict]) -> List[bool]:
+        """Save a batch of messages with a single /messages/bulk request"""
+        response = await self.api.create_messages_bulk(payloads)
+        if response.status_code != 200:
+            raise RuntimeError(f"Bulk save failed: {response.status_code} - {response.text}")
+        result = response.json()
+        logger.info(f"Bulk saved {result['inserted']} messages ({result['duplicates']} duplicates)")
+        # Duplicates were stored earlier, so every message in the batch counts as saved
+        return [True] * len(payloads)
     
     async def start(self):
         """Start the bot"""
         logger.info("Starting Discord bot")
+        metrics_port = os.getenv("BOT_METRICS_PORT")
+        if metrics_port:
+            start_metrics_server(int(metrics_port))
+        if self.write_batcher is None:
+            await self.warm_identities()
+        await self.start_workers()
         await self.discord_client.start()
     
     async def close(self):
-        """Close the bot"""
+        """Close the bot, letting queued messages finish first"""
         logger.info("Closing Discord bot")
+        # Stop receiving new messages before draining the queue
         await self.discord_client.close()
+        if self.outbox_flusher is not None:
+            self.outbox_flusher.cancel()
+            await asyncio.gather(self.outbox_flusher, return_exceptions=True)
+            self.outbox_flusher = None
+        
+        if self.queue is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain timed out with {self.queue.qsize()} messages still queued")
+        
+        if self.sentiment_batcher is not None:
+            await self.sentiment_batcher.close()
+        if self.write_batcher is not None:
+            await self.write_batcher.close()
+        await self.sentiment_analyzer.close()
+        await self.api.close()
+        if self.sentiment_cache is not None:
+            self.sentiment_cache.close()
+        
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info(f"Message pipeline stopped: {self.queue_stats()}")
+        if self.outbox is not None:
+            # Messages still queued stay journaled and are replayed on the next start
+            self.outbox.close()
+
+def should_process(message) -> bool:
+    """False for very short messages and messages from bots, which are not stored"""
+    return len(message.content) >= 10 and not message.author.bot
+
+def message_lag(message) -> float:
+    """Seconds between a message being posted and now"""
+    created_at = message.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds()
+
+def message_payload(message, sentiment_data: TextInformation) -> dict:
+    """Bulk-ingest item for an analyzed message, with its author and channel embedded"""
+    # Prepare technical indicators as JSON string
+    technical_indicators = json.dumps(sentiment_data.technical_indicators) if sentiment_data.technical_indicators else None
+    
+    return {
+        "discord_id": str(message.id),
+        "author": {
+            "discord_id": str(message.author.id),
+            "username": message.author.name
+        },
+        "channel": {
+            "discord_id": str(message.channel.id),
+            "name": message.channel.name
+        },
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        
+        # Sentiment analysis data
+        "sentiment_score": sentiment_data.sentiment_score,
+        "protocol_name": sentiment_data.protocol_name,
+        "confidence": sentiment_data.confidence,
+        "technical_indicators": technical_indicators,
+        "risk_assessment": sentiment_data.risk_assessment,
+        "community_consensus": sentiment_data.community_consensus
+    }
 
 async def main():
     """Main entry point for the bot"""
@@ -133,7 +530,40 @@ async def main():
     finally:
         await bot.close()
 
+async def backfill(args):
+    """Entry point for `backfill`: ingest channel history instead of listening"""
+    bot = SimpleDiscordBot(os.getenv("DISCORD_TOKEN"), use_outbox=False)
+    if bot.sentiment_batcher is None and args.analyze_batch_size > 1:
+        # A page is analyzed all at once, so batches fill up immediately
+        bot.sentiment_batcher = MicroBatcher(
+            bot.sentiment_analyzer.analyze_batch,
+            max_size=args.analyze_batch_size,
+            max_wait=0.05,
+            name="sentiment",
+        )
+    await run_backfill(bot, args.channel, args.checkpoint, args.since, args.until, args.page_size)
 
+def cli():
+    parser = argparse.ArgumentParser(description="Discord sentiment bot")
+    subcommands = parser.add_subparsers(dest="command")
+    subcommands.add_parser("run", help="Listen for new messages (default)")
+    backfill_parser = subcommands.add_parser("backfill", help="Ingest the history of existing channels")
+    backfill_parser.add_argument("--channel", type=int, action="append", required=True,
+                                 help="Channel id, repeat for several channels")
+    backfill_parser.add_argument("--since", type=parse_time, help="Oldest message time (ISO-8601)")
+    backfill_parser.add_argument("--until", type=parse_time, help="Stop at this message time (ISO-8601)")
+    backfill_parser.add_argument("--checkpoint", default="backfill_checkpoint.json",
+                                 help="Progress file, reused to resume an interrupted backfill")
+    backfill_parser.add_argument("--page-size", type=int, default=100, choices=range(1, 1001), metavar="1-1000",
+                                 help="Messages per dedupe, analysis and bulk write round")
+    backfill_parser.add_argument("--analyze-batch-size", type=int, default=10,
+                                 help="Messages per LLM request when SENTIMENT_BATCH_SIZE is not set")
+    args = parser.parse_args()
+    
+    if args.command == "backfill":
+        asyncio.run(backfill(args))
+    else:
+        asyncio.run(main())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    cli()
@@ -0,0 +1,76 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger = logging.getLogger(__name__)
+
+# LLM calls, one observation per HTTP attempt (retries included)
+LLM_REQUEST_SECONDS = Histogram(
+    "sentiment_llm_request_duration_seconds",
+    "Latency of sentiment analysis requests to the LLM API",
+    ["model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_TOKENS = Counter(
+    "sentiment_llm_tokens",
+    "Tokens used by sentiment analysis requests",
+    ["model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "sentiment_llm_errors",
+    "Failed sentiment analysis requests by error type",
+    ["model", "error"],
+)
+LLM_MESSAGES_PER_REQUEST = Histogram(
+    "sentiment_llm_messages_per_request",
+    "Messages analyzed by one LLM request",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+# Bot message pipeline
+BOT_QUEUE_DEPTH = Gauge("bot_queue_depth", "Messages waiting in the bot work queue")
+BOT_MESSAGES = Counter(
+    "bot_messages",
+    "Messages seen by the bot by outcome (enqueued, deferred, dropped, skipped, stored, failed)",
+    ["outcome"],
+)
+BOT_STAGE_SECONDS = Histogram(
+    "bot_stage_duration_seconds",
+    "Time a message spends in each pipeline stage (queue, analyze, store)",
+    ["stage"],
+    buckets=(0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+BOT_OUTBOX_PENDING = Gauge("bot_outbox_pending", "Received messages in the outbox not yet stored or skipped")
+BOT_PREFILTER_DECISIONS = Counter(
+    "bot_prefilter_decisions",
+    "Prefilter decisions (analyzed: sent to the LLM, no_signal: stored without analysis)",
+    ["decision"],
+)
+BOT_MESSAGE_LAG_SECONDS = Histogram(
+    "bot_message_lag_seconds",
+    "Time from a message being posted on Discord to it being stored by the API",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600),
+)
+
+def record_llm_usage(model: str, usage):
+    """Count the prompt and completion tokens of a completion's usage block"""
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens)
+    LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens)
+
+@contextmanager
+def time_stage(stage: str):
+    """Observe the duration of the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        BOT_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+def start_metrics_server(port: int):
+    """Serve /metrics for scraping from a background thread"""
+    start_http_server(port)
+    logger.info(f"Serving Prometheus metrics on port {port}")
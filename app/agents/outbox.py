@@ -0,0 +1,198 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Collection, List
+
+try:
+    from rate_limit import backoff_delay
+except ImportError:
+    from app.agents.rate_limit import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+def snapshot(message) -> dict:
+    """JSON-serializable copy of the discord.Message fields the pipeline reads"""
+    return {
+        "id": message.id,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "author": {"id": message.author.id, "name": message.author.name, "bot": message.author.bot},
+        "channel": {"id": message.channel.id, "name": message.channel.name},
+    }
+
+def restore(data: dict) -> SimpleNamespace:
+    """Message-like object rebuilt from a snapshot, accepted everywhere a discord.Message is"""
+    return SimpleNamespace(
+        id=data["id"],
+        content=data["content"],
+        created_at=datetime.fromisoformat(data["created_at"]),
+        author=SimpleNamespace(**data["author"]),
+        channel=SimpleNamespace(**data["channel"]),
+    )
+
+class Outbox:
+    """
+    Durable journal of received messages, kept in a SQLite file in WAL mode.
+
+    Every message is appended before it enters the in-memory work queue and
+    deleted (acked) once it has been stored by the API or deliberately
+    skipped. A failed message stays in the journal with an exponentially
+    growing retry time; a message that didn't fit in the queue is due
+    immediately. `claim_due` hands those back to the bot, leasing them so
+    they are not handed out twice while in flight. After a crash or restart
+    `release_all` makes every pending message due again, so nothing that
+    was received is lost to an API or LLM outage, a full queue or a restart.
+
+    Every method commits synchronously; async callers should run them in a
+    worker thread (asyncio.to_thread). Calls are serialized by a lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease: float = 300.0,
+        max_attempts: int = 20,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+    ):
+        """
+        Open (or create) the outbox.
+
+        Args:
+            path: SQLite file holding the journal
+            lease: Seconds before a handed-out message is due again unless the caller reports it in flight
+            max_attempts: Failed attempts after which a message is parked as dead
+            backoff_base: Base delay in seconds for the retry backoff
+            backoff_max: Maximum delay in seconds between retries
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {
+            "appended": 0,
+            "acked": 0,
+            "retried": 0,
+            "dead": 0,
+        }
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL survives process crashes; only an OS crash can lose the last commits
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "discord_id TEXT PRIMARY KEY, snapshot TEXT NOT NULL, received_at REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL, last_error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_outbox_next_attempt_at ON outbox (next_attempt_at)")
+        self._db.commit()
+        logger.info(f"Outbox at {path} holds {self.pending()} pending messages")
+
+    def append(self, message) -> bool:
+        """
+        Journal a received message, leased to the caller.
+
+        Returns False if the message is already in the journal (a redelivery).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (discord_id, snapshot, received_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (str(message.id), json.dumps(snapshot(message)), now, now + self.lease),
+            )
+            self._db.commit()
+        if cursor.rowcount:
+            self.stats["appended"] += 1
+        return bool(cursor.rowcount)
+
+    def ack(self, discord_id: str):
+        """Remove a message that needs no more processing"""
+        with self._lock:
+            self._db.execute("DELETE FROM outbox WHERE discord_id = ?", (discord_id,))
+            self._db.commit()
+        self.stats["acked"] += 1
+
+    def release(self, discord_id: str):
+        """Make a leased message due right away, e.g. when the work queue had no room"""
+        with self._lock:
+            self._db.execute("UPDATE outbox SET next_attempt_at = ? WHERE discord_id = ?", (time.time(), discord_id))
+            self._db.commit()
+
+    def fail(self, discord_id: str, error: str = ""):
+        """Schedule a retry with backoff, or park the message once it has used up its attempts"""
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM outbox WHERE discord_id = ?", (discord_id,)).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                next_attempt_at = None
+                self.stats["dead"] += 1
+                logger.error(f"Message {discord_id} failed {attempts} times, parked in the outbox")
+            else:
+                next_attempt_at = time.time() + backoff_delay(attempts, self.backoff_base, self.backoff_max)
+                self.stats["retried"] += 1
+            self._db.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE discord_id = ?",
+                (attempts, next_attempt_at, error[:500], discord_id),
+            )
+            self._db.commit()
+
+    def claim_due(self, limit: int, in_flight: Collection[str] = ()) -> List[SimpleNamespace]:
+        """
+        Lease up to `limit` due messages, oldest first, and return them restored.
+
+        Messages in `in_flight` (still queued or being processed by the
+        caller) are never handed out again; if their lease ran out while
+        they waited under backpressure, it is renewed instead.
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT discord_id, snapshot FROM outbox WHERE next_attempt_at <= ? "
+                "ORDER BY received_at LIMIT ?",
+                (now, limit + len(in_flight)),
+            ).fetchall()
+            renewed = [discord_id for discord_id, _ in rows if discord_id in in_flight]
+            rows = [row for row in rows if row[0] not in in_flight][:limit]
+            leased = renewed + [discord_id for discord_id, _ in rows]
+            if leased:
+                self._db.executemany(
+                    "UPDATE outbox SET next_attempt_at = ? WHERE discord_id = ?",
+                    [(now + self.lease, discord_id) for discord_id in leased],
+                )
+                self._db.commit()
+        return [restore(json.loads(data)) for _, data in rows]
+
+    def release_all(self) -> int:
+        """Make every pending (not dead) message due, for replay after a restart"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE outbox SET next_attempt_at = ? WHERE next_attempt_at IS NOT NULL", (time.time(),)
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def pending(self) -> int:
+        """Messages still to be processed, including those in flight"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE next_attempt_at IS NOT NULL").fetchone()[0]
+
+    def dead(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE next_attempt_at IS NULL").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,147 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from sentiment_analyzer import TextInformation
+except ImportError:
+    from app.agents.sentiment_analyzer import TextInformation
+
+logger = logging.getLogger(__name__)
+
+# Protocols, tokens and apps of the Celo ecosystem, plus majors people compare them to
+PROTOCOL_KEYWORDS = (
+    "celo", "cusd", "ceur", "creal", "ckes", "cgbp", "mento", "ubeswap", "ube", "moola",
+    "mobius", "symmetric", "curve", "uniswap", "sushi", "sushiswap", "aave", "compound",
+    "morpho", "valora", "minipay", "impactmarket", "gooddollar", "poof",
+    "allbridge", "wormhole", "squid", "axelar", "optics", "glo", "usdglo", "usdc", "usdt",
+    "tether", "steakhouse", "beefy", "revo", "kolektivo", "toucan", "plastiks",
+    "ethereum", "eth", "bitcoin", "btc", "optimism", "arbitrum", "l2", "op stack",
+)
+
+# Words that make a message about markets or protocols rather than chit-chat
+INVESTMENT_TERMS = (
+    "tvl", "apy", "apr", "yield", "yields", "stake", "staking", "staked", "liquidity",
+    "pool", "pools", "farm", "farming", "airdrop", "token", "tokens", "tokenomics",
+    "price", "pump", "dump", "bullish", "bearish", "buy", "sell", "long", "short", "ath",
+    "mcap", "market cap", "fdv", "governance", "proposal", "vote", "exploit", "hack",
+    "hacked", "rug", "audit", "listing", "listed", "launch", "mainnet", "testnet",
+    "bridge", "swap", "lend", "lending", "borrow", "collateral", "vault", "rewards",
+    "emissions", "unlock", "treasury", "revenue", "fees", "volume", "depeg", "peg",
+    "invest", "investment", "portfolio", "validator", "upgrade", "migration",
+)
+
+ADDRESS_PATTERN = re.compile(r"\b0x[a-fA-F0-9]{40}\b")
+CASHTAG_PATTERN = re.compile(r"(?<![\w$])\$[A-Za-z][A-Za-z0-9]{1,9}\b")
+# Prices, percentages and amounts such as "$1.2m", "35%", "10k"
+FIGURE_PATTERN = re.compile(r"(?:\$\s?\d[\d,.]*[kmb]?|\b\d[\d,.]*\s?(?:%|[kmb]\b))", re.IGNORECASE)
+
+# Result stored for messages the prefilter rules out
+NO_SIGNAL = TextInformation(
+    protocol_name=None,
+    sentiment_score=None,
+    confidence=None,
+    technical_indicators=None,
+    risk_assessment=None,
+    community_consensus=None,
+)
+
+def _keyword_pattern(keywords: Iterable[str]) -> re.Pattern:
+    # Longest first so multi-word entries win over their prefixes
+    alternatives = sorted({re.escape(k.lower()) for k in keywords}, key=len, reverse=True)
+    return re.compile(r"(?<![\w$])(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE)
+
+@dataclass
+class PrefilterVerdict:
+    score: float
+    has_signal: bool
+    reasons: Dict[str, List[str]] = field(default_factory=dict)
+
+class MessagePrefilter:
+    """
+    Cheap local check for whether a message could carry investment signal.
+
+    Scores a message on protocol and token names, contract addresses,
+    cashtags, market vocabulary and figures (prices, percentages). Messages
+    scoring below `min_score` are chit-chat as far as the sentiment analysis
+    is concerned and can skip the LLM call. The scorer only looks for
+    positive evidence, so it errs towards sending messages on.
+    """
+
+    def __init__(
+        self,
+        min_score: float = 1.0,
+        protocol_weight: float = 2.0,
+        address_weight: float = 2.0,
+        cashtag_weight: float = 2.0,
+        term_weight: float = 1.0,
+        figure_weight: float = 0.5,
+        extra_keywords: Optional[Iterable[str]] = None,
+    ):
+        """
+        Initialize the prefilter.
+
+        Args:
+            min_score: Score a message needs to be sent to the LLM
+            protocol_weight: Score of the first protocol or token name found
+            address_weight: Score of a contract or wallet address
+            cashtag_weight: Score of a cashtag such as $CELO
+            term_weight: Score per distinct market term, e.g. "apy" or "airdrop"
+            figure_weight: Score of a price, percentage or amount
+            extra_keywords: Additional protocol names to recognize
+        """
+        self.min_score = min_score
+        self.protocol_weight = protocol_weight
+        self.address_weight = address_weight
+        self.cashtag_weight = cashtag_weight
+        self.term_weight = term_weight
+        self.figure_weight = figure_weight
+        self.protocols = _keyword_pattern(list(PROTOCOL_KEYWORDS) + list(extra_keywords or []))
+        self.terms = _keyword_pattern(INVESTMENT_TERMS)
+        self.stats = {
+            "checked": 0,
+            "passed": 0,
+            "skipped": 0,
+            "protocol": 0,
+            "address": 0,
+            "cashtag": 0,
+            "term": 0,
+            "figure": 0,
+        }
+
+    def check(self, content: str) -> PrefilterVerdict:
+        """Score a message and decide whether it needs the LLM"""
+        reasons = {}
+        score = 0.0
+
+        protocols = {m.lower() for m in self.protocols.findall(content)}
+        if protocols:
+            reasons["protocol"] = sorted(protocols)
+            score += self.protocol_weight
+        addresses = ADDRESS_PATTERN.findall(content)
+        if addresses:
+            reasons["address"] = addresses
+            score += self.address_weight
+        cashtags = {m.upper() for m in CASHTAG_PATTERN.findall(content)}
+        if cashtags:
+            reasons["cashtag"] = sorted(cashtags)
+            score += self.cashtag_weight
+        terms = {m.lower() for m in self.terms.findall(content)}
+        if terms:
+            reasons["term"] = sorted(terms)
+            score += self.term_weight * len(terms)
+        figures = FIGURE_PATTERN.findall(content)
+        if figures:
+            reasons["figure"] = figures
+            score += self.figure_weight
+
+        has_signal = score >= self.min_score
+        self.stats["checked"] += 1
+        self.stats["passed" if has_signal else "skipped"] += 1
+        for reason in reasons:
+            self.stats[reason] += 1
+        return PrefilterVerdict(score=score, has_signal=has_signal, reasons=reasons)
+
+    def skip_ratio(self) -> float:
+        return self.stats["skipped"] / self.stats["checked"] if self.stats["checked"] else 0.0
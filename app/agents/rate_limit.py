@@ -0,0 +1,118 @@
+import asyncio
+import random
+import re
+import time
+from typing import Mapping, Optional
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an OpenAI rate-limit reset value into seconds.
+
+    Accepts the formats used by the x-ratelimit-reset-* headers ("20ms", "1s",
+    "6m0s", "1h2m3.5s") as well as plain numbers of seconds (Retry-After).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def backoff_delay(attempt: int, base: float = 0.5, maximum: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Async token bucket.
+
+    Holds up to `capacity` tokens refilled continuously at `rate` tokens per
+    second. `acquire` waits until enough tokens are available. The bucket can
+    be re-synchronized with a server's view of the limit via `update`, which is
+    how the OpenAI x-ratelimit-* response headers are applied.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        """
+        Initialize the bucket.
+
+        Args:
+            capacity: Maximum number of tokens
+            rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and take them"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def update(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]):
+        """
+        Align the bucket with limits reported by the server.
+
+        OpenAI limits are per minute, so a reported limit also sets the refill
+        rate to limit / 60. When the server reports nothing left, the bucket is
+        emptied until the reported reset time.
+
+        Args:
+            limit: Per-minute limit reported by the server
+            remaining: Tokens the server says are left in the current window
+            reset: Seconds until the server's window is fully replenished
+        """
+        self._refill()
+        if limit:
+            self.capacity = limit
+            self.rate = limit / 60.0
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset:
+                self.drain(reset)
+
+    def drain(self, seconds: float):
+        """Empty the bucket so no tokens are handed out for roughly `seconds`"""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+def update_from_headers(requests: TokenBucket, tokens: TokenBucket, headers: Mapping[str, str]):
+    """Apply OpenAI x-ratelimit-* response headers to the request and token buckets"""
+    def number(name):
+        value = headers.get(name)
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    requests.update(
+        number("x-ratelimit-limit-requests"),
+        number("x-ratelimit-remaining-requests"),
+        parse_duration(headers.get("x-ratelimit-reset-requests")),
+    )
+    tokens.update(
+        number("x-ratelimit-limit-tokens"),
+        number("x-ratelimit-remaining-tokens"),
+        parse_duration(headers.get("x-ratelimit-reset-tokens")),
+    )
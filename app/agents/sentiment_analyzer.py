@@ -1,8 +1,23 @@
 from typing import Dict, List, Union, Optional, Any
-from openai import OpenAI
+from openai import (
+    OpenAI, AsyncOpenAI, RateLimitError, APITimeoutError,
+    APIConnectionError, InternalServerError,
+)
 from pydantic import BaseModel
+import asyncio
 import os
+import json
 import logging
+import time
+
+try:
+    from sentiment_cache import SentimentCache, normalize_content
+    from rate_limit import TokenBucket, backoff_delay, parse_duration, update_from_headers
+    from metrics import LLM_ERRORS, LLM_MESSAGES_PER_REQUEST, LLM_REQUEST_SECONDS, record_llm_usage
+except ImportError:
+    from app.agents.sentiment_cache import SentimentCache, normalize_content
+    from app.agents.rate_limit import TokenBucket, backoff_delay, parse_duration, update_from_headers
+    from app.agents.metrics import LLM_ERRORS, LLM_MESSAGES_PER_REQUEST, LLM_REQUEST_SECONDS, record_llm_usage
 
 logger = logging.getLogger(__name__)
 
@@ -14,43 +29,305 @@ class TextInformation(BaseModel):
     risk_assessment: str | None
     community_consensus: float | None  # 0.0 to 1.0
 
+class IndexedTextInformation(TextInformation):
+    index: int  # position of the message in the batch
+
+class TextInformationBatch(BaseModel):
+    items: list[IndexedTextInformation]
+
+SYSTEM_INSTRUCTIONS = """
+        You are acting as a crypto investment analyst. Extract information from messages related to:
+        1. Protocol/token mentions and their context
+        2. Sentiment (positive/negative/neutral)
+        3. Technical analysis indicators
+        4. Risk assessments
+        5. Community consensus
+        
+        Provide a sentiment score from -1.0 (very negative) to 1.0 (very positive).
+        Analysis must be short and concise, capturing the essence of the message.
+        """
+
+BATCH_INSTRUCTIONS = SYSTEM_INSTRUCTIONS + """
+        You will receive a JSON array of messages, each with an "index" and a "text".
+        Analyze every message independently and return exactly one item per message,
+        carrying over its "index".
+        """
+
 class SentimentAnalyzer:
     """
     A class for analyzing sentiment in text using OpenAI's API.
     """
-    def __init__(self, api_key: str, model:str):
+    def __init__(self, api_key: str, model:str, cache: Optional[SentimentCache] = None):
         self.api_key = api_key
         self.model = model
+        self.cache = cache
         if not self.api_key:
             raise ValueError("OpenAI API key not provided and OPENAI_API_KEY environment variable not set")
         
         self.client = OpenAI(api_key=self.api_key)
 
     def analyze_message(self, message: str, structure: Any):
-        system_instructions = """
-        You are acting as a crypto investment analyst. Extract information from messages related to:
-        1. Protocol/token mentions and their context
-        2. Sentiment (positive/negative/neutral)
-        3. Technical analysis indicators
-        4. Risk assessments
-        5. Community consensus
-        
-        Provide a sentiment score from -1.0 (very negative) to 1.0 (very positive).
-        Analysis must be short and concise, capturing the essence of the message.
+        if self.cache is not None:
+            cached = self.cache.get(message, self.model, structure)
+            if cached is not None:
+                return cached
+
+        parsed = self._parse(SYSTEM_INSTRUCTIONS, message, structure, messages_in_request=1)
+        if self.cache is not None:
+            self.cache.set(message, self.model, structure, parsed)
+        return parsed
+
+    def analyze_batch(self, messages: List[str]) -> List[TextInformation]:
         """
-        
-        response = self.client.beta.chat.completions.parse(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_instructions},
-                {"role": "user", "content": message},
-            ],
-            response_format=structure,
+        Analyze several messages with a single request.
+
+        The system prompt is sent once for the whole batch. Results are matched
+        back to their message by index; any message the model left out is
+        analyzed on its own so the output always lines up with the input.
+        """
+        results, misses = split_cached(self.cache, self.model, messages)
+        if not misses:
+            return results
+        if len(misses) == 1:
+            analyzed = [self.analyze_message(misses[0], TextInformation)]
+            return fill_results(results, messages, misses, analyzed)
+
+        batch = self._parse(
+            BATCH_INSTRUCTIONS, batch_prompt(misses), TextInformationBatch, messages_in_request=len(misses)
         )
+        analyzed = unpack_batch(batch, len(misses))
+        for i, result in enumerate(analyzed):
+            if result is None:
+                logger.warning(f"Batch response missing message {i}, analyzing it separately")
+                analyzed[i] = self.analyze_message(misses[i], TextInformation)
+            elif self.cache is not None:
+                self.cache.set(misses[i], self.model, TextInformation, result)
+        return fill_results(results, messages, misses, analyzed)
 
+    def _parse(self, instructions: str, content: str, structure: Any, messages_in_request: int):
+        """Send one structured-output request, recording its latency, tokens and errors"""
+        LLM_MESSAGES_PER_REQUEST.observe(messages_in_request)
+        start = time.perf_counter()
+        try:
+            response = self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": content},
+                ],
+                response_format=structure,
+            )
+        except Exception as e:
+            LLM_REQUEST_SECONDS.labels(self.model, "error").observe(time.perf_counter() - start)
+            LLM_ERRORS.labels(self.model, type(e).__name__).inc()
+            raise
+        LLM_REQUEST_SECONDS.labels(self.model, "success").observe(time.perf_counter() - start)
+        record_llm_usage(self.model, response.usage)
         return response.choices[0].message.parsed
 
 
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError, asyncio.TimeoutError)
+
+# Rough allowance of completion tokens per analyzed message, used together
+# with the prompt length to estimate what a request costs the token budget
+OUTPUT_TOKENS_PER_MESSAGE = 150
+
+class AsyncSentimentAnalyzer:
+    """
+    Async counterpart of SentimentAnalyzer built on AsyncOpenAI.
+
+    Requests are bounded by a semaphore, paced by request and token buckets
+    that follow the x-ratelimit-* headers OpenAI returns, cut off after a
+    per-request timeout and retried with jittered exponential backoff on
+    throttling, timeouts, connection errors and 5xx responses. `base_url` can
+    point the client at any server speaking the OpenAI API, such as
+    scripts/openai_stub.py.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        cache: Optional[SentimentCache] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 200000,
+        timeout: float = 30.0,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        if not self.api_key:
+            raise ValueError("OpenAI API key not provided and OPENAI_API_KEY environment variable not set")
+
+        # Retries are handled here so they respect the shared rate limits
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    async def analyze_message(self, message: str, structure: Any):
+        if self.cache is not None:
+            cached = self.cache.get(message, self.model, structure)
+            if cached is not None:
+                return cached
+
+        parsed = await self._parse(SYSTEM_INSTRUCTIONS, message, structure, messages_in_request=1)
+        if self.cache is not None:
+            self.cache.set(message, self.model, structure, parsed)
+        return parsed
+
+    async def analyze_batch(self, messages: List[str]) -> List[TextInformation]:
+        """Async version of SentimentAnalyzer.analyze_batch"""
+        results, misses = split_cached(self.cache, self.model, messages)
+        if not misses:
+            return results
+        if len(misses) == 1:
+            analyzed = [await self.analyze_message(misses[0], TextInformation)]
+            return fill_results(results, messages, misses, analyzed)
+
+        batch = await self._parse(
+            BATCH_INSTRUCTIONS, batch_prompt(misses), TextInformationBatch, messages_in_request=len(misses)
+        )
+        analyzed = unpack_batch(batch, len(misses))
+        missing = [i for i, result in enumerate(analyzed) if result is None]
+        if missing:
+            logger.warning(f"Batch response missing messages {missing}, analyzing them separately")
+            retried = await asyncio.gather(
+                *(self.analyze_message(misses[i], TextInformation) for i in missing)
+            )
+            for i, result in zip(missing, retried):
+                analyzed[i] = result
+        if self.cache is not None:
+            for i, result in enumerate(analyzed):
+                if i not in missing:
+                    self.cache.set(misses[i], self.model, TextInformation, result)
+        return fill_results(results, messages, misses, analyzed)
+
+    async def _parse(self, instructions: str, content: str, structure: Any, messages_in_request: int):
+        """Send one structured-output request, retrying transient failures"""
+        estimated_tokens = (len(instructions) + len(content)) / 4 + OUTPUT_TOKENS_PER_MESSAGE * messages_in_request
+        LLM_MESSAGES_PER_REQUEST.observe(messages_in_request)
+
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(estimated_tokens)
+            start = time.perf_counter()
+            try:
+                async with self.semaphore:
+                    self.stats["requests"] += 1
+                    start = time.perf_counter()
+                    raw = await asyncio.wait_for(
+                        self.client.beta.chat.completions.with_raw_response.parse(
+                            model=self.model,
+                            messages=[
+                                {"role": "system", "content": instructions},
+                                {"role": "user", "content": content},
+                            ],
+                            response_format=structure,
+                        ),
+                        timeout=self.timeout,
+                    )
+            except Exception as e:
+                outcome = "rate_limited" if isinstance(e, RateLimitError) else "error"
+                LLM_REQUEST_SECONDS.labels(self.model, outcome).observe(time.perf_counter() - start)
+                LLM_ERRORS.labels(self.model, type(e).__name__).inc()
+                if not isinstance(e, RETRYABLE_ERRORS):
+                    self.stats["failures"] += 1
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                if isinstance(e, RateLimitError):
+                    self.stats["rate_limited"] += 1
+                    headers = e.response.headers
+                    update_from_headers(self.request_bucket, self.token_bucket, headers)
+                    retry_after = parse_duration(headers.get("retry-after"))
+                    if retry_after:
+                        delay = max(delay, retry_after)
+                if attempt == self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                logger.warning(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            LLM_REQUEST_SECONDS.labels(self.model, "success").observe(time.perf_counter() - start)
+            update_from_headers(self.request_bucket, self.token_bucket, raw.headers)
+            completion = raw.parse()
+            record_llm_usage(self.model, completion.usage)
+            if completion.usage is not None:
+                self.stats["prompt_tokens"] += completion.usage.prompt_tokens
+                self.stats["completion_tokens"] += completion.usage.completion_tokens
+            return completion.choices[0].message.parsed
+
+    async def close(self):
+        await self.client.close()
+
+
+def split_cached(cache: Optional[SentimentCache], model: str, messages: List[str]):
+    """
+    Split a batch into cached results and the distinct texts still to analyze.
+
+    Returns the results list (None where nothing is cached yet) and the
+    uncached texts, listed once per normalized content.
+    """
+    results: List[Optional[TextInformation]] = [None] * len(messages)
+    misses: List[str] = []
+    seen = set()
+    for i, text in enumerate(messages):
+        if cache is not None:
+            results[i] = cache.get(text, model, TextInformation)
+        normalized = normalize_content(text)
+        if results[i] is None and normalized not in seen:
+            seen.add(normalized)
+            misses.append(text)
+    return results, misses
+
+
+def batch_prompt(messages: List[str]) -> str:
+    """Render a batch of messages as the JSON array the batch prompt expects"""
+    return json.dumps(
+        [{"index": i, "text": text} for i, text in enumerate(messages)],
+        ensure_ascii=False,
+    )
+
+
+def fill_results(results, messages, misses, analyzed):
+    """Copy freshly analyzed results into every position holding the same content"""
+    by_content = {normalize_content(text): result for text, result in zip(misses, analyzed)}
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = by_content[normalize_content(messages[i])]
+    return results
+
+
+def unpack_batch(batch: Optional[TextInformationBatch], size: int) -> List[Optional[TextInformation]]:
+    """Order batch items by index, leaving None where the model returned nothing"""
+    results: List[Optional[TextInformation]] = [None] * size
+    if batch is None:
+        return results
+    for item in batch.items:
+        if 0 <= item.index < size and results[item.index] is None:
+            results[item.index] = TextInformation(**item.model_dump(exclude={"index"}))
+    return results
+
+
 
 
 
@@ -60,7 +337,8 @@ if __name__ == "__main__":
 
     sa = SentimentAnalyzer(
         api_key=os.getenv("OPENAI_API_KEY"),
-        model="gpt-4o-2024-08-06"
+        model="gpt-4o-2024-08-06",
+        cache=SentimentCache(),
     )
 
     res = sa.analyze_message("morho is a great protocol, its TVL is 1b, we should invest in it", structure=TextInformation)
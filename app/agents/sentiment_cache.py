@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_content(content: str) -> str:
+    """
+    Normalize message text so trivially different copies share a cache entry.
+
+    Applies Unicode NFKC folding, lower-cases, collapses whitespace and strips
+    trailing punctuation ("GM!!", "gm" and " gm " all map to "gm").
+    """
+    text = unicodedata.normalize("NFKC", content).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip(".!?~ ")
+
+def schema_fingerprint(structure: Type[BaseModel]) -> str:
+    """Short hash of a response model's JSON schema"""
+    schema = json.dumps(structure.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()[:16]
+
+class SentimentCache:
+    """
+    Content-addressed cache for sentiment analysis results.
+
+    Entries are keyed on the normalized message text, the model and the
+    response schema, so changing either of the latter never serves stale
+    shapes. Lookups go to an in-memory LRU first and then, if configured, to a
+    SQLite file that survives restarts. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400, path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Size of the in-memory LRU tier
+            ttl: Seconds an entry stays valid (0 disables expiry)
+            path: Optional SQLite file for the persistent tier
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Sentiment cache persisting to {path}")
+
+    def key(self, content: str, model: str, structure: Type[BaseModel]) -> str:
+        """Cache key for a message analyzed by `model` into `structure`"""
+        fingerprint = self._fingerprints.get(structure)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[structure] = schema_fingerprint(structure)
+        raw = "\0".join((model, fingerprint, normalize_content(content)))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.time() - stored_at > self.ttl
+
+    def get(self, content: str, model: str, structure: Type[BaseModel]) -> Optional[BaseModel]:
+        """Return the cached result, or None on a miss"""
+        key = self.key(content, model, structure)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return structure.model_validate_json(entry[1])
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM sentiment_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    self._remember(key, row[1], row[0])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return structure.model_validate_json(row[0])
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, content: str, model: str, structure: Type[BaseModel], value: BaseModel):
+        """Store a result in every tier"""
+        if value is None:
+            return
+        key = self.key(content, model, structure)
+        payload = value.model_dump_json()
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, payload)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, payload, stored_at),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, stored_at: float, payload: str):
+        """Insert into the LRU tier, evicting the least recently used entries"""
+        self._memory[key] = (stored_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the persistent tier, returning how many were removed"""
+        if self._db is None or not self.ttl:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM sentiment_cache WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def hit_ratio(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
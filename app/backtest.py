@@ -0,0 +1,412 @@
+"""
+Backtest sentiment-driven allocation strategies on the message history.
+
+Replays the sentiment stored in discord_messages (or an NDJSON export from
+GET /messages/export) against a local price file and simulates a fund
+that periodically allocates across its whitelisted tokens by protocol
+signal. Strategies are evaluated with vectorized NumPy over a (bars x
+tokens) grid, and parameter sweeps are spread over all cores:
+
+    python -m app.backtest --prices prices.csv --tokens CELO,UBE,MOO \\
+        --half-life 6,24,72 --threshold 0,0.1,0.2 --top-k 1,2,3 \\
+        --rebalance 1,24 --output sweep.csv
+
+The price file is long-format CSV with a header: timestamp,symbol,price,
+where timestamp is epoch seconds or ISO-8601 (UTC when no offset). Bars
+are the distinct timestamps of the file. A message counts for a token when
+its protocol_name matches the symbol case-insensitively or is mapped to it
+with --symbol-map protocol=SYMBOL.
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class StrategyParams:
+    half_life_hours: float = 24.0  # decay of the sentiment signal
+    threshold: float = 0.0  # minimum signal to hold a token
+    top_k: int = 3  # maximum number of tokens held
+    weighting: str = "equal"  # "equal" or "signal" (proportional to signal)
+    rebalance_bars: int = 1  # bars between rebalances
+    fee_bps: float = 30.0  # cost per unit of turnover, in basis points
+    prior_weight: float = 2.0  # shrinks signals backed by little recent evidence
+
+@dataclass
+class PriceSeries:
+    times: np.ndarray  # bar close times, epoch seconds, ascending
+    symbols: List[str]
+    prices: np.ndarray  # (bars, tokens), forward-filled, NaN before a token's first price
+
+@dataclass
+class MessageSeries:
+    timestamp: np.ndarray  # epoch seconds
+    token: np.ndarray  # index into PriceSeries.symbols
+    sentiment: np.ndarray
+    confidence: np.ndarray
+
+def parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+def load_prices(path: str, symbols: Optional[List[str]] = None) -> PriceSeries:
+    """Pivot a timestamp,symbol,price CSV into a forward-filled (bars x tokens) matrix"""
+    with open(path, newline="") as f:
+        rows = [
+            (parse_timestamp(row["timestamp"]), row["symbol"], float(row["price"]))
+            for row in csv.DictReader(f)
+            if row["price"]
+        ]
+    if symbols is None:
+        symbols = sorted({symbol for _, symbol, _ in rows})
+    columns = {symbol.upper(): i for i, symbol in enumerate(symbols)}
+    rows = [row for row in rows if row[1].upper() in columns]
+    if not rows:
+        raise ValueError(f"No prices for {', '.join(symbols)} in {path}")
+
+    times = np.unique(np.array([t for t, _, _ in rows]))
+    prices = np.full((len(times), len(symbols)), np.nan)
+    bar = np.searchsorted(times, [t for t, _, _ in rows])
+    column = np.array([columns[symbol.upper()] for _, symbol, _ in rows])
+    prices[bar, column] = [price for _, _, price in rows]
+
+    # Forward fill gaps: index of the last observed price in each column
+    observed = np.where(~np.isnan(prices), np.arange(len(times))[:, None], 0)
+    np.maximum.accumulate(observed, axis=0, out=observed)
+    filled = prices[observed, np.arange(len(symbols))]
+    return PriceSeries(times=times, symbols=list(symbols), prices=filled)
+
+def token_index(symbols: List[str], symbol_map: Dict[str, str]) -> Dict[str, int]:
+    """Lower-cased protocol name -> token column"""
+    columns = {symbol.upper(): i for i, symbol in enumerate(symbols)}
+    index = {symbol.lower(): i for i, symbol in enumerate(symbols)}
+    for protocol, symbol in symbol_map.items():
+        if symbol.upper() in columns:
+            index[protocol.lower()] = columns[symbol.upper()]
+    return index
+
+def message_series(rows: Iterable[tuple], tokens: Dict[str, int]) -> MessageSeries:
+    """MessageSeries from (protocol_name, epoch, sentiment, confidence) rows, dropping unmapped protocols"""
+    rows = [row for row in rows if row[0] and row[0].lower() in tokens and row[2] is not None]
+    if not rows:
+        empty = np.empty(0)
+        return MessageSeries(empty, np.empty(0, dtype=np.int64), empty, empty)
+    names, timestamps, sentiment, confidence = zip(*rows)
+    return MessageSeries(
+        timestamp=np.array(timestamps, dtype=np.float64),
+        token=np.fromiter((tokens[name.lower()] for name in names), np.int64, len(names)),
+        sentiment=np.array(sentiment, dtype=np.float64),
+        confidence=np.array(confidence, dtype=np.float64),
+    )
+
+def load_messages_from_db(tokens: Dict[str, int]) -> MessageSeries:
+    """Scored messages of mapped protocols, in one bulk query"""
+    from sqlalchemy import func, select
+
+    from db.main import SessionLocal
+    from db.models import DiscordMessage
+
+    stmt = select(
+        DiscordMessage.protocol_name,
+        func.extract("epoch", DiscordMessage.created_at),
+        DiscordMessage.sentiment_score,
+        DiscordMessage.confidence,
+    ).where(
+        DiscordMessage.protocol_name.is_not(None),
+        DiscordMessage.sentiment_score.is_not(None),
+    )
+    db = SessionLocal()
+    try:
+        return message_series(db.execute(stmt).all(), tokens)
+    finally:
+        db.close()
+
+def load_messages_from_export(path: str, tokens: Dict[str, int]) -> MessageSeries:
+    """Messages from an NDJSON export of GET /messages/export"""
+    def rows():
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    message = json.loads(line)
+                    yield (
+                        message.get("protocol_name"),
+                        parse_timestamp(message["created_at"]),
+                        message.get("sentiment_score"),
+                        message.get("confidence"),
+                    )
+    return message_series(rows(), tokens)
+
+def decayed_sums(
+    prices: PriceSeries,
+    messages: MessageSeries,
+    half_life_hours: float,
+    default_confidence: float = 0.5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Time-decayed sums of confidence * sentiment and of confidence per bar and token.
+
+    Only messages posted at or before a bar's close count for that bar, so
+    decisions never see the future. Messages are decayed exactly to their
+    bar's close with one bincount; carrying the sums from bar to bar is a
+    first-order recursion over bars, vectorized across tokens.
+    """
+    bars, tokens = prices.prices.shape
+    half_life = half_life_hours * 3600.0
+    bar = np.searchsorted(prices.times, messages.timestamp, side="left")
+    keep = bar < bars
+    bar, token = bar[keep], messages.token[keep]
+    confidence = messages.confidence[keep]
+    confidence = np.clip(np.where(np.isnan(confidence), default_confidence, confidence), 0.0, 1.0)
+    weight = confidence * np.exp2(-(prices.times[bar] - messages.timestamp[keep]) / half_life)
+
+    cell = bar * tokens + token
+    # bincount of no messages comes back as int64; the carry below needs floats
+    numerator = np.bincount(cell, weights=weight * messages.sentiment[keep], minlength=bars * tokens)
+    numerator = numerator.astype(np.float64, copy=False).reshape(bars, tokens)
+    denominator = np.bincount(cell, weights=weight, minlength=bars * tokens)
+    denominator = denominator.astype(np.float64, copy=False).reshape(bars, tokens)
+
+    carry = np.exp2(-np.diff(prices.times) / half_life)
+    for t in range(1, bars):
+        numerator[t] += numerator[t - 1] * carry[t - 1]
+        denominator[t] += denominator[t - 1] * carry[t - 1]
+    return numerator, denominator
+
+def target_weights(signal: np.ndarray, tradable: np.ndarray, params: StrategyParams) -> np.ndarray:
+    """Portfolio weights per bar: the top_k tokens above threshold, equal or signal weighted"""
+    eligible = tradable & (signal > params.threshold)
+    tokens = signal.shape[1]
+    if params.top_k < tokens:
+        ranked = np.where(eligible, signal, -np.inf)
+        kth = -np.partition(-ranked, params.top_k - 1, axis=1)[:, params.top_k - 1:params.top_k]
+        eligible &= ranked >= kth
+    raw = np.where(eligible, signal if params.weighting == "signal" else 1.0, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    weights = np.divide(raw, total, out=np.zeros_like(raw), where=total > 0)
+    if params.rebalance_bars > 1:
+        weights = weights[(np.arange(len(weights)) // params.rebalance_bars) * params.rebalance_bars]
+    return weights
+
+def performance(returns: np.ndarray, bars_per_year: float) -> dict:
+    equity = np.cumprod(1.0 + returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    years = len(returns) / bars_per_year
+    volatility = returns.std() * np.sqrt(bars_per_year)
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "annual_return": float(equity[-1] ** (1.0 / years) - 1.0) if years > 0 and equity[-1] > 0 else -1.0,
+        "volatility": float(volatility),
+        "sharpe": float(returns.mean() * bars_per_year / volatility) if volatility > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()),
+    }
+
+def simulate(
+    prices: PriceSeries,
+    signal: np.ndarray,
+    params: StrategyParams,
+    bars_per_year: float,
+) -> dict:
+    """
+    Returns and risk of one strategy.
+
+    Weights chosen at a bar's close earn the next bar's returns. Between
+    rebalances the target weights are held (a constant mix), and every
+    change of weights pays `fee_bps` on the turnover. Uninvested weight
+    sits in cash at 0%.
+    """
+    tradable = ~np.isnan(prices.prices)
+    weights = target_weights(signal, tradable, params)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        asset_returns = np.nan_to_num(prices.prices[1:] / prices.prices[:-1] - 1.0)
+    turnover = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+    returns = (weights[:-1] * asset_returns).sum(axis=1) - turnover[:-1] * params.fee_bps / 10_000
+
+    result = performance(returns, bars_per_year)
+    result["turnover"] = float(turnover.sum())
+    result["exposure"] = float((weights[:-1].sum(axis=1) > 0).mean())
+    return result
+
+def benchmark(prices: PriceSeries, bars_per_year: float) -> dict:
+    """Equal-weight buy and hold of every token, from each one's first price"""
+    tradable = ~np.isnan(prices.prices)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        asset_returns = np.nan_to_num(prices.prices[1:] / prices.prices[:-1] - 1.0)
+    count = tradable[:-1].sum(axis=1)
+    returns = np.divide((asset_returns * tradable[:-1]).sum(axis=1), count, out=np.zeros(len(count)), where=count > 0)
+    return performance(returns, bars_per_year)
+
+def bars_per_year(prices: PriceSeries) -> float:
+    spacing = np.median(np.diff(prices.times)) if len(prices.times) > 1 else 86400.0
+    return 365.25 * 86400 / spacing
+
+def evaluate(prices: PriceSeries, messages: MessageSeries, params_list: List[StrategyParams]) -> List[dict]:
+    """Results for strategies sharing one half-life and prior (the signal is computed once)"""
+    first = params_list[0]
+    numerator, denominator = decayed_sums(prices, messages, first.half_life_hours)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = np.nan_to_num(numerator / denominator)
+    signal = score * denominator / (denominator + first.prior_weight)
+    per_year = bars_per_year(prices)
+    return [{**asdict(params), **simulate(prices, signal, params, per_year)} for params in params_list]
+
+# Sweep workers read the data from these globals, set once per process
+_prices: Optional[PriceSeries] = None
+_messages: Optional[MessageSeries] = None
+
+def _init_worker(prices: PriceSeries, messages: MessageSeries):
+    global _prices, _messages
+    _prices, _messages = prices, messages
+
+def _evaluate_group(params_list: List[StrategyParams]) -> List[dict]:
+    return evaluate(_prices, _messages, params_list)
+
+def sweep(
+    prices: PriceSeries,
+    messages: MessageSeries,
+    grid: List[StrategyParams],
+    processes: Optional[int] = None,
+    group_size: int = 64,
+) -> List[dict]:
+    """
+    Evaluate every strategy in `grid` across a process pool.
+
+    Strategies with the same half-life and prior share a signal, so they
+    are sent to workers in groups of up to `group_size`; the price and
+    message arrays are handed to each worker once, at start-up.
+    """
+    groups: Dict[Tuple[float, float], List[StrategyParams]] = {}
+    for params in grid:
+        groups.setdefault((params.half_life_hours, params.prior_weight), []).append(params)
+    tasks = [
+        members[start:start + group_size]
+        for members in groups.values()
+        for start in range(0, len(members), group_size)
+    ]
+    if processes == 1:
+        _init_worker(prices, messages)
+        return [result for task in tasks for result in _evaluate_group(task)]
+
+    results = []
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(prices, messages)) as pool:
+        for done, group in enumerate(pool.imap_unordered(_evaluate_group, tasks), start=1):
+            results.extend(group)
+            if done % 100 == 0 or done == len(tasks):
+                logger.info(f"{len(results)}/{len(grid)} strategies evaluated")
+    return results
+
+# Metrics strategies can be ranked by; lower is better for volatility and turnover
+SORT_METRICS = ("sharpe", "total_return", "annual_return", "max_drawdown", "volatility", "turnover")
+
+def parse_list(value: str, cast=float) -> list:
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def grid_values(cast=float, minimum=None, choices=None):
+    """argparse type for a non-empty comma-separated list of sweep values"""
+    def parse(value: str) -> list:
+        try:
+            values = parse_list(value, cast)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid {cast.__name__} list: {value!r}")
+        if not values:
+            raise argparse.ArgumentTypeError("needs at least one value")
+        for item in values:
+            if minimum is not None and item < minimum:
+                raise argparse.ArgumentTypeError(f"{item} is below the minimum of {minimum}")
+            if choices is not None and item not in choices:
+                raise argparse.ArgumentTypeError(f"{item!r} is not one of {', '.join(choices)}")
+        return values
+    return parse
+
+def parse_symbol_map(value: Optional[str]) -> Dict[str, str]:
+    if not value:
+        return {}
+    return dict(item.split("=", 1) for item in value.split(",") if "=" in item)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backtest sentiment-driven allocation strategies")
+    parser.add_argument("--prices", required=True, help="CSV with timestamp,symbol,price rows")
+    parser.add_argument("--tokens", help="Comma-separated whitelisted symbols to allocate across (default: all in the file)")
+    parser.add_argument("--symbol-map", help="Comma-separated protocol=SYMBOL pairs, e.g. ubeswap=UBE,moola=MOO")
+    parser.add_argument("--messages", help="NDJSON export to read instead of the database")
+    parser.add_argument("--half-life", type=grid_values(float, 1e-6), default="24", help="Signal half-lives in hours")
+    parser.add_argument("--threshold", type=grid_values(float), default="0", help="Minimum signals to hold a token")
+    parser.add_argument("--top-k", type=grid_values(int, 1), default="3", help="Maximum numbers of tokens held")
+    parser.add_argument("--weighting", type=grid_values(str, choices=("equal", "signal")), default="equal",
+                        help="equal and/or signal")
+    parser.add_argument("--rebalance", type=grid_values(int, 1), default="1", help="Bars between rebalances")
+    parser.add_argument("--fee-bps", type=grid_values(float, 0), default="30",
+                        help="Trading costs in basis points of turnover")
+    parser.add_argument("--prior-weight", type=grid_values(float, 0), default="2",
+                        help="Evidence needed before a signal counts fully")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", help="Write every result to this CSV file")
+    parser.add_argument("--top", type=int, default=10, help="Best strategies to print")
+    parser.add_argument("--sort", default="sharpe", choices=SORT_METRICS, help="Metric to rank strategies by")
+    args = parser.parse_args()
+
+    prices = load_prices(args.prices, parse_list(args.tokens, str) if args.tokens else None)
+    tokens = token_index(prices.symbols, parse_symbol_map(args.symbol_map))
+    if args.messages:
+        messages = load_messages_from_export(args.messages, tokens)
+    else:
+        messages = load_messages_from_db(tokens)
+    logger.info(
+        f"{len(prices.times)} bars of {', '.join(prices.symbols)}, "
+        f"{len(messages.timestamp)} scored messages on those tokens"
+    )
+
+    grid = [
+        StrategyParams(*combo)
+        for combo in itertools.product(
+            args.half_life,
+            args.threshold,
+            args.top_k,
+            args.weighting,
+            args.rebalance,
+            args.fee_bps,
+            args.prior_weight,
+        )
+    ]
+    start = time.perf_counter()
+    results = sweep(prices, messages, grid, args.processes)
+    # Higher is better except for volatility and turnover (max_drawdown is negative)
+    results.sort(key=lambda result: result[args.sort], reverse=args.sort not in ("volatility", "turnover"))
+    logger.info(f"Evaluated {len(results)} strategies in {time.perf_counter() - start:.1f}s")
+
+    if args.output and results:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    base = benchmark(prices, bars_per_year(prices))
+    print(
+        f"buy and hold: return {base['total_return']:+.2%}, sharpe {base['sharpe']:.2f}, "
+        f"max drawdown {base['max_drawdown']:.2%}"
+    )
+    for result in results[:args.top]:
+        print(
+            f"return {result['total_return']:+.2%}  sharpe {result['sharpe']:6.2f}  "
+            f"max drawdown {result['max_drawdown']:7.2%}  turnover {result['turnover']:7.1f}  "
+            f"| half-life {result['half_life_hours']:g}h, threshold {result['threshold']:g}, "
+            f"top {result['top_k']}, {result['weighting']}, rebalance {result['rebalance_bars']}, "
+            f"fee {result['fee_bps']:g}bps, prior {result['prior_weight']:g}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ABI_PATH = os.path.join(ROOT, "fund_abi.json")
+
+# Multicall3 lives at the same address on Celo, Alfajores and most other EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = [
+    {
+        "type": "function",
+        "name": "aggregate3",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+# A view call: function name and arguments
+Call = Tuple[str, tuple]
+
+class FundReadError(Exception):
+    """A view call on the Fund contract failed or the RPC node was unreachable"""
+
+def load_abi(path: str) -> list:
+    with open(path) as f:
+        abi = json.load(f)
+    # Accept both a bare ABI and a Foundry/Hardhat artifact
+    return abi["abi"] if isinstance(abi, dict) else abi
+
+def normalize_address(address: str) -> str:
+    """Checksummed address; raises ValueError for anything that isn't one"""
+    if not Web3.is_address(address):
+        raise ValueError(f"Invalid address: {address}")
+    return Web3.to_checksum_address(address)
+
+class FundReader:
+    """
+    Reads Fund contract state with as few RPC round trips as possible.
+
+    All view calls needed for a response are sent together, pinned to one
+    block: as a single JSON-RPC batch request, or, when a Multicall3
+    address is configured, as a single eth_call to `aggregate3`. State at a
+    given block never changes, so results are cached per block number and
+    every API request within the same block is served from memory. The
+    latest block number itself is refreshed at most every `block_ttl`
+    seconds, and concurrent requests for the same call share one fetch.
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        address: str,
+        abi: list,
+        multicall_address: Optional[str] = None,
+        block_ttl: float = 1.0,
+        cache_blocks: int = 16,
+        max_batch: int = 100,
+        timeout: float = 10.0,
+    ):
+        """
+        Initialize the reader.
+
+        Args:
+            rpc_url: HTTP JSON-RPC endpoint of a Celo (or Anvil) node
+            address: Address of the deployed Fund contract
+            abi: ABI of the Fund contract
+            multicall_address: Multicall3 contract to aggregate calls through (None: JSON-RPC batches)
+            block_ttl: Seconds to reuse the latest block number before asking the node again
+            cache_blocks: Number of recent blocks whose results are kept
+            max_batch: Maximum calls per batch request or aggregate3 call
+            timeout: RPC request timeout in seconds
+        """
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(
+            rpc_url,
+            request_kwargs={"timeout": timeout},
+            # The validation middleware asks for eth_chainId before every call; let the provider cache it
+            cache_allowed_requests=True,
+        ))
+        self.address = normalize_address(address)
+        self.contract = self.w3.eth.contract(address=self.address, abi=abi)
+        self.multicall = None
+        if multicall_address:
+            self.multicall = self.w3.eth.contract(address=normalize_address(multicall_address), abi=MULTICALL3_ABI)
+        self.output_types = {
+            item["name"]: [output["type"] for output in item["outputs"]]
+            for item in abi
+            if item.get("type") == "function"
+        }
+        self.block_ttl = block_ttl
+        self.cache_blocks = cache_blocks
+        self.max_batch = max_batch
+
+        self._results: "OrderedDict[int, Dict[Call, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, Call], asyncio.Future] = {}
+        self._block: Optional[Tuple[int, float]] = None
+        self._block_lock = asyncio.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "rpc_requests": 0,
+            "block_number_requests": 0,
+        }
+
+    async def block_number(self) -> int:
+        """Latest block number, reused for `block_ttl` seconds"""
+        async with self._block_lock:
+            now = time.monotonic()
+            if self._block is None or now - self._block[1] >= self.block_ttl:
+                try:
+                    number = await self.w3.eth.block_number
+                except Exception as e:
+                    raise FundReadError(f"Could not get the latest block: {e}") from e
+                self.stats["block_number_requests"] += 1
+                self._block = (number, now)
+            return self._block[0]
+
+    async def read(self, calls: Iterable[Call], block: Optional[int] = None) -> Tuple[int, List[Any]]:
+        """
+        Results of several view calls at one block.
+
+        Args:
+            calls: (function name, arguments) pairs
+            block: Block to read at (default: the latest block)
+
+        Returns:
+            The block number and the decoded result of each call, in order
+        """
+        calls = [(name, tuple(args)) for name, args in calls]
+        if block is None:
+            block = await self.block_number()
+        cached = self._results.get(block)
+        if cached is None:
+            cached = self._results[block] = {}
+            while len(self._results) > self.cache_blocks:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(block)
+
+        waiting = []
+        missing = []
+        for call in dict.fromkeys(calls):
+            if call in cached:
+                self.stats["hits"] += 1
+            elif (block, call) in self._inflight:
+                self.stats["hits"] += 1
+                waiting.append((call, self._inflight[(block, call)]))
+            else:
+                self.stats["misses"] += 1
+                missing.append(call)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {call: loop.create_future() for call in missing}
+            for call, future in futures.items():
+                self._inflight[(block, call)] = future
+            try:
+                for start in range(0, len(missing), self.max_batch):
+                    chunk = missing[start:start + self.max_batch]
+                    for call, value in zip(chunk, await self._fetch(chunk, block)):
+                        cached[call] = value
+                        futures[call].set_result(value)
+            except Exception as e:
+                error = e if isinstance(e, FundReadError) else FundReadError(f"RPC request failed: {e}")
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(error)
+                        # Mark the exception retrieved when no other request is waiting on it
+                        future.exception()
+                if error is e:
+                    raise
+                raise error from e
+            finally:
+                for call in missing:
+                    self._inflight.pop((block, call), None)
+        for call, future in waiting:
+            cached[call] = await future
+        return block, [cached[call] for call in calls]
+
+    async def _fetch(self, calls: List[Call], block: int) -> List[Any]:
+        self.stats["rpc_requests"] += 1
+        if self.multicall is not None:
+            return await self._fetch_multicall(calls, block)
+        if len(calls) == 1:
+            name, args = calls[0]
+            return [await self.contract.functions[name](*args).call(block_identifier=block)]
+        async with self.w3.batch_requests() as batch:
+            for name, args in calls:
+                batch.add(self.contract.functions[name](*args).call(block_identifier=block))
+            return list(await batch.async_execute())
+
+    async def _fetch_multicall(self, calls: List[Call], block: int) -> List[Any]:
+        requests = [
+            (self.address, False, self.contract.encode_abi(name, args=list(args)))
+            for name, args in calls
+        ]
+        results = await self.multicall.functions.aggregate3(requests).call(block_identifier=block)
+        values = []
+        for (name, _), (success, data) in zip(calls, results):
+            if not success:
+                raise FundReadError(f"{name} reverted")
+            decoded = self.w3.codec.decode(self.output_types[name], data)
+            values.append(decoded[0] if len(decoded) == 1 else decoded)
+        return values
+
+    async def overview(self, block: Optional[int] = None) -> dict:
+        """Fund-wide state: owner, deposit token and share accounting"""
+        names = ["owner", "token", "totalShares", "totalSupply", "allocatedToken"]
+        block, values = await self.read([(name, ()) for name in names], block)
+        owner, token, total_shares, total_supply, allocated_token = values
+        return {
+            "address": self.address,
+            "block_number": block,
+            "owner": owner,
+            "token": token,
+            "total_shares": total_shares,
+            "total_supply": total_supply,
+            "allocated_token": allocated_token,
+        }
+
+    async def shares(self, users: List[str], block: Optional[int] = None) -> dict:
+        """Shares of several users and the total, in one round trip"""
+        users = [normalize_address(user) for user in users]
+        calls = [("totalShares", ())] + [("userShares", (user,)) for user in users]
+        block, values = await self.read(calls, block)
+        return {
+            "block_number": block,
+            "total_shares": values[0],
+            "shares": dict(zip(users, values[1:])),
+        }
+
+    async def whitelisted(self, tokens: List[str], block: Optional[int] = None) -> dict:
+        """Whether each token is whitelisted for deposits"""
+        tokens = [normalize_address(token) for token in tokens]
+        block, values = await self.read([("whitelistedTokens", (token,)) for token in tokens], block)
+        return {"block_number": block, "tokens": dict(zip(tokens, values))}
+
+    async def close(self):
+        await self.w3.provider.disconnect()
+
+def create_fund_reader() -> Optional[FundReader]:
+    """FundReader configured from the FUND_* environment variables, or None when no contract is set"""
+    rpc_url = os.getenv("FUND_RPC_URL")
+    address = os.getenv("FUND_ADDRESS")
+    if not rpc_url or not address:
+        return None
+    return FundReader(
+        rpc_url=rpc_url,
+        address=address,
+        abi=load_abi(os.getenv("FUND_ABI_PATH") or DEFAULT_ABI_PATH),
+        multicall_address=os.getenv("FUND_MULTICALL_ADDRESS") or None,
+        block_ttl=float(os.getenv("FUND_BLOCK_TTL", "1.0")),
+        cache_blocks=int(os.getenv("FUND_CACHE_BLOCKS", "16")),
+        max_batch=int(os.getenv("FUND_MAX_BATCH", "100")),
+        timeout=float(os.getenv("FUND_RPC_TIMEOUT", "10")),
+    )
+
+fund_reader = create_fund_reader()
@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from web3 import Web3
+
+from app.blockchain.fund import FundReadError, FundReader, create_fund_reader
+from db.main import SessionLocal, dialect_insert
+from db.models import FundEvent, IndexerCheckpoint
+
+logger = logging.getLogger(__name__)
+
+def event_topic(signature: str) -> str:
+    return Web3.to_hex(Web3.keccak(text=signature))
+
+SHARES_MINTED = event_topic("sharesMinted(address,uint256)")
+WITHDRAWN_SHARES = event_topic("withdrawnShares(address,uint256)")
+TOKEN_WHITELISTED = event_topic("tokenWhitelisted(address)")
+TRANSFER = event_topic("Transfer(address,address,uint256)")
+
+FUND_EVENTS = {
+    SHARES_MINTED: "deposit",
+    WITHDRAWN_SHARES: "withdrawal",
+    TOKEN_WHITELISTED: "token_whitelisted",
+}
+
+def topic_address(topic) -> str:
+    return Web3.to_checksum_address(Web3.to_hex(topic)[-40:])
+
+def address_topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+def decode_logs(fund_logs: list, token_logs: list) -> List[dict]:
+    """
+    FundEvent rows for a range of Fund logs and deposit token transfers.
+
+    `allocateToken` emits no event of its own, so allocations are the
+    token transfers out of the fund that are not part of a withdrawal.
+    """
+    rows = []
+    withdrawals = set()
+    for log in fund_logs:
+        topics = log["topics"]
+        event = FUND_EVENTS.get(Web3.to_hex(topics[0])) if topics else None
+        if event is None:
+            continue
+        data = bytes(log["data"])
+        if len(topics) > 1:
+            # Indexed address, as declared in Fund.sol
+            account = topic_address(topics[1])
+            amount = int.from_bytes(data[:32], "big") if data else None
+        else:
+            account = topic_address(data[:32])
+            amount = int.from_bytes(data[32:64], "big") if len(data) >= 64 else None
+        if event == "withdrawal":
+            withdrawals.add(Web3.to_hex(log["transactionHash"]))
+        rows.append(log_row(log, event, account, amount))
+    for log in token_logs:
+        if Web3.to_hex(log["transactionHash"]) in withdrawals:
+            continue
+        recipient = topic_address(log["topics"][2])
+        rows.append(log_row(log, "allocation", recipient, int.from_bytes(bytes(log["data"])[:32], "big")))
+    rows.sort(key=lambda row: (row["block_number"], row["log_index"]))
+    return rows
+
+# How nodes reject an eth_getLogs range or result set as too large (geth,
+# Erigon, Alchemy, Infura, QuickNode, Forno and others word it differently)
+RANGE_ERROR_HINTS = (
+    "block range",
+    "range is too large",
+    "range too large",
+    "too many blocks",
+    "too many results",
+    "too many logs",
+    "more than",
+    "response size",
+    "response is too big",
+    "result set",
+)
+
+def is_range_error(error: Exception) -> bool:
+    """True if the node refused a getLogs request because of its size, not a transient failure"""
+    message = str(error).lower()
+    if "rate limit" in message or "too many requests" in message:
+        return False
+    return any(hint in message for hint in RANGE_ERROR_HINTS)
+
+def log_row(log, event: str, account: str, amount: Optional[int]) -> dict:
+    return {
+        "event": event,
+        "account": account,
+        "amount": Decimal(amount) if amount is not None else None,
+        "block_number": log["blockNumber"],
+        "block_hash": Web3.to_hex(log["blockHash"]),
+        "transaction_hash": Web3.to_hex(log["transactionHash"]),
+        "log_index": log["logIndex"],
+    }
+
+class FundIndexer:
+    """
+    Incremental indexer of Fund contract activity into the fund_events table.
+
+    Logs are fetched in block ranges that adapt to the node: a range grows
+    while it returns few logs and is halved when the node rejects it or it
+    returns more than `target_logs`, so a historical sync takes few, large
+    requests and steady state costs one round trip per poll. The Fund and
+    deposit token queries of a range go out as one JSON-RPC batch. Events
+    and the checkpoint (last indexed block and its hash) are committed in
+    one transaction, so a crash never leaves half a range behind. On every
+    pass the checkpoint hash is compared with the chain; when it no longer
+    matches, events of the last `reorg_window` blocks are deleted and
+    indexed again.
+    """
+
+    def __init__(
+        self,
+        reader: FundReader,
+        session_factory=SessionLocal,
+        start_block: Optional[int] = None,
+        confirmations: int = 2,
+        reorg_window: int = 64,
+        initial_range: int = 2000,
+        max_range: int = 100_000,
+        target_logs: int = 5000,
+    ):
+        """
+        Initialize the indexer.
+
+        Args:
+            reader: FundReader for the contract, reused for its web3 client
+            session_factory: Creates database sessions
+            start_block: First block to index without a checkpoint (None: find the deployment block)
+            confirmations: Blocks to stay behind the head
+            reorg_window: Blocks to rewind when a reorg is detected
+            initial_range: Blocks per eth_getLogs request to start with
+            max_range: Upper bound for the adaptive range, lowered when the node rejects a range
+            target_logs: Log count above which the range shrinks
+        """
+        self.reader = reader
+        self.w3 = reader.w3
+        self.address = reader.address
+        self.session_factory = session_factory
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.reorg_window = reorg_window
+        self.range = initial_range
+        self.max_range = max_range
+        self.target_logs = target_logs
+        self.name = f"fund:{self.address}"
+        self.token: Optional[str] = None
+        self.stats = {
+            "ranges": 0,
+            "events": 0,
+            "range_errors": 0,
+            "reorgs": 0,
+        }
+
+    async def head(self) -> int:
+        """Newest block considered safe to index"""
+        return await self.w3.eth.block_number - self.confirmations
+
+    async def deployment_block(self) -> int:
+        """First block with contract code at the fund address, by binary search (0 if the node can't tell)"""
+        low, high = 0, await self.w3.eth.block_number
+        try:
+            while low < high:
+                middle = (low + high) // 2
+                if await self.w3.eth.get_code(self.address, block_identifier=middle):
+                    high = middle
+                else:
+                    low = middle + 1
+        except Exception as e:
+            logger.warning(f"Could not find the deployment block, starting at 0: {e}")
+            return 0
+        return low
+
+    def checkpoint(self, db: Session) -> Optional[IndexerCheckpoint]:
+        return db.get(IndexerCheckpoint, self.name)
+
+    async def check_reorg(self, db: Session, checkpoint: IndexerCheckpoint) -> bool:
+        """Rewind when the checkpointed block is no longer on the canonical chain"""
+        if checkpoint.last_block_hash is None:
+            return False
+        chain_head = await self.w3.eth.block_number
+        if checkpoint.last_block > chain_head:
+            # The chain is shorter than what was indexed, e.g. a dev chain that was reset
+            target = min(checkpoint.last_block - self.reorg_window, chain_head)
+            reason = f"Checkpoint block {checkpoint.last_block} is above the chain head {chain_head}"
+        else:
+            block = await self.w3.eth.get_block(checkpoint.last_block)
+            if Web3.to_hex(block["hash"]) == checkpoint.last_block_hash:
+                return False
+            target = checkpoint.last_block - self.reorg_window
+            reason = f"Reorg detected at block {checkpoint.last_block}"
+
+        # Older events may be off the chain too (a reset chain): rewind below the newest whose block changed
+        while target >= 0:
+            stored = db.execute(
+                select(FundEvent.block_number, FundEvent.block_hash)
+                .where(FundEvent.contract_address == self.address, FundEvent.block_number <= target)
+                .order_by(FundEvent.block_number.desc())
+                .limit(1)
+            ).first()
+            if stored is None:
+                break
+            block = await self.w3.eth.get_block(stored.block_number)
+            if Web3.to_hex(block["hash"]) == stored.block_hash:
+                break
+            target = stored.block_number - 1
+        target = max(target, -1)
+        logger.warning(f"{reason}, rewinding {self.name} to block {target}")
+        db.execute(
+            delete(FundEvent).where(
+                FundEvent.contract_address == self.address,
+                FundEvent.block_number > target,
+            )
+        )
+        checkpoint.last_block = target
+        checkpoint.last_block_hash = None
+        if target >= 0:
+            checkpoint.last_block_hash = Web3.to_hex((await self.w3.eth.get_block(target))["hash"])
+        db.commit()
+        self.stats["reorgs"] += 1
+        return True
+
+    async def fetch_range(self, from_block: int, to_block: int) -> Tuple[list, list, str]:
+        """Fund logs, token transfers out of the fund and the hash of `to_block`, in one batch request"""
+        fund_filter = {
+            "address": self.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [list(FUND_EVENTS)],
+        }
+        token_filter = {
+            "address": self.token,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [TRANSFER, address_topic(self.address)],
+        }
+        async with self.w3.batch_requests() as batch:
+            batch.add(self.w3.eth.get_logs(fund_filter))
+            batch.add(self.w3.eth.get_logs(token_filter))
+            batch.add(self.w3.eth.get_block(to_block))
+            fund_logs, token_logs, block = await batch.async_execute()
+        # A batch reports per-request errors in place of the result
+        for result in (fund_logs, token_logs, block):
+            if isinstance(result, dict) and "error" in result:
+                raise FundReadError(str(result["error"]))
+        return fund_logs, token_logs, Web3.to_hex(block["hash"])
+
+    async def add_block_times(self, rows: List[dict]):
+        numbers = sorted({row["block_number"] for row in rows})
+        times = {}
+        for start in range(0, len(numbers), 100):
+            async with self.w3.batch_requests() as batch:
+                for number in numbers[start:start + 100]:
+                    batch.add(self.w3.eth.get_block(number))
+                for block in await batch.async_execute():
+                    times[block["number"]] = datetime.fromtimestamp(block["timestamp"], tz=timezone.utc)
+        for row in rows:
+            row["block_time"] = times.get(row["block_number"])
+
+    def add_shares_after(self, db: Session, rows: List[dict]):
+        """Running share balance of each depositor, continuing from their last stored event"""
+        accounts = {row["account"] for row in rows if row["event"] in ("deposit", "withdrawal")}
+        if not accounts:
+            return
+        latest = (
+            select(func.max(FundEvent.id))
+            .where(
+                FundEvent.contract_address == self.address,
+                FundEvent.account.in_(accounts),
+                FundEvent.event.in_(("deposit", "withdrawal")),
+            )
+            .group_by(FundEvent.account)
+        )
+        balances: Dict[str, Decimal] = {
+            account: shares or Decimal(0)
+            for account, shares in db.execute(
+                select(FundEvent.account, FundEvent.shares_after).where(FundEvent.id.in_(latest))
+            ).all()
+        }
+        for row in rows:
+            if row["event"] == "deposit":
+                balances[row["account"]] = balances.get(row["account"], Decimal(0)) + row["amount"]
+            elif row["event"] == "withdrawal":
+                balances[row["account"]] = balances.get(row["account"], Decimal(0)) - row["amount"]
+            else:
+                continue
+            row["shares_after"] = balances[row["account"]]
+
+    def store(self, db: Session, checkpoint: IndexerCheckpoint, rows: List[dict], to_block: int, block_hash: str):
+        self.add_shares_after(db, rows)
+        if rows:
+            stmt = dialect_insert(db, FundEvent).values(
+                [{"contract_address": self.address, "shares_after": None, **row} for row in rows]
+            )
+            db.execute(stmt.on_conflict_do_nothing(index_elements=["transaction_hash", "log_index"]))
+        checkpoint.last_block = to_block
+        checkpoint.last_block_hash = block_hash
+        db.commit()
+
+    async def sync(self, until: Optional[int] = None) -> int:
+        """
+        Index everything up to `until` (default: the safe head).
+
+        Returns:
+            The number of events stored
+        """
+        if self.token is None:
+            _, (self.token,) = await self.reader.read([("token", ())])
+        stored = 0
+        db = self.session_factory()
+        try:
+            checkpoint = self.checkpoint(db)
+            if checkpoint is None:
+                start = self.start_block if self.start_block is not None else await self.deployment_block()
+                checkpoint = IndexerCheckpoint(name=self.name, last_block=start - 1, last_block_hash=None)
+                db.add(checkpoint)
+                db.commit()
+                logger.info(f"Indexing {self.name} from block {start}")
+            await self.check_reorg(db, checkpoint)
+
+            head = until if until is not None else await self.head()
+            while checkpoint.last_block < head:
+                from_block = checkpoint.last_block + 1
+                to_block = min(from_block + self.range - 1, head)
+                try:
+                    fund_logs, token_logs, block_hash = await self.fetch_range(from_block, to_block)
+                except Exception as e:
+                    # Timeouts, dropped connections, 5xx and rate limits say nothing about the
+                    # range; give up this pass with the range untouched (follow() retries)
+                    if not is_range_error(e) or to_block == from_block:
+                        raise FundReadError(f"Could not get logs of blocks {from_block}-{to_block}: {e}") from e
+                    self.range = max(1, (to_block - from_block + 1) // 2)
+                    # The node caps the range or result size; don't keep growing into the same error
+                    self.max_range = self.range
+                    self.stats["range_errors"] += 1
+                    logger.warning(f"Logs of blocks {from_block}-{to_block} failed ({e}), retrying with {self.range} blocks")
+                    continue
+
+                rows = decode_logs(fund_logs, token_logs)
+                await self.add_block_times(rows)
+                self.store(db, checkpoint, rows, to_block, block_hash)
+                stored += len(rows)
+                self.stats["ranges"] += 1
+                self.stats["events"] += len(rows)
+                if len(rows) > self.target_logs:
+                    self.range = max(1, self.range // 2)
+                elif len(rows) < self.target_logs // 4 and to_block - from_block + 1 == self.range:
+                    self.range = min(self.max_range, self.range * 2)
+                logger.info(f"Indexed blocks {from_block}-{to_block}: {len(rows)} events, next range {self.range}")
+        finally:
+            db.close()
+        return stored
+
+    async def follow(self, interval: float = 5.0):
+        """Keep indexing new blocks, polling every `interval` seconds"""
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Indexing {self.name} failed: {e}")
+            await asyncio.sleep(interval)
+
+def create_fund_indexer(reader: FundReader) -> FundIndexer:
+    """FundIndexer configured from the FUND_INDEXER_* environment variables"""
+    start_block = os.getenv("FUND_INDEXER_START_BLOCK")
+    return FundIndexer(
+        reader,
+        start_block=int(start_block) if start_block else None,
+        confirmations=int(os.getenv("FUND_INDEXER_CONFIRMATIONS", "2")),
+        reorg_window=int(os.getenv("FUND_INDEXER_REORG_WINDOW", "64")),
+        initial_range=int(os.getenv("FUND_INDEXER_RANGE", "2000")),
+        max_range=int(os.getenv("FUND_INDEXER_MAX_RANGE", "100000")),
+        target_logs=int(os.getenv("FUND_INDEXER_TARGET_LOGS", "5000")),
+    )
+
+async def run(args):
+    reader = create_fund_reader()
+    if reader is None:
+        raise SystemExit("Set FUND_RPC_URL and FUND_ADDRESS to index the fund")
+    indexer = create_fund_indexer(reader)
+    try:
+        if args.command == "follow":
+            await indexer.follow(args.interval)
+        else:
+            stored = await indexer.sync(args.until)
+            logger.info(f"Stored {stored} events: {indexer.stats}")
+    finally:
+        await reader.close()
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index Fund contract events into the database")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    sync = subcommands.add_parser("sync", help="Index up to the current head and exit")
+    sync.add_argument("--until", type=int, help="Stop at this block instead of the head")
+    follow = subcommands.add_parser("follow", help="Keep indexing new blocks")
+    follow.add_argument("--interval", type=float, default=float(os.getenv("FUND_INDEXER_INTERVAL", "5")))
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import anyio.from_thread
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    """In-process LRU store, private to each API worker process"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl else 0, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    async def close(self):
+        pass
+
+class RedisBackend:
+    """
+    Store shared by all API workers in Redis, or anything speaking its
+    protocol (Valkey, KeyDB, a local stand-in). Needs the `redis` package.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "celoaifund:responses:"):
+        import redis.asyncio
+
+        self.client = redis.asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self.client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    async def bump(self, namespace: str):
+        await self.client.incr(f"{self.prefix}gen:{namespace}")
+
+    async def close(self):
+        await self.client.aclose()
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """True if an If-None-Match header value covers `etag` (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def request_key(request: Request) -> str:
+    """Path plus query parameters in a canonical order"""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+class ResponseCache:
+    """
+    Cache of rendered JSON responses for read endpoints.
+
+    Entries live in a namespace ("users", "channels", "protocols"). Writes
+    invalidate a namespace by bumping its generation number, which is part
+    of every key: older entries simply stop being looked up and age out, and
+    a response computed concurrently with a write can never be stored under
+    the new generation. Every response carries an ETag so clients can
+    revalidate with If-None-Match and get a bodyless 304.
+
+    The cache is best-effort: backend errors are logged and the response is
+    computed from the database. With the memory backend each worker process
+    only sees its own invalidations, so run a shared Redis backend when the
+    API has several workers; the TTL bounds staleness either way.
+    """
+
+    def __init__(self, backend=None, ttl: float = 60, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: MemoryBackend or RedisBackend (defaults to a MemoryBackend)
+            ttl: Seconds an entry stays valid, bounds staleness for writes made outside the API
+            enabled: When False every request is computed, ETags are still sent
+        """
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "invalidations": 0,
+            "errors": 0,
+        }
+
+    def hit_ratio(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    async def respond(self, request: Request, namespace: str, load: Callable[[], Awaitable]) -> Response:
+        """
+        Serve the request from the cache, computing it with `load` on a miss.
+
+        `load` returns anything FastAPI can encode; exceptions it raises
+        (e.g. HTTPException for a 404) propagate and nothing is cached.
+        """
+        key = None
+        cached = None
+        if self.enabled:
+            try:
+                generation = await self.backend.generation(namespace)
+                key = f"{namespace}:{generation}:{request_key(request)}"
+                cached = await self.backend.get(key)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Response cache lookup failed: {e}")
+                key = None
+
+        if cached is not None:
+            self.stats["hits"] += 1
+            etag, body = cached.decode().split("\n", 1)
+            body = body.encode()
+        else:
+            self.stats["misses"] += 1
+            data = jsonable_encoder(await load())
+            # Same encoding as FastAPI's JSONResponse
+            body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+            etag = make_etag(body)
+            if key is not None:
+                try:
+                    await self.backend.set(key, etag.encode() + b"\n" + body, self.ttl)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"Response cache store failed: {e}")
+
+        headers = {
+            "ETag": etag,
+            # Clients may keep the response but must revalidate it
+            "Cache-Control": "no-cache",
+            "X-Cache": "HIT" if cached is not None else "MISS",
+        }
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *namespaces: str):
+        """Drop every cached response in the given namespaces"""
+        for namespace in namespaces:
+            try:
+                await self.backend.bump(namespace)
+                self.stats["invalidations"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Response cache invalidation of {namespace} failed: {e}")
+
+    def invalidate_from_thread(self, *namespaces: str):
+        """`invalidate` for sync endpoints, which run in the threadpool"""
+        anyio.from_thread.run(self.invalidate, *namespaces)
+
+    async def close(self):
+        await self.backend.close()
+
+def create_response_cache() -> ResponseCache:
+    """ResponseCache configured from the RESPONSE_CACHE_* environment variables"""
+    redis_url = os.getenv("RESPONSE_CACHE_REDIS_URL")
+    if redis_url:
+        backend = RedisBackend(redis_url)
+    else:
+        backend = MemoryBackend(int(os.getenv("RESPONSE_CACHE_SIZE", "1024")))
+    return ResponseCache(
+        backend=backend,
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+        enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true",
+    )
+
+response_cache = create_response_cache()
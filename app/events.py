@@ -0,0 +1,69 @@
+import asyncio
+import json
+import logging
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class EventBroker:
+    """
+    In-process pub/sub feeding the /events Server-Sent Events stream.
+
+    Each subscriber gets a bounded queue. An event is serialized once and
+    the same frame is handed to every subscriber; a subscriber that falls
+    behind loses its oldest pending events rather than slowing down
+    publishers. `publish` may be called from request threads (sync
+    endpoints), delivery always happens on the event loop.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.stats = {
+            "published": 0,
+            "dropped": 0,
+        }
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach the broker to the application's event loop"""
+        self.loop = loop
+
+    def has_subscribers(self) -> bool:
+        return bool(self.subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data) -> None:
+        """Broadcast an event to all current subscribers"""
+        if self.loop is None or not self.subscribers:
+            return
+        frame = format_sse(event, data)
+        self.stats["published"] += 1
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._deliver(frame)
+        else:
+            self.loop.call_soon_threadsafe(self._deliver, frame)
+
+    def _deliver(self, frame: str):
+        for queue in list(self.subscribers):
+            if queue.full():
+                queue.get_nowait()
+                self.stats["dropped"] += 1
+            queue.put_nowait(frame)
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+broker = EventBroker()
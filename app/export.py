@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List
+
+from sqlalchemy import select
+
+from db.main import SessionLocal
+from db.models import DiscordMessage
+
+EXPORT_COLUMNS = [
+    DiscordMessage.id,
+    DiscordMessage.discord_id,
+    DiscordMessage.user_id,
+    DiscordMessage.channel_id,
+    DiscordMessage.content,
+    DiscordMessage.created_at,
+    DiscordMessage.stored_at,
+    DiscordMessage.sentiment_score,
+    DiscordMessage.protocol_name,
+    DiscordMessage.confidence,
+    DiscordMessage.technical_indicators,
+    DiscordMessage.risk_assessment,
+    DiscordMessage.community_consensus,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+def stream_messages(filters: List, format: str = "ndjson", batch_size: int = 1000) -> Iterator[str]:
+    """
+    Yield matching messages, oldest first, as NDJSON or CSV text chunks.
+
+    Rows are read through a server-side cursor `batch_size` at a time and
+    only plain column tuples are built, so memory stays constant however many
+    rows match. The generator opens its own session because it outlives the
+    request handler that created it.
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .where(*filters)
+        .order_by(DiscordMessage.created_at, DiscordMessage.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    db = SessionLocal()
+    try:
+        if format == "csv":
+            yield _csv_chunk([], header=True)
+        result = db.execute(stmt)
+        for rows in result.partitions():
+            yield _csv_chunk(rows) if format == "csv" else _ndjson_chunk(rows)
+    finally:
+        db.close()
@@ -1,18 +1,83 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, or_, exists, false
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, List, Optional
+import anyio.to_thread
+import asyncio
+import base64
 import json
+import os
 from fastapi.middleware.cors import CORSMiddleware
 
-from db.main import get_db
+from db.main import engine, async_engine, get_db, get_read_db, dialect_insert
 from app.types import (
     DiscordUserCreate, DiscordUserResponse,
     DiscordChannelCreate, DiscordChannelResponse,
-    DiscordMessageCreate, DiscordMessageResponse
+    DiscordMessageCreate, DiscordMessageResponse,
+    DiscordMessageBulkCreate, DiscordMessageBulkResponse,
+    DiscordIdLookup, DiscordIdLookupResponse,
+    SentimentBucket, ProtocolSignal,
+    FundOverview, FundUserShares, FundSharesLookup, FundSharesResponse, FundTokenStatus,
+    FundEventResponse
 )
-from db.models import DiscordUser, DiscordChannel, DiscordMessage
+from db.models import (
+    DiscordUser, DiscordChannel, DiscordMessage, Protocol, ProtocolSentimentRollup, FundEvent, IndexerCheckpoint
+)
+from db.protocols import ProtocolRef, protocol_registry
+from db.rollups import GRANULARITIES, apply_rollups
+from app.export import EXPORT_FORMATS, stream_messages
+from app.events import broker
+from app.cache import response_cache
+from app.signals import rank_signals, signal_store
+from app.blockchain.fund import FundReadError, fund_reader, normalize_address
+from app.metrics import MetricsMiddleware, instrument_pool, register_response_cache, render_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync endpoints and sync-mode queries share this threadpool (anyio default: 40)
+    threadpool_size = os.getenv("API_THREADPOOL_SIZE")
+    if threadpool_size:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(threadpool_size)
+    broker.bind(asyncio.get_running_loop())
+    yield
+    await response_cache.close()
+    if fund_reader is not None:
+        await fund_reader.close()
+
+app = FastAPI(title="CeloAIFund", lifespan=lifespan)
+
+# Prometheus metrics: per-route latency, pool checkout waits, cache hit ratio
+app.add_middleware(MetricsMiddleware)
+instrument_pool(engine, "sync")
+if async_engine is not None:
+    instrument_pool(async_engine.sync_engine, "async")
+register_response_cache(response_cache)
+
+# Session from get_read_db: a sync Session, or an AsyncSession when DB_ASYNC is set
+ReadSession = Any
 
-app = FastAPI(title="CeloAIFund")
+async def fetch_all(db: ReadSession, stmt) -> list:
+    """Run a SELECT on either session type and return the first column of every row"""
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(stmt).scalars().all())
+    return (await db.execute(stmt)).scalars().all()
+
+async def fetch_rows(db: ReadSession, stmt) -> list:
+    """Run a SELECT on either session type and return all rows"""
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(stmt).all())
+    return (await db.execute(stmt)).all()
+
+async def fetch_first(db: ReadSession, stmt):
+    """Run a SELECT on either session type and return the first column of the first row"""
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(stmt).scalars().first())
+    return (await db.execute(stmt)).scalars().first()
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,12 +86,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "X-Indexed-Block"],  # Let the frontend read pagination cursors
 )
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to CeloAIFund - AI-managed investment fund on Celo"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Discord User endpoints
 @app.post("/users/", response_model=DiscordUserResponse)
 def create_user(user: DiscordUserCreate, db: Session = Depends(get_db)):
@@ -39,18 +111,26 @@ def create_user(user: DiscordUserCreate, db: Session = Depends(get_db)):
         username=user.username
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently by another request
+        db.rollback()
+        return db.query(DiscordUser).filter(DiscordUser.discord_id == user.discord_id).one()
     db.refresh(db_user)
+    response_cache.invalidate_from_thread("users")
     return db_user
 
 @app.get("/users/", response_model=List[DiscordUserResponse])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(DiscordUser).all()
-    return users
+async def list_users(request: Request, db: ReadSession = Depends(get_read_db)):
+    async def load():
+        users = await fetch_all(db, select(DiscordUser))
+        return [DiscordUserResponse.model_validate(user) for user in users]
+    return await response_cache.respond(request, "users", load)
 
 @app.get("/users/{user_id}", response_model=DiscordUserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(DiscordUser).filter(DiscordUser.id == user_id).first()
+async def get_user(user_id: int, db: ReadSession = Depends(get_read_db)):
+    user = await fetch_first(db, select(DiscordUser).where(DiscordUser.id == user_id))
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -67,14 +147,26 @@ def create_channel(channel: DiscordChannelCreate, db: Session = Depends(get_db))
         name=channel.name
     )
     db.add(db_channel)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently by another request
+        db.rollback()
+        return db.query(DiscordChannel).filter(DiscordChannel.discord_id == channel.discord_id).one()
     db.refresh(db_channel)
+    response_cache.invalidate_from_thread("channels")
     return db_channel
 
 @app.get("/channels/", response_model=List[DiscordChannelResponse])
-def list_channels(db: Session = Depends(get_db)):
-    channels = db.query(DiscordChannel).all()
-    return channels
+async def list_channels(request: Request, db: ReadSession = Depends(get_read_db)):
+    async def load():
+        channels = await fetch_all(db, select(DiscordChannel))
+        return [DiscordChannelResponse.model_validate(channel) for channel in channels]
+    return await response_cache.respond(request, "channels", load)
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    """True if the error came from a foreign key constraint (PostgreSQL or SQLite)"""
+    return getattr(error.orig, "pgcode", None) == "23503" or "FOREIGN KEY" in str(error.orig)
 
 # Discord Message endpoints
 @app.post("/messages/", response_model=DiscordMessageResponse)
@@ -83,13 +175,16 @@ def create_message(message: DiscordMessageCreate, db: Session = Depends(get_db))
     if db_message:
         return db_message
     
+    # New protocols are written in this transaction, so a failed insert leaves none behind
+    protocol = protocol_registry.resolve(message.protocol_name, db)
     db_message = DiscordMessage(
         discord_id=message.discord_id,
         user_id=message.user_id,
         channel_id=message.channel_id,
         content=message.content,
         sentiment_score=message.sentiment_score,
-        protocol_name=message.protocol_name,
+        protocol_id=protocol.id if protocol else None,
+        protocol_name=protocol.name if protocol else None,
         confidence=message.confidence,
         technical_indicators=message.technical_indicators,
         risk_assessment=message.risk_assessment,
@@ -97,53 +192,517 @@ def create_message(message: DiscordMessageCreate, db: Session = Depends(get_db))
         created_at=message.created_at
     )
     db.add(db_message)
-    db.commit()
+    apply_rollups(db, [db_message])
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="User or channel not found")
+        # Stored concurrently by another request
+        existing = db.query(DiscordMessage).filter(DiscordMessage.discord_id == message.discord_id).first()
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_message)
+    response_cache.invalidate_from_thread("protocols")
+    publish_new_messages(db, [db_message])
     return db_message
 
-@app.get("/messages/", response_model=List[DiscordMessageResponse])
-def list_messages(limit: int = 100, db: Session = Depends(get_db)):
-    messages = db.query(DiscordMessage).order_by(DiscordMessage.created_at.desc()).limit(limit).all()
+def upsert_by_discord_id(db: Session, model, rows: dict) -> dict:
+    """
+    Insert rows keyed by discord_id that don't exist yet and return discord_id -> id for all of them.
+
+    Existing rows are left untouched, matching the single-item create endpoints.
+    """
+    if not rows:
+        return {}
+    # Sorted keys keep lock order stable across concurrent batches
+    values = [rows[discord_id] for discord_id in sorted(rows)]
+    stmt = dialect_insert(db, model).values(values)
+    stmt = stmt.on_conflict_do_nothing(index_elements=[model.discord_id])
+    stmt = stmt.returning(model.discord_id, model.id)
+    ids = {discord_id: id for discord_id, id in db.execute(stmt)}
+
+    existing = [discord_id for discord_id in rows if discord_id not in ids]
+    if existing:
+        ids.update(db.query(model.discord_id, model.id).filter(model.discord_id.in_(existing)).all())
+    return ids
+
+@app.post("/messages/bulk", response_model=DiscordMessageBulkResponse)
+def create_messages_bulk(batch: DiscordMessageBulkCreate, db: Session = Depends(get_db)):
+    """Store a batch of messages, creating their users and channels, in one transaction"""
+    if not batch.messages:
+        return DiscordMessageBulkResponse(received=0, inserted=0, duplicates=0, message_ids={})
+
+    # Free-text names from the LLM, mapped to canonical protocols once per distinct spelling;
+    # new protocols are written in this transaction and roll back with it
+    protocols = protocol_registry.resolve_many((m.protocol_name for m in batch.messages), db)
+
+    user_ids = upsert_by_discord_id(db, DiscordUser, {
+        m.author.discord_id: {"discord_id": m.author.discord_id, "username": m.author.username}
+        for m in batch.messages
+    })
+    channel_ids = upsert_by_discord_id(db, DiscordChannel, {
+        m.channel.discord_id: {"discord_id": m.channel.discord_id, "name": m.channel.name}
+        for m in batch.messages
+    })
+
+    rows = {}
+    for m in batch.messages:
+        protocol = protocols.get(m.protocol_name)
+        rows[m.discord_id] = {
+            "discord_id": m.discord_id,
+            "user_id": user_ids[m.author.discord_id],
+            "channel_id": channel_ids[m.channel.discord_id],
+            "content": m.content,
+            "sentiment_score": m.sentiment_score,
+            "protocol_id": protocol.id if protocol else None,
+            "protocol_name": protocol.name if protocol else None,
+            "confidence": m.confidence,
+            "technical_indicators": m.technical_indicators,
+            "risk_assessment": m.risk_assessment,
+            "community_consensus": m.community_consensus,
+            "created_at": m.created_at,
+        }
+    stmt = dialect_insert(db, DiscordMessage).values([rows[k] for k in sorted(rows)])
+    stmt = stmt.on_conflict_do_nothing(index_elements=[DiscordMessage.discord_id])
+    stmt = stmt.returning(DiscordMessage.discord_id, DiscordMessage.id)
+    message_ids = {discord_id: id for discord_id, id in db.execute(stmt)}
+    apply_rollups(db, [rows[discord_id] for discord_id in message_ids])
+    db.commit()
+    if message_ids:
+        response_cache.invalidate_from_thread("users", "channels", "protocols")
+    
+    if message_ids and broker.has_subscribers():
+        publish_new_messages(db, db.query(DiscordMessage).filter(
+            DiscordMessage.id.in_(message_ids.values())
+        ).order_by(DiscordMessage.created_at, DiscordMessage.id).all())
+
+    return DiscordMessageBulkResponse(
+        received=len(batch.messages),
+        inserted=len(message_ids),
+        duplicates=len(batch.messages) - len(message_ids),
+        message_ids=message_ids,
+    )
+
+@app.post("/messages/existing", response_model=DiscordIdLookupResponse)
+async def find_existing_messages(lookup: DiscordIdLookup, db: ReadSession = Depends(get_read_db)):
+    """Which of the given Discord message ids are already stored, for deduplicating backfills"""
+    if not lookup.discord_ids:
+        return DiscordIdLookupResponse(existing=[])
+    existing = await fetch_all(db, select(DiscordMessage.discord_id).where(
+        DiscordMessage.discord_id.in_(set(lookup.discord_ids))
+    ))
+    return DiscordIdLookupResponse(existing=existing)
+
+def encode_cursor(message: DiscordMessage) -> str:
+    """Opaque cursor pointing just past `message` in newest-first order"""
+    raw = json.dumps([message.created_at.isoformat(), message.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def paginate_messages(
+    db: ReadSession, response: Response, filters: list, limit: int, cursor: Optional[str]
+) -> list:
+    """
+    One page of messages, newest first, using keyset pagination on (created_at, id).
+
+    Each page is a range scan starting at the cursor, so deep pages cost the
+    same as the first one. When more messages follow, the cursor for the next
+    page is returned in the X-Next-Cursor header.
+    """
+    stmt = select(DiscordMessage).where(*filters)
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        # Written so the created_at bound alone can drive an index range scan
+        stmt = stmt.where(
+            DiscordMessage.created_at <= created_at,
+            or_(DiscordMessage.created_at < created_at, DiscordMessage.id < message_id),
+        )
+    stmt = stmt.order_by(DiscordMessage.created_at.desc(), DiscordMessage.id.desc()).limit(limit + 1)
+    
+    messages = await fetch_all(db, stmt)
+    if len(messages) > limit:
+        messages = messages[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(messages[-1])
     return messages
 
+@app.get("/messages/export")
+def export_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    channel_id: Optional[int] = None,
+    protocol_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = Query(1000, ge=1, le=50000),
+):
+    """Stream all matching messages with their sentiment analysis as NDJSON or CSV, oldest first"""
+    filters = message_filters(None, channel_id, since, until)
+    if protocol_name is not None:
+        protocol = protocol_registry.lookup(protocol_name)
+        filters.append(DiscordMessage.protocol_id == protocol.id if protocol else false())
+    return StreamingResponse(
+        stream_messages(filters, format, batch_size),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="messages.{format}"'},
+    )
+
+@app.get("/messages/", response_model=List[DiscordMessageResponse])
+async def list_messages(
+    response: Response,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    return await paginate_messages(db, response, [], limit, cursor)
+
 @app.get("/channels/{channel_id}/messages/", response_model=List[DiscordMessageResponse])
-def get_channel_messages(channel_id: int, limit: int = 100, db: Session = Depends(get_db)):
-    messages = db.query(DiscordMessage).filter(
-        DiscordMessage.channel_id == channel_id
-    ).order_by(DiscordMessage.created_at.desc()).limit(limit).all()
-    return messages
+async def get_channel_messages(
+    channel_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    return await paginate_messages(db, response, message_filters(channel_id=channel_id), limit, cursor)
 
 @app.get("/protocols/", response_model=List[str])
-def get_protocols(db: Session = Depends(get_db)):
+async def get_protocols(request: Request, db: ReadSession = Depends(get_read_db)):
     """Get a list of all protocols mentioned in messages"""
-    protocols = db.query(DiscordMessage.protocol_name).filter(
-        DiscordMessage.protocol_name.isnot(None)
-    ).distinct().all()
-    return [p[0] for p in protocols if p[0]]
+    async def load():
+        return await fetch_all(db, select(Protocol.name).where(
+            exists().where(DiscordMessage.protocol_id == Protocol.id)
+        ).order_by(Protocol.name))
+    return await response_cache.respond(request, "protocols", load)
+
+@app.get("/protocols/{protocol_name}/messages/", response_model=List[DiscordMessageResponse])
+async def get_protocol_messages(
+    protocol_name: str,
+    response: Response,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    """Messages mentioning a protocol, newest first"""
+    protocol = await find_protocol(protocol_name)
+    if protocol is None:
+        return []
+    return await paginate_messages(db, response, message_filters(protocol_id=protocol.id), limit, cursor)
+
+async def find_protocol(name: str) -> Optional[ProtocolRef]:
+    """Registered protocol for a name from a URL, accepting any of its aliases"""
+    return await run_in_threadpool(protocol_registry.lookup, name)
+
+def message_filters(
+    protocol_id: Optional[int] = None,
+    channel_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list:
+    """WHERE clauses selecting messages by protocol, channel and created_at window"""
+    filters = []
+    if protocol_id is not None:
+        filters.append(DiscordMessage.protocol_id == protocol_id)
+    if channel_id is not None:
+        filters.append(DiscordMessage.channel_id == channel_id)
+    if since is not None:
+        filters.append(DiscordMessage.created_at >= since)
+    if until is not None:
+        filters.append(DiscordMessage.created_at < until)
+    return filters
+
+def sentiment_summary_query(filters: list):
+    """
+    Single SELECT returning message count, average sentiment and confidence
+    and the newest message's content and risk assessment.
+
+    Missing scores count as 0 in the averages, as they always have.
+    """
+    latest = select(DiscordMessage.content).where(*filters).order_by(
+        DiscordMessage.created_at.desc(), DiscordMessage.id.desc()
+    ).limit(1).correlate(None)
+    return select(
+        func.count(DiscordMessage.id),
+        func.avg(func.coalesce(DiscordMessage.sentiment_score, 0.0)),
+        func.avg(func.coalesce(DiscordMessage.confidence, 0.0)),
+        latest.scalar_subquery(),
+        latest.with_only_columns(DiscordMessage.risk_assessment).scalar_subquery(),
+    ).where(*filters)
+
+def sentiment_summary(protocol_name: str, row) -> dict:
+    count, avg_sentiment, avg_confidence, latest_message, latest_risk = row
+    return {
+        "protocol": protocol_name,
+        "message_count": count,
+        "average_sentiment": float(avg_sentiment or 0),
+        "average_confidence": float(avg_confidence or 0),
+        "latest_message": latest_message,
+        "latest_risk_assessment": latest_risk
+    }
 
 @app.get("/protocols/{protocol_name}/sentiment", response_model=dict)
-def get_protocol_sentiment(protocol_name: str, db: Session = Depends(get_db)):
-    """Get average sentiment for a specific protocol"""
-    messages = db.query(DiscordMessage).filter(
-        DiscordMessage.protocol_name == protocol_name
-    ).all()
+async def get_protocol_sentiment(
+    protocol_name: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    channel_id: Optional[int] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    """Get average sentiment for a specific protocol, optionally within a time window or channel"""
+    async def load():
+        protocol = await find_protocol(protocol_name)
+        if protocol is None:
+            raise HTTPException(status_code=404, detail="Protocol not found")
+        filters = message_filters(protocol.id, channel_id, since, until)
+        row = (await fetch_rows(db, sentiment_summary_query(filters)))[0]
+        
+        if not row[0]:
+            raise HTTPException(status_code=404, detail="Protocol not found")
+        
+        return sentiment_summary(protocol.name, row)
+    return await response_cache.respond(request, "protocols", load)
+
+@app.get("/protocols/{protocol_name}/sentiment/timeseries", response_model=List[SentimentBucket])
+async def get_protocol_sentiment_timeseries(
+    protocol_name: str,
+    granularity: str = Query("1h", pattern="^(" + "|".join(GRANULARITIES) + ")$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    """Sentiment per time bucket for a protocol, read from the precomputed rollups"""
+    protocol = await find_protocol(protocol_name)
+    if protocol is None:
+        return []
+    stmt = select(ProtocolSentimentRollup).where(
+        ProtocolSentimentRollup.protocol_name == protocol.name,
+        ProtocolSentimentRollup.granularity == granularity,
+    )
+    if since is not None:
+        stmt = stmt.where(ProtocolSentimentRollup.bucket_start >= since)
+    if until is not None:
+        stmt = stmt.where(ProtocolSentimentRollup.bucket_start < until)
+    buckets = await fetch_all(db, stmt.order_by(ProtocolSentimentRollup.bucket_start))
     
-    if not messages:
-        raise HTTPException(status_code=404, detail="Protocol not found")
+    def average(total, count):
+        return total / count if count else None
     
-    # Calculate average sentiment
-    total_sentiment = sum(m.sentiment_score or 0 for m in messages)
-    avg_sentiment = total_sentiment / len(messages) if messages else 0
+    return [
+        SentimentBucket(
+            bucket_start=b.bucket_start,
+            message_count=b.message_count,
+            average_sentiment=average(b.sentiment_sum, b.sentiment_count),
+            average_confidence=average(b.confidence_sum, b.confidence_count),
+            average_community_consensus=average(b.consensus_sum, b.consensus_count),
+        )
+        for b in buckets
+    ]
+
+@app.get("/signals/protocols", response_model=List[ProtocolSignal])
+async def get_protocol_signals(
+    request: Request,
+    half_life_hours: float = Query(24.0, gt=0),
+    short_half_life_hours: float = Query(6.0, gt=0),
+    long_half_life_hours: float = Query(72.0, gt=0),
+    prior_weight: float = Query(2.0, ge=0),
+    min_messages: int = Query(3, ge=1),
+    limit: int = Query(50, ge=1, le=1000),
+    db: ReadSession = Depends(get_read_db),
+):
+    """
+    All protocols ranked by confidence-weighted, time-decayed sentiment,
+    with short/long EWMAs and momentum, computed in one vectorized pass
+    over the in-memory signal store.
+    """
+    async def load():
+        await signal_store.refresh(lambda stmt: fetch_rows(db, stmt))
+        signals = signal_store.compute(
+            half_life_hours=half_life_hours,
+            short_half_life_hours=short_half_life_hours,
+            long_half_life_hours=long_half_life_hours,
+            prior_weight=prior_weight,
+        )
+        return rank_signals(signal_store.protocols, signals, min_messages, limit)
+    return await response_cache.respond(request, "protocols", load)
+
+# Live updates
+SSE_HEARTBEAT_SECONDS = 15
+
+def publish_new_messages(db: Session, messages: list):
+    """Push newly stored messages and their protocols' updated aggregates to /events subscribers"""
+    if not messages or not broker.has_subscribers():
+        return
+    for message in messages:
+        broker.publish("message", DiscordMessageResponse.model_validate(message).model_dump(mode="json"))
+    for protocol_id, protocol_name in sorted({(m.protocol_id, m.protocol_name) for m in messages if m.protocol_id}):
+        row = db.execute(sentiment_summary_query(message_filters(protocol_id))).one()
+        broker.publish("protocol_sentiment", sentiment_summary(protocol_name, row))
+
+@app.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream of new messages ("message") and updated
+    protocol aggregates ("protocol_sentiment"), replacing client polling.
+    """
+    queue = broker.subscribe()
     
-    # Calculate average confidence
-    total_confidence = sum(m.confidence or 0 for m in messages)
-    avg_confidence = total_confidence / len(messages) if messages else 0
+    async def frames():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    frame = ": keepalive\n\n"
+                yield frame
+        finally:
+            broker.unsubscribe(queue)
     
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Response cache counters and hit ratio for this API process"""
     return {
-        "protocol": protocol_name,
-        "message_count": len(messages),
-        "average_sentiment": avg_sentiment,
-        "average_confidence": avg_confidence,
-        "latest_message": messages[0].content if messages else None,
-        "latest_risk_assessment": messages[0].risk_assessment if messages else None
-    } 
\ No newline at end of file
+        "backend": response_cache.backend.name,
+        "enabled": response_cache.enabled,
+        "hit_ratio": response_cache.hit_ratio(),
+        **response_cache.stats,
+    }
+
+# On-chain fund state
+async def read_fund(read):
+    """Run a FundReader call, mapping its failures to HTTP errors"""
+    if fund_reader is None:
+        raise HTTPException(status_code=503, detail="Fund reader not configured (set FUND_RPC_URL and FUND_ADDRESS)")
+    try:
+        return await read(fund_reader)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except FundReadError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.get("/fund/", response_model=FundOverview)
+async def get_fund(block: Optional[int] = Query(None, ge=0)):
+    """Fund-wide state at the latest (or the given) block"""
+    state = await read_fund(lambda reader: reader.overview(block))
+    for key in ("total_shares", "total_supply", "allocated_token"):
+        state[key] = str(state[key])
+    return state
+
+@app.get("/fund/users/{address}", response_model=FundUserShares)
+async def get_fund_user(address: str, block: Optional[int] = Query(None, ge=0)):
+    state = await read_fund(lambda reader: reader.shares([address], block))
+    (address, shares), = state["shares"].items()
+    total_shares = state["total_shares"]
+    return {
+        "address": address,
+        "block_number": state["block_number"],
+        "shares": str(shares),
+        "total_shares": str(total_shares),
+        "share_of_fund": shares / total_shares if total_shares else 0.0,
+    }
+
+@app.get("/fund/users/{address}/history", response_model=List[FundEventResponse])
+async def get_fund_user_history(
+    address: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: ReadSession = Depends(get_read_db),
+):
+    """
+    Deposits and withdrawals of a user (or allocations to them), newest
+    first, from the event indexer. Pages use keyset pagination on
+    (block_number, log_index) with the cursor in X-Next-Cursor; X-Indexed-Block
+    tells how far the indexer has got.
+    """
+    if fund_reader is None:
+        raise HTTPException(status_code=503, detail="Fund reader not configured (set FUND_RPC_URL and FUND_ADDRESS)")
+    try:
+        address = normalize_address(address)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    stmt = select(FundEvent).where(FundEvent.contract_address == fund_reader.address, FundEvent.account == address)
+    if cursor:
+        block_number, log_index = decode_fund_cursor(cursor)
+        stmt = stmt.where(
+            FundEvent.block_number <= block_number,
+            or_(FundEvent.block_number < block_number, FundEvent.log_index < log_index),
+        )
+    stmt = stmt.order_by(FundEvent.block_number.desc(), FundEvent.log_index.desc()).limit(limit + 1)
+    events = await fetch_all(db, stmt)
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers["X-Next-Cursor"] = encode_fund_cursor(events[-1])
+    
+    checkpoint = await fetch_first(
+        db, select(IndexerCheckpoint.last_block).where(IndexerCheckpoint.name == f"fund:{fund_reader.address}")
+    )
+    if checkpoint is not None:
+        response.headers["X-Indexed-Block"] = str(checkpoint)
+    return [fund_event_response(event) for event in events]
+
+def encode_fund_cursor(event: FundEvent) -> str:
+    raw = json.dumps([event.block_number, event.log_index])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_fund_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        block_number, log_index = json.loads(base64.urlsafe_b64decode(padded))
+        return int(block_number), int(log_index)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def fund_event_response(event: FundEvent) -> dict:
+    # uint256 amounts as decimal strings, like the live /fund/ endpoints
+    return {
+        "event": event.event,
+        "account": event.account,
+        "amount": str(int(event.amount)) if event.amount is not None else None,
+        "shares_after": str(int(event.shares_after)) if event.shares_after is not None else None,
+        "block_number": event.block_number,
+        "block_time": event.block_time,
+        "transaction_hash": event.transaction_hash,
+        "log_index": event.log_index,
+    }
+
+@app.post("/fund/users/shares", response_model=FundSharesResponse)
+async def get_fund_shares(lookup: FundSharesLookup, block: Optional[int] = Query(None, ge=0)):
+    """Shares of many users in one request, e.g. for a leaderboard"""
+    state = await read_fund(lambda reader: reader.shares(lookup.addresses, block))
+    return {
+        "block_number": state["block_number"],
+        "total_shares": str(state["total_shares"]),
+        "shares": {address: str(shares) for address, shares in state["shares"].items()},
+    }
+
+@app.get("/fund/tokens/{address}", response_model=FundTokenStatus)
+async def get_fund_token(address: str, block: Optional[int] = Query(None, ge=0)):
+    state = await read_fund(lambda reader: reader.whitelisted([address], block))
+    (token, whitelisted), = state["tokens"].items()
+    return {"token": token, "block_number": state["block_number"], "whitelisted": whitelisted}
+
+@app.get("/fund/stats")
+def get_fund_stats():
+    """Fund reader cache and RPC counters for this API process"""
+    if fund_reader is None:
+        return {"configured": False}
+    return {"configured": True, "multicall": fund_reader.multicall is not None, **fund_reader.stats}
@@ -0,0 +1,136 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "api_request_duration_seconds",
+    "Time to serve an API request, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("api_requests_in_progress", "API requests currently being served")
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts", "Pool checkouts that gave up after DB_POOL_TIMEOUT", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out", ["engine"])
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route template (/users/{user_id})
+    rather than the raw path to keep label cardinality bounded. The duration
+    runs until the response body is complete, so streaming routes report
+    the length of the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route.path if route is not None else "unmatched", str(status)
+            ).observe(time.perf_counter() - start)
+
+def timed_pool_class(base: type, name: str) -> type:
+    """
+    Subclass of a pool class timing Pool.connect(), which is where a
+    checkout waits when all DB_POOL_SIZE + DB_MAX_OVERFLOW connections are
+    in use.
+    """
+    class TimedPool(base):
+        metrics_name = name
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            except PoolTimeoutError:
+                DB_POOL_TIMEOUTS.labels(self.metrics_name).inc()
+                raise
+            finally:
+                DB_POOL_CHECKOUT_SECONDS.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+def instrument_pool(engine, name: str):
+    """
+    Time connection checkouts from an engine's pool.
+
+    The pool's class is swapped for a timed subclass. Pool.recreate() (used
+    by engine.dispose()) builds the replacement from the same class, so the
+    timing survives pool recreation.
+    """
+    pool = engine.pool
+    if getattr(pool, "metrics_name", None) != name:
+        pool.__class__ = timed_pool_class(type(pool), name)
+    if hasattr(pool, "checkedout"):
+        # engine.pool, not pool: dispose() swaps in a new pool object
+        DB_POOL_CHECKED_OUT.labels(name).set_function(lambda: engine.pool.checkedout())
+
+class ResponseCacheCollector:
+    """Exports the response cache counters and hit ratio at scrape time"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats
+        lookups = CounterMetricFamily(
+            "api_response_cache_lookups", "Response cache lookups by result", labels=["result"]
+        )
+        lookups.add_metric(["hit"], stats["hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield CounterMetricFamily(
+            "api_response_cache_not_modified", "Responses answered with 304 Not Modified", value=stats["not_modified"]
+        )
+        yield CounterMetricFamily(
+            "api_response_cache_invalidations", "Namespace invalidations by writes", value=stats["invalidations"]
+        )
+        yield CounterMetricFamily(
+            "api_response_cache_errors", "Cache backend errors", value=stats["errors"]
+        )
+        yield GaugeMetricFamily(
+            "api_response_cache_hit_ratio", "Share of lookups served from the cache", value=self.cache.hit_ratio()
+        )
+
+_response_cache_collector = None
+
+def register_response_cache(cache):
+    """Export `cache` on the default registry, replacing a previously registered cache"""
+    global _response_cache_collector
+    if _response_cache_collector is not None:
+        REGISTRY.unregister(_response_cache_collector)
+    _response_cache_collector = ResponseCacheCollector(cache)
+    REGISTRY.register(_response_cache_collector)
+
+def render_metrics():
+    """Body and content type of a Prometheus scrape"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, or_, select
+
+from db.models import DiscordMessage, ProtocolAlias
+
+logger = logging.getLogger(__name__)
+
+def decayed_average(
+    protocol: np.ndarray,
+    values: np.ndarray,
+    weights: np.ndarray,
+    n_protocols: int,
+):
+    """Weighted mean of `values` per protocol code, skipping NaNs; returns (means, weight sums)"""
+    present = ~np.isnan(values)
+    if not present.all():
+        protocol, values, weights = protocol[present], values[present], weights[present]
+    weight_sums = np.bincount(protocol, weights=weights, minlength=n_protocols)
+    totals = np.bincount(protocol, weights=weights * values, minlength=n_protocols)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / weight_sums
+    return means, weight_sums
+
+def compute_signals(
+    protocol: np.ndarray,
+    timestamp: np.ndarray,
+    sentiment: np.ndarray,
+    confidence: np.ndarray,
+    consensus: np.ndarray,
+    n_protocols: int,
+    now: float,
+    half_life_hours: float = 24.0,
+    short_half_life_hours: float = 6.0,
+    long_half_life_hours: float = 72.0,
+    prior_weight: float = 2.0,
+    default_confidence: float = 0.5,
+) -> Dict[str, np.ndarray]:
+    """
+    Per-protocol signals over columnar message data, all protocols at once.
+
+    Every message weighs `confidence * 0.5 ** (age / half_life)`, so recent,
+    confident calls dominate. Over irregularly spaced messages that weighted
+    mean is the continuous-time EWMA of sentiment; the short and long
+    half-life variants give `ewma_short` and `ewma_long`, and their
+    difference is `momentum`. `signal` is the decayed score shrunk towards
+    neutral by `weight / (weight + prior_weight)`, so a protocol needs a
+    few recent confident messages before it can rank high. Each statistic
+    is a couple of `np.bincount` passes over the arrays, O(rows) with no
+    Python loop over protocols or messages.
+
+    Args:
+        protocol: Protocol code of each message (0 .. n_protocols - 1)
+        timestamp: Message time in epoch seconds
+        sentiment: Sentiment score, -1.0 to 1.0
+        confidence: Analysis confidence, 0.0 to 1.0 (NaN: default_confidence)
+        consensus: Community consensus, 0.0 to 1.0 (NaN: ignored)
+        n_protocols: Number of protocol codes
+        now: Reference time in epoch seconds
+        half_life_hours: Decay half-life of the main score
+        short_half_life_hours: Half-life of the fast EWMA
+        long_half_life_hours: Half-life of the slow EWMA
+        prior_weight: Pseudo-weight of a neutral prior
+        default_confidence: Confidence assumed for messages without one
+
+    Returns:
+        Arrays indexed by protocol code
+    """
+    age_hours = np.maximum(now - timestamp, 0.0) / 3600.0
+    confidence = np.clip(np.where(np.isnan(confidence), default_confidence, confidence), 0.0, 1.0)
+
+    def weights(half_life: float) -> np.ndarray:
+        return confidence * np.exp2(-age_hours / half_life)
+
+    main_weights = weights(half_life_hours)
+    score, weight = decayed_average(protocol, sentiment, main_weights, n_protocols)
+    ewma_short, _ = decayed_average(protocol, sentiment, weights(short_half_life_hours), n_protocols)
+    ewma_long, _ = decayed_average(protocol, sentiment, weights(long_half_life_hours), n_protocols)
+    consensus, _ = decayed_average(protocol, consensus, main_weights, n_protocols)
+
+    last_timestamp = np.full(n_protocols, -np.inf)
+    np.maximum.at(last_timestamp, protocol, timestamp)
+
+    # weight underflows to 0 for long-silent protocols; with no prior that is 0 / 0
+    shrink = np.divide(weight, weight + prior_weight, out=np.zeros_like(weight), where=weight + prior_weight > 0)
+    return {
+        "signal": np.nan_to_num(score) * shrink,
+        "score": score,
+        "ewma_short": ewma_short,
+        "ewma_long": ewma_long,
+        "momentum": ewma_short - ewma_long,
+        "consensus": consensus,
+        "weight": weight,
+        "message_count": np.bincount(protocol, minlength=n_protocols),
+        "last_timestamp": last_timestamp,
+    }
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+def rank_signals(
+    protocols: List[str],
+    signals: Dict[str, np.ndarray],
+    min_messages: int = 1,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """Protocols ordered by signal, strongest first, as response rows"""
+    eligible = np.flatnonzero(signals["message_count"] >= max(min_messages, 1))
+    order = eligible[np.argsort(-signals["signal"][eligible], kind="stable")]
+    if limit is not None:
+        order = order[:limit]
+    return [
+        {
+            "rank": rank,
+            "protocol": protocols[code],
+            "signal": float(signals["signal"][code]),
+            "score": _optional(signals["score"][code]),
+            "ewma_short": _optional(signals["ewma_short"][code]),
+            "ewma_long": _optional(signals["ewma_long"][code]),
+            "momentum": _optional(signals["momentum"][code]),
+            "consensus": _optional(signals["consensus"][code]),
+            "weight": float(signals["weight"][code]),
+            "message_count": int(signals["message_count"][code]),
+            "last_message_at": datetime.fromtimestamp(signals["last_timestamp"][code], tz=timezone.utc),
+        }
+        for rank, code in enumerate(order, start=1)
+    ]
+
+class SignalStore:
+    """
+    Columnar in-memory copy of the scored messages of the last `lookback_days`.
+
+    The first refresh loads every scored message in one bulk query straight
+    into NumPy arrays; later refreshes only fetch rows with a higher id or
+    stored in the last `overlap_seconds` (concurrent ingest transactions
+    can commit ids out of order), skipping ids already loaded, so keeping
+    the arrays current costs O(new messages) and computing signals never
+    waits on the database. Rows older than the lookback, whose decayed
+    weight is negligible, are dropped as they age out. When the protocol
+    aliases change (`python -m db.protocols merge` or `alias`), loaded rows
+    may carry outdated protocol names, so the store starts over.
+    """
+
+    def __init__(self, lookback_days: float = 90.0, overlap_seconds: float = 300.0):
+        self.lookback_days = lookback_days
+        self.overlap_seconds = overlap_seconds
+        self._lock = asyncio.Lock()
+        self.registry_version: Optional[int] = None
+        self.reset()
+
+    def reset(self):
+        """Drop all loaded rows; the next refresh reloads the lookback window"""
+        self.protocols: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.last_id = 0
+        # Epoch stored_at of the newest row seen, and ids stored since watermark - overlap_seconds
+        self.watermark: Optional[float] = None
+        self._recent: Dict[int, float] = {}
+        self.protocol = np.empty(0, dtype=np.int64)
+        self.timestamp = np.empty(0, dtype=np.float64)
+        self.sentiment = np.empty(0, dtype=np.float64)
+        self.confidence = np.empty(0, dtype=np.float64)
+        self.consensus = np.empty(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def cutoff(self, now: float) -> float:
+        return now - self.lookback_days * 86400
+
+    def new_rows_query(self, now: float):
+        """Scored messages added since the last refresh, in the array column order"""
+        return (
+            select(
+                DiscordMessage.id,
+                DiscordMessage.protocol_name,
+                func.extract("epoch", DiscordMessage.created_at),
+                DiscordMessage.sentiment_score,
+                DiscordMessage.confidence,
+                DiscordMessage.community_consensus,
+                func.extract("epoch", DiscordMessage.stored_at),
+            )
+            .where(
+                self._new_rows_filter(),
+                DiscordMessage.protocol_name.is_not(None),
+                DiscordMessage.sentiment_score.is_not(None),
+                DiscordMessage.created_at >= datetime.fromtimestamp(self.cutoff(now), tz=timezone.utc),
+            )
+            .order_by(DiscordMessage.id)
+        )
+
+    def _new_rows_filter(self):
+        if self.watermark is None:
+            return DiscordMessage.id > self.last_id
+        overlap_start = datetime.fromtimestamp(self.watermark - self.overlap_seconds, tz=timezone.utc)
+        return or_(DiscordMessage.id > self.last_id, DiscordMessage.stored_at >= overlap_start)
+
+    def registry_query(self):
+        """Alias to protocol mapping, whose changes invalidate the loaded protocol names"""
+        return select(ProtocolAlias.alias, ProtocolAlias.protocol_id).order_by(ProtocolAlias.alias)
+
+    def append(self, rows: list):
+        """Add (id, protocol_name, epoch, sentiment, confidence, consensus, stored_at epoch) rows"""
+        rows = [row for row in rows if row[0] not in self._recent]
+        if not rows:
+            return
+        stored = [float(row[6]) for row in rows if row[6] is not None]
+        if stored:
+            self.watermark = max(self.watermark or 0.0, max(stored))
+        if self.watermark is not None:
+            overlap_start = self.watermark - self.overlap_seconds
+            self._recent = {id: at for id, at in self._recent.items() if at >= overlap_start}
+            for row in rows:
+                if row[6] is not None and float(row[6]) >= overlap_start:
+                    self._recent[row[0]] = float(row[6])
+        ids, names, timestamps, sentiment, confidence, consensus, _ = zip(*rows)
+        codes = self._codes
+        for name in set(names) - codes.keys():
+            codes[name] = len(self.protocols)
+            self.protocols.append(name)
+        # None becomes NaN in float arrays
+        self.protocol = np.concatenate([self.protocol, np.fromiter((codes[n] for n in names), np.int64, len(names))])
+        self.timestamp = np.concatenate([self.timestamp, np.array(timestamps, dtype=np.float64)])
+        self.sentiment = np.concatenate([self.sentiment, np.array(sentiment, dtype=np.float64)])
+        self.confidence = np.concatenate([self.confidence, np.array(confidence, dtype=np.float64)])
+        self.consensus = np.concatenate([self.consensus, np.array(consensus, dtype=np.float64)])
+        self.last_id = max(self.last_id, max(ids))
+
+    def prune(self, now: float):
+        keep = self.timestamp >= self.cutoff(now)
+        if not keep.all():
+            for name in ("protocol", "timestamp", "sentiment", "confidence", "consensus"):
+                setattr(self, name, getattr(self, name)[keep])
+
+    async def refresh(self, fetch: Callable[..., Awaitable[list]], now: Optional[float] = None):
+        """
+        Pull new messages into the arrays.
+
+        Args:
+            fetch: Runs a SELECT and returns its rows, e.g. app.main.fetch_rows bound to a session
+            now: Reference time in epoch seconds (default: the current time)
+        """
+        now = time.time() if now is None else now
+        async with self._lock:
+            start = time.perf_counter()
+            version = hash(tuple(await fetch(self.registry_query())))
+            if version != self.registry_version:
+                if self.registry_version is not None:
+                    logger.info("Protocol aliases changed, reloading the signal store")
+                self.reset()
+                self.registry_version = version
+            rows = await fetch(self.new_rows_query(now))
+            self.append(rows)
+            self.prune(now)
+            if rows:
+                logger.debug(f"Signal store: {len(rows)} new rows, {len(self)} total in {time.perf_counter() - start:.3f}s")
+
+    def compute(self, now: Optional[float] = None, **params) -> Dict[str, np.ndarray]:
+        """compute_signals over the stored arrays; params as in compute_signals"""
+        return compute_signals(
+            self.protocol,
+            self.timestamp,
+            self.sentiment,
+            self.confidence,
+            self.consensus,
+            len(self.protocols),
+            time.time() if now is None else now,
+            **params,
+        )
+
+signal_store = SignalStore(
+    float(os.getenv("SIGNAL_LOOKBACK_DAYS", "90")),
+    float(os.getenv("SIGNAL_REFRESH_OVERLAP_SECONDS", "300")),
+)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 # Discord User models
 class DiscordUserBase(BaseModel):
@@ -61,4 +61,97 @@ class DiscordMessageResponse(DiscordMessageBase):
     stored_at: datetime
     
     class Config:
-        from_attributes = True 
+        from_attributes = True
+
+# Bulk ingest models
+MAX_BULK_MESSAGES = 1000
+
+class DiscordMessageBulkItem(DiscordMessageBase):
+    author: DiscordUserCreate
+    channel: DiscordChannelCreate
+    sentiment_score: Optional[float] = None
+    protocol_name: Optional[str] = None
+    confidence: Optional[float] = None
+    technical_indicators: Optional[str] = None
+    risk_assessment: Optional[str] = None
+    community_consensus: Optional[float] = None
+
+class DiscordMessageBulkCreate(BaseModel):
+    messages: List[DiscordMessageBulkItem] = Field(max_length=MAX_BULK_MESSAGES)
+
+class DiscordMessageBulkResponse(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+    message_ids: Dict[str, int]  # discord_id -> id of newly inserted messages
+
+class DiscordIdLookup(BaseModel):
+    discord_ids: List[str] = Field(max_length=MAX_BULK_MESSAGES)
+
+class DiscordIdLookupResponse(BaseModel):
+    existing: List[str]  # the requested discord_ids that are already stored
+
+# Sentiment time series
+class SentimentBucket(BaseModel):
+    bucket_start: datetime
+    message_count: int
+    average_sentiment: Optional[float] = None
+    average_confidence: Optional[float] = None
+    average_community_consensus: Optional[float] = None
+
+# Ranked protocol signals
+class ProtocolSignal(BaseModel):
+    rank: int
+    protocol: str
+    signal: float  # decayed score shrunk towards 0 when there is little recent evidence
+    score: Optional[float] = None  # confidence-weighted, time-decayed sentiment
+    ewma_short: Optional[float] = None
+    ewma_long: Optional[float] = None
+    momentum: Optional[float] = None  # ewma_short - ewma_long
+    consensus: Optional[float] = None
+    weight: float  # sum of decayed confidence weights behind the score
+    message_count: int
+    last_message_at: datetime
+
+# On-chain Fund state. Token amounts are uint256 and exceed JavaScript's
+# safe integer range, so they are returned as decimal strings.
+MAX_FUND_ADDRESSES = 500
+
+class FundOverview(BaseModel):
+    address: str
+    block_number: int
+    owner: str
+    token: str
+    total_shares: str
+    total_supply: str
+    allocated_token: str
+
+class FundUserShares(BaseModel):
+    address: str
+    block_number: int
+    shares: str
+    total_shares: str
+    share_of_fund: float  # shares / total_shares, 0 when the fund is empty
+
+class FundSharesLookup(BaseModel):
+    addresses: List[str] = Field(min_length=1, max_length=MAX_FUND_ADDRESSES)
+
+class FundSharesResponse(BaseModel):
+    block_number: int
+    total_shares: str
+    shares: Dict[str, str]  # checksummed address -> shares
+
+class FundTokenStatus(BaseModel):
+    token: str
+    block_number: int
+    whitelisted: bool
+
+class FundEventResponse(BaseModel):
+    event: str  # "deposit", "withdrawal", "allocation" or "token_whitelisted"
+    account: str
+    amount: Optional[str] = None
+    shares_after: Optional[str] = None
+    block_number: int
+    block_time: Optional[datetime] = None
+    transaction_hash: str
+    log_index: int
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Float, Numeric, Index,
+    PrimaryKeyConstraint, UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -35,7 +38,8 @@ class DiscordMessage(Base):
     
     # Sentiment analysis fields
     sentiment_score = Column(Float, nullable=True)  # -1.0 to 1.0
-    protocol_name = Column(String, nullable=True)
+    protocol_id = Column(Integer, ForeignKey("protocols.id"), nullable=True)
+    protocol_name = Column(String, nullable=True)  # canonical name of protocol_id
     confidence = Column(Float, nullable=True)
     technical_indicators = Column(Text, nullable=True)  # Store as JSON string
     risk_assessment = Column(String, nullable=True)
@@ -45,4 +49,92 @@ class DiscordMessage(Base):
     stored_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("DiscordUser", back_populates="messages")
-    channel = relationship("DiscordChannel", back_populates="messages") 
\ No newline at end of file
+    channel = relationship("DiscordChannel", back_populates="messages")
+    protocol = relationship("Protocol", back_populates="messages")
+    
+    # Newest-first listings, overall and per channel / protocol
+    __table_args__ = (
+        Index("ix_discord_messages_created_at", created_at.desc()),
+        Index("ix_discord_messages_channel_id_created_at", channel_id, created_at.desc()),
+        Index("ix_discord_messages_protocol_id_created_at", protocol_id, created_at.desc()),
+    )
+
+class Protocol(Base):
+    """Canonical protocol; messages reference it instead of the LLM's free-text name"""
+    __tablename__ = "protocols"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    aliases = relationship("ProtocolAlias", back_populates="protocol", cascade="all, delete-orphan")
+    messages = relationship("DiscordMessage", back_populates="protocol")
+
+class ProtocolAlias(Base):
+    """Spelling of a protocol name, keyed by db.protocols.normalize_protocol_name"""
+    __tablename__ = "protocol_aliases"
+
+    alias = Column(String, primary_key=True)
+    protocol_id = Column(Integer, ForeignKey("protocols.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    protocol = relationship("Protocol", back_populates="aliases")
+
+class ProtocolSentimentRollup(Base):
+    """Per-protocol sentiment aggregates over fixed time buckets, maintained on ingest"""
+    __tablename__ = "protocol_sentiment_rollups"
+
+    protocol_name = Column(String, nullable=False)
+    granularity = Column(String, nullable=False)  # "1m", "1h" or "1d"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    
+    message_count = Column(Integer, nullable=False, default=0)
+    # Sums and counts of non-null values, so averages can be updated incrementally
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    consensus_sum = Column(Float, nullable=False, default=0.0)
+    consensus_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # The primary key doubles as the index for time range reads per protocol
+    __table_args__ = (
+        PrimaryKeyConstraint("protocol_name", "granularity", "bucket_start"),
+    )
+
+class FundEvent(Base):
+    """Fund contract activity indexed from chain logs, in chain order"""
+    __tablename__ = "fund_events"
+
+    id = Column(Integer, primary_key=True)
+    contract_address = Column(String(42), nullable=False)
+    event = Column(String, nullable=False)  # "deposit", "withdrawal", "allocation" or "token_whitelisted"
+    # Depositor / withdrawer, allocation recipient, or whitelisted token
+    account = Column(String(42), nullable=False)
+    amount = Column(Numeric(78, 0), nullable=True)  # uint256 in token base units
+    shares_after = Column(Numeric(78, 0), nullable=True)  # account's shares after a deposit or withdrawal
+    
+    block_number = Column(BigInteger, nullable=False)
+    block_hash = Column(String(66), nullable=False)
+    block_time = Column(DateTime(timezone=True), nullable=True)
+    transaction_hash = Column(String(66), nullable=False)
+    log_index = Column(Integer, nullable=False)
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("transaction_hash", "log_index", name="uq_fund_events_transaction_hash_log_index"),
+        # Per-user history, and rewinding everything above a block on reorgs
+        Index("ix_fund_events_contract_address_account_block_number", contract_address, account, block_number),
+        Index("ix_fund_events_contract_address_block_number", contract_address, block_number),
+    )
+
+class IndexerCheckpoint(Base):
+    """Last block an indexer has fully processed, with its hash for reorg detection"""
+    __tablename__ = "indexer_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_block = Column(BigInteger, nullable=False)
+    last_block_hash = Column(String(66), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,387 @@
+import argparse
+import difflib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.main import SessionLocal, dialect_insert
+from db.models import DiscordMessage, Protocol, ProtocolAlias
+
+logger = logging.getLogger(__name__)
+
+# Canonical names of the protocols the bot sees most, with common spellings
+SEED_PROTOCOLS = {
+    "Celo": ["celo network"],
+    "cUSD": ["celo dollar"],
+    "cEUR": ["celo euro"],
+    "cREAL": ["celo real"],
+    "Mento": ["mento protocol"],
+    "Ubeswap": ["ube"],
+    "Moola": ["moola market", "moo"],
+    "Mobius": ["mobius money"],
+    "Symmetric": [],
+    "Curve": ["curve finance", "crv"],
+    "Uniswap": ["uni"],
+    "SushiSwap": ["sushi"],
+    "Aave": [],
+    "Compound": ["comp"],
+    "Morpho": [],
+    "Valora": [],
+    "MiniPay": [],
+    "ImpactMarket": ["impact market", "pact"],
+    "GoodDollar": ["good dollar", "g$"],
+    "Allbridge": [],
+    "Wormhole": [],
+    "Squid": ["squid router"],
+    "Axelar": [],
+    "Glo Dollar": ["glo", "usdglo"],
+    "USDC": ["usd coin"],
+    "USDT": ["tether"],
+    "Beefy": ["beefy finance"],
+    "Toucan": ["toucan protocol"],
+    "Ethereum": ["eth"],
+    "Bitcoin": ["btc"],
+    "Optimism": ["op"],
+}
+
+# Trailing words that don't change which protocol is meant ("Curve Finance", "Celo Network")
+NAME_SUFFIXES = {"protocol", "finance", "network", "dao", "labs"}
+
+# What the LLM answers when a message isn't about any protocol
+NO_PROTOCOL = {"", "none", "null", "na", "nan", "unknown", "general", "various", "multiple"}
+
+def normalize_protocol_name(name: Optional[str]) -> str:
+    """Alias key of a protocol name: lower-case alphanumerics, without generic suffixes ('' for no protocol)"""
+    if not name:
+        return ""
+    words = re.findall(r"[a-z0-9$]+", name.lower())
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    key = "".join(words)
+    return "" if key in NO_PROTOCOL else key
+
+@dataclass(frozen=True)
+class ProtocolRef:
+    id: int
+    name: str
+
+class ProtocolResolver:
+    """
+    In-memory alias index: exact match on the normalized name, then fuzzy.
+
+    Fuzzy matching (difflib ratio >= `fuzzy_cutoff`) catches misspellings
+    such as "morho" for Morpho. It only applies to keys of at least
+    `min_fuzzy_length` characters, since short tickers are too close to
+    each other to be told apart by edit distance.
+    """
+
+    def __init__(self, fuzzy_cutoff: float = 0.85, min_fuzzy_length: int = 5):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.min_fuzzy_length = min_fuzzy_length
+        self.aliases: Dict[str, ProtocolRef] = {}
+
+    def add(self, alias: str, ref: ProtocolRef):
+        # Copy on write: other threads may be iterating the current dict
+        aliases = dict(self.aliases)
+        aliases[alias] = ref
+        self.aliases = aliases
+
+    def match(self, key: str) -> Tuple[Optional[ProtocolRef], bool]:
+        """Protocol for an alias key and whether it was an exact match"""
+        aliases = self.aliases
+        ref = aliases.get(key)
+        if ref is not None:
+            return ref, True
+        if len(key) >= self.min_fuzzy_length:
+            close = difflib.get_close_matches(key, aliases.keys(), n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return aliases[close[0]], False
+        return None, False
+
+class ProtocolRegistry(ProtocolResolver):
+    """
+    Resolver backed by the protocols and protocol_aliases tables.
+
+    The alias index is loaded once and kept in memory; a miss reloads it at
+    most every `refresh_interval` seconds to pick up protocols added by
+    other API workers. Lookups read the current dict without locking and
+    reloads swap in a new one, so they never wait on the database.
+
+    `resolve` is for ingest: names that match no alias register a new
+    protocol. A fuzzy match is only a candidate, logged with the command
+    that merges it, unless `auto_alias` is set; then it is saved as an
+    alias and the message counts for the matched protocol. `lookup` is for
+    reads, accepts fuzzy matches and never writes.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        refresh_interval: float = 30.0,
+        auto_alias: bool = False,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.auto_alias = auto_alias
+        self._loaded_at: Optional[float] = None
+        # Only one thread reloads at a time; the others keep using the current dict
+        self._load_lock = threading.Lock()
+        self.stats = {
+            "exact": 0,
+            "fuzzy": 0,
+            "created": 0,
+        }
+
+    def load(self):
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(ProtocolAlias.alias, Protocol.id, Protocol.name).join(
+                    Protocol, Protocol.id == ProtocolAlias.protocol_id
+                )
+            ).all()
+        finally:
+            db.close()
+        self.aliases = {alias: ProtocolRef(id, name) for alias, id, name in rows}
+        self._loaded_at = time.monotonic()
+
+    def _reload(self) -> bool:
+        """Reload if stale; returns False when fresh or another thread is already reloading"""
+        if self._loaded_at is None:
+            # Nothing to fall back on: wait for the first load
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self.load()
+            return True
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return False
+        if not self._load_lock.acquire(blocking=False):
+            return False
+        try:
+            self.load()
+        finally:
+            self._load_lock.release()
+        return True
+
+    def _match_fresh(self, key: str) -> Tuple[Optional[ProtocolRef], bool]:
+        if self._loaded_at is None:
+            self._reload()
+        ref, exact = self.match(key)
+        if not exact and self._reload():
+            ref, exact = self.match(key)
+        return ref, exact
+
+    def lookup(self, name: Optional[str]) -> Optional[ProtocolRef]:
+        """Registered protocol for a name, or None"""
+        key = normalize_protocol_name(name)
+        if not key:
+            return None
+        ref, _ = self._match_fresh(key)
+        return ref
+
+    def resolve(self, name: Optional[str], db: Optional[Session] = None) -> Optional[ProtocolRef]:
+        """
+        Protocol for a name from the LLM, registering it when it is new (None for no protocol).
+
+        Args:
+            name: Protocol name as given by the analysis
+            db: Session of the caller's transaction; new protocols and aliases
+                are written in it (in a savepoint) and disappear if it rolls
+                back. Without it they are committed in a session of their own.
+        """
+        key = normalize_protocol_name(name)
+        if not key:
+            return None
+        ref, exact = self._match_fresh(key)
+        if ref is not None and exact:
+            self.stats["exact"] += 1
+            return ref
+        if ref is not None:
+            self.stats["fuzzy"] += 1
+            if self.auto_alias:
+                logger.info(f"Protocol name {name!r} resolved to {ref.name!r}")
+                self._write(db, lambda session: self._save_alias(session, key, ref))
+                self._cache(db, key, ref)
+                return ref
+            logger.warning(
+                f"Protocol name {name!r} looks like {ref.name!r}; registering it separately. If they are "
+                f"the same, run: python -m db.protocols merge {name.strip()!r} {ref.name!r}"
+            )
+        try:
+            ref = self._write(db, lambda session: self._create(session, name.strip(), key))
+        except IntegrityError:
+            # Registered concurrently by another worker, or earlier in the caller's transaction
+            ref = self._read(db, lambda session: self._find(session, key))
+            if ref is None:
+                raise
+        self._cache(db, key, ref)
+        return ref
+
+    def resolve_many(
+        self, names: Iterable[Optional[str]], db: Optional[Session] = None
+    ) -> Dict[str, Optional[ProtocolRef]]:
+        # Sorted so concurrent batches insert new protocols in the same order
+        return {name: self.resolve(name, db) for name in sorted(set(names) - {None})}
+
+    def _write(self, db: Optional[Session], write):
+        if db is not None:
+            with db.begin_nested():
+                return write(db)
+        session = self.session_factory()
+        try:
+            result = write(session)
+            session.commit()
+            return result
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _read(self, db: Optional[Session], read):
+        if db is not None:
+            return read(db)
+        session = self.session_factory()
+        try:
+            return read(session)
+        finally:
+            session.close()
+
+    def _cache(self, db: Optional[Session], key: str, ref: ProtocolRef):
+        """Add an alias to the index now, or once the caller's transaction commits"""
+        if db is None:
+            self.add(key, ref)
+            return
+        pending = db.info.get("pending_protocol_aliases")
+        if pending is None:
+            pending = db.info["pending_protocol_aliases"] = {}
+            event.listen(db, "after_commit", self._after_commit)
+            event.listen(db, "after_rollback", self._after_rollback)
+        pending[key] = ref
+
+    def _after_commit(self, db: Session):
+        # Also fires when a savepoint is released
+        if db.in_nested_transaction():
+            return
+        pending = db.info["pending_protocol_aliases"]
+        for key, ref in pending.items():
+            self.add(key, ref)
+        pending.clear()
+
+    def _after_rollback(self, db: Session):
+        # Savepoint rollbacks too; dropped aliases are found again on the next miss
+        db.info["pending_protocol_aliases"].clear()
+
+    def _find(self, db: Session, key: str) -> Optional[ProtocolRef]:
+        row = db.execute(
+            select(Protocol.id, Protocol.name)
+            .join(ProtocolAlias, ProtocolAlias.protocol_id == Protocol.id)
+            .where(ProtocolAlias.alias == key)
+        ).first()
+        return ProtocolRef(*row) if row else None
+
+    def _save_alias(self, db: Session, key: str, ref: ProtocolRef):
+        stmt = dialect_insert(db, ProtocolAlias).values(alias=key, protocol_id=ref.id)
+        db.execute(stmt.on_conflict_do_nothing(index_elements=[ProtocolAlias.alias]))
+
+    def _create(self, db: Session, name: str, key: str) -> ProtocolRef:
+        protocol = Protocol(name=name)
+        db.add(protocol)
+        db.flush()
+        db.add(ProtocolAlias(alias=key, protocol_id=protocol.id))
+        db.flush()
+        self.stats["created"] += 1
+        logger.info(f"Registered new protocol {name!r}")
+        return ProtocolRef(protocol.id, name)
+
+protocol_registry = ProtocolRegistry(
+    refresh_interval=float(os.getenv("PROTOCOL_REFRESH_SECONDS", "30")),
+    auto_alias=os.getenv("PROTOCOL_FUZZY_AUTO_ALIAS", "false").lower() == "true",
+    fuzzy_cutoff=float(os.getenv("PROTOCOL_FUZZY_CUTOFF", "0.85")),
+)
+
+def seed_protocols(db: Session) -> int:
+    """Add SEED_PROTOCOLS and their aliases that aren't registered yet"""
+    added = 0
+    for name, aliases in SEED_PROTOCOLS.items():
+        protocol = db.execute(select(Protocol).where(Protocol.name == name)).scalar_one_or_none()
+        if protocol is None:
+            protocol = Protocol(name=name)
+            db.add(protocol)
+            db.flush()
+            added += 1
+        for alias in [name] + aliases:
+            stmt = dialect_insert(db, ProtocolAlias).values(
+                alias=normalize_protocol_name(alias), protocol_id=protocol.id
+            )
+            db.execute(stmt.on_conflict_do_nothing(index_elements=[ProtocolAlias.alias]))
+    return added
+
+def merge_protocols(db: Session, source: Protocol, target: Protocol) -> int:
+    """
+    Fold `source` into `target`: messages and aliases move over and
+    `source` is deleted. Returns the number of messages moved; rollups
+    of both names need a rebuild afterwards.
+    """
+    moved = db.execute(
+        update(DiscordMessage)
+        .where(DiscordMessage.protocol_id == source.id)
+        .values(protocol_id=target.id, protocol_name=target.name)
+    ).rowcount
+    db.execute(update(ProtocolAlias).where(ProtocolAlias.protocol_id == source.id).values(protocol_id=target.id))
+    db.execute(delete(Protocol).where(Protocol.id == source.id))
+    return moved
+
+def main():
+    from db.rollups import rebuild_rollups
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Manage the protocol registry")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("list", help="Show protocols and their aliases")
+    subcommands.add_parser("seed", help="Register the built-in protocols")
+    alias = subcommands.add_parser("alias", help="Map another spelling to a protocol")
+    alias.add_argument("alias")
+    alias.add_argument("protocol")
+    merge = subcommands.add_parser("merge", help="Fold a wrongly registered protocol into another")
+    merge.add_argument("source")
+    merge.add_argument("target")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            aliases: Dict[int, List[str]] = {}
+            for key, protocol_id in db.execute(select(ProtocolAlias.alias, ProtocolAlias.protocol_id)).all():
+                aliases.setdefault(protocol_id, []).append(key)
+            for protocol in db.execute(select(Protocol).order_by(Protocol.name)).scalars():
+                print(f"{protocol.id:>5}  {protocol.name:<24} {', '.join(sorted(aliases.get(protocol.id, [])))}")
+            return
+        if args.command == "seed":
+            logger.info(f"Registered {seed_protocols(db)} protocols")
+        elif args.command == "alias":
+            protocol = db.execute(select(Protocol).where(Protocol.name == args.protocol)).scalar_one()
+            db.merge(ProtocolAlias(alias=normalize_protocol_name(args.alias), protocol_id=protocol.id))
+        elif args.command == "merge":
+            source = db.execute(select(Protocol).where(Protocol.name == args.source)).scalar_one()
+            target = db.execute(select(Protocol).where(Protocol.name == args.target)).scalar_one()
+            moved = merge_protocols(db, source, target)
+            rebuild_rollups(db, args.source)
+            rebuild_rollups(db, args.target)
+            logger.info(f"Moved {moved} messages from {args.source} to {args.target}")
+        db.commit()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
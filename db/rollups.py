@@ -0,0 +1,153 @@
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from db.main import SessionLocal, dialect_insert
+from db.models import DiscordMessage, ProtocolSentimentRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("1m", "1h", "1d")
+
+METRICS = (
+    # (message field, rollup sum column, rollup count column)
+    ("sentiment_score", "sentiment_sum", "sentiment_count"),
+    ("confidence", "confidence_sum", "confidence_count"),
+    ("community_consensus", "consensus_sum", "consensus_count"),
+)
+
+RollupKey = Tuple[str, str, datetime]
+
+# Rows per upsert statement, keeps bound parameters well below driver limits
+WRITE_CHUNK = 2000
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    """Start of the UTC bucket containing `created_at` (naive datetimes are taken as UTC)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    created_at = created_at.astimezone(timezone.utc)
+    if granularity == "1m":
+        return created_at.replace(second=0, microsecond=0)
+    if granularity == "1h":
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "1d":
+        return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def _field(message, name: str):
+    return message[name] if isinstance(message, dict) else getattr(message, name)
+
+def accumulate(deltas: Dict[RollupKey, dict], messages: Iterable):
+    """Add messages (ORM objects or dicts) to per-bucket deltas for every granularity"""
+    for message in messages:
+        protocol_name = _field(message, "protocol_name")
+        created_at = _field(message, "created_at")
+        if not protocol_name or created_at is None:
+            continue
+        for granularity in GRANULARITIES:
+            key = (protocol_name, granularity, bucket_start(created_at, granularity))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = {
+                    "message_count": 0,
+                    **{column: 0.0 for _, column, _ in METRICS},
+                    **{count: 0 for _, _, count in METRICS},
+                }
+            delta["message_count"] += 1
+            for field, sum_column, count_column in METRICS:
+                value = _field(message, field)
+                if value is not None:
+                    delta[sum_column] += value
+                    delta[count_column] += 1
+    return deltas
+
+def write_deltas(db: Session, deltas: Dict[RollupKey, dict]):
+    """Upsert deltas, adding them to the counters of existing buckets"""
+    if not deltas:
+        return
+    rows = [
+        {"protocol_name": protocol_name, "granularity": granularity, "bucket_start": start, **delta}
+        # Sorted to keep lock order stable across concurrent writers
+        for (protocol_name, granularity, start), delta in sorted(deltas.items())
+    ]
+    table = ProtocolSentimentRollup.__table__
+    counters = ["message_count"] + [c for _, s, n in METRICS for c in (s, n)]
+    for i in range(0, len(rows), WRITE_CHUNK):
+        stmt = dialect_insert(db, ProtocolSentimentRollup).values(rows[i:i + WRITE_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.protocol_name, table.c.granularity, table.c.bucket_start],
+            set_={column: table.c[column] + stmt.excluded[column] for column in counters},
+        )
+        db.execute(stmt)
+
+def apply_rollups(db: Session, messages: Iterable):
+    """
+    Fold newly stored messages into the rollups.
+
+    Meant to run in the same transaction as the message insert, so rollups
+    and raw messages never disagree.
+    """
+    write_deltas(db, accumulate({}, messages))
+
+def rebuild_rollups(db: Session, protocol_name: Optional[str] = None, batch_size: int = 10000) -> int:
+    """
+    Recompute rollups from raw messages, for one protocol or all of them.
+
+    Streams discord_messages through a server-side cursor and aggregates in
+    memory (one entry per bucket), so it can repair the table or apply a
+    protocol merge. Returns the number of messages read.
+
+    Concurrent rollup writes (ingest) wait until the caller commits, so
+    no increment is lost between reading the messages and rewriting the
+    buckets; keep the transaction short and commit right away.
+    """
+    columns = [
+        DiscordMessage.protocol_name,
+        DiscordMessage.created_at,
+        *(getattr(DiscordMessage, field) for field, _, _ in METRICS),
+    ]
+    stmt = select(*columns).where(DiscordMessage.protocol_name.isnot(None))
+    clear = delete(ProtocolSentimentRollup)
+    if protocol_name is not None:
+        stmt = stmt.where(DiscordMessage.protocol_name == protocol_name)
+        clear = clear.where(ProtocolSentimentRollup.protocol_name == protocol_name)
+
+    # Taken before reading the messages: ingest that commits earlier is read, later ingest waits
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {ProtocolSentimentRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+    # On SQLite this first write takes the database write lock
+    db.execute(clear)
+
+    deltas: Dict[RollupKey, dict] = {}
+    total = 0
+    for rows in db.execute(stmt.execution_options(yield_per=batch_size)).partitions():
+        accumulate(deltas, (row._asdict() for row in rows))
+        total += len(rows)
+
+    write_deltas(db, deltas)
+    return total
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain protocol sentiment rollups")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser(
+        "rebuild", help="Recompute rollups from discord_messages (ingest waits on rollup writes until it finishes)"
+    )
+    rebuild.add_argument("--protocol", help="Only rebuild this protocol")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        total = rebuild_rollups(db, args.protocol)
+        db.commit()
+        logger.info(f"Rebuilt rollups from {total} messages")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,19 @@ export const getMessages = async (limit = 100) => {
   return response.data;
 };
 
+// One page of messages; pass the returned nextCursor to get the following page
+export const getMessagesPage = async (limit = 100, cursor = null) => {
+  const params = { limit };
+  if (cursor) {
+    params.cursor = cursor;
+  }
+  const response = await api.get('/messages/', { params });
+  return {
+    messages: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
+};
+
 export const getProtocols = async () => {
   const response = await api.get('/protocols/');
   return response.data;
@@ -34,4 +47,13 @@ export const getProtocolSentiment = async (protocolName) => {
   return response.data;
 };
 
+// Live updates over Server-Sent Events; returns a function that closes the stream
+export const subscribeEvents = (handlers) => {
+  const source = new EventSource(`${API_URL}/events`);
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+  });
+  return () => source.close();
+};
+
 export default api; 
\ No newline at end of file
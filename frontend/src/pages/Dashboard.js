@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getUsers, getMessages, getProtocols } from '../api/api';
+import { getUsers, getMessages, getProtocols, subscribeEvents } from '../api/api';
 import { getFundData } from '../api/web3';
 import { Chart as ChartJS, ArcElement, Tooltip, Legend, CategoryScale, LinearScale, PointElement, LineElement, Title } from 'chart.js';
 import { Pie, Line } from 'react-chartjs-2';
@@ -9,10 +9,10 @@ ChartJS.register(ArcElement, CategoryScale, LinearScale, PointElement, LineEleme
 export default function Dashboard() {
   const [stats, setStats] = useState({
     userCount: 0,
-    messageCount: 0,
-    protocolCount: 0,
     totalSupply: '0',
   });
+  const [messages, setMessages] = useState([]);
+  const [protocols, setProtocols] = useState([]);
   
   const [sentimentData, setSentimentData] = useState({
     labels: ['Positive', 'Neutral', 'Negative'],
@@ -81,52 +81,14 @@ export default function Dashboard() {
         
         setStats({
           userCount: users.length,
-          messageCount: messages.length,
-          protocolCount: protocols.length,
           totalSupply: fundData.totalSupply,
         });
-        
-        if (messages.length > 0) {
-          // Calculate sentiment distribution
-          const positive = messages.filter(m => m.sentiment_score > 0.2).length;
-          const negative = messages.filter(m => m.sentiment_score < -0.2).length;
-          const neutral = messages.length - positive - negative;
-          
-          setSentimentData(prevData => ({
-            ...prevData,
-            datasets: [
-              {
-                ...prevData.datasets[0],
-                data: [positive, neutral, negative],
-              },
-            ],
-          }));
-          
-          // Calculate message activity by day
-          const messageDates = messages.map(m => {
-            const date = new Date(m.created_at);
-            return date.toISOString().split('T')[0];
-          });
-          
-          // Count messages per day
-          const messageCounts = {};
-          messageDates.forEach(date => {
-            messageCounts[date] = (messageCounts[date] || 0) + 1;
-          });
-          
-          // Sort dates
-          const sortedDates = Object.keys(messageCounts).sort();
-          
-          setMessageActivity(prevData => ({
-            labels: sortedDates,
-            datasets: [
-              {
-                ...prevData.datasets[0],
-                data: sortedDates.map(date => messageCounts[date]),
-              },
-            ],
-          }));
-        }
+        // Keep anything the event stream delivered while these were loading
+        setMessages(current => [
+          ...current.filter(m => !messages.some(loaded => loaded.id === m.id)),
+          ...messages,
+        ]);
+        setProtocols(current => [...protocols, ...current.filter(p => !protocols.includes(p))]);
         
       } catch (error) {
         console.error('Error fetching dashboard data:', error);
@@ -138,6 +100,66 @@ export default function Dashboard() {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    // New messages and protocols are pushed by the API instead of refetching
+    return subscribeEvents({
+      message: (message) => {
+        setMessages(current => (
+          current.some(m => m.id === message.id) ? current : [message, ...current]
+        ));
+      },
+      protocol_sentiment: (summary) => {
+        setProtocols(current => (
+          current.includes(summary.protocol) ? current : [...current, summary.protocol]
+        ));
+      },
+    });
+  }, []);
+
+  useEffect(() => {
+    if (messages.length > 0) {
+      // Calculate sentiment distribution
+      const positive = messages.filter(m => m.sentiment_score > 0.2).length;
+      const negative = messages.filter(m => m.sentiment_score < -0.2).length;
+      const neutral = messages.length - positive - negative;
+      
+      setSentimentData(prevData => ({
+        ...prevData,
+        datasets: [
+          {
+            ...prevData.datasets[0],
+            data: [positive, neutral, negative],
+          },
+        ],
+      }));
+      
+      // Calculate message activity by day
+      const messageDates = messages.map(m => {
+        const date = new Date(m.created_at);
+        return date.toISOString().split('T')[0];
+      });
+      
+      // Count messages per day
+      const messageCounts = {};
+      messageDates.forEach(date => {
+        messageCounts[date] = (messageCounts[date] || 0) + 1;
+      });
+      
+      // Sort dates
+      const sortedDates = Object.keys(messageCounts).sort();
+      
+      setMessageActivity(prevData => ({
+        labels: sortedDates,
+        datasets: [
+          {
+            ...prevData.datasets[0],
+            data: sortedDates.map(date => messageCounts[date]),
+          },
+        ],
+      }));
+    }
+  }, [messages]);
+
   return (
     <div>
       <h1 className="text-2xl font-semibold text-gray-900">Dashboard</h1>
@@ -189,7 +211,7 @@ export default function Dashboard() {
                 <dl>
                   <dt className="text-sm font-medium text-gray-500 truncate">Total Messages</dt>
                   <dd>
-                    <div className="text-lg font-medium text-gray-900">{stats.messageCount}</div>
+                    <div className="text-lg font-medium text-gray-900">{messages.length}</div>
                   </dd>
                 </dl>
               </div>
@@ -209,7 +231,7 @@ export default function Dashboard() {
                 <dl>
                   <dt className="text-sm font-medium text-gray-500 truncate">Protocols Tracked</dt>
                   <dd>
-                    <div className="text-lg font-medium text-gray-900">{stats.protocolCount}</div>
+                    <div className="text-lg font-medium text-gray-900">{protocols.length}</div>
                   </dd>
                 </dl>
               </div>
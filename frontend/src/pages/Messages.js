@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getMessages, getUsers, getChannels } from '../api/api';
+import { getMessagesPage, getUsers, getChannels, subscribeEvents } from '../api/api';
 
 export default function Messages() {
   const [messages, setMessages] = useState([]);
@@ -7,6 +7,8 @@ export default function Messages() {
   const [channels, setChannels] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -14,7 +16,7 @@ export default function Messages() {
         setLoading(true);
         
         // Fetch messages, users, and channels
-        const messagesData = await getMessages(100);
+        const messagesPage = await getMessagesPage(100);
         const usersData = await getUsers();
         const channelsData = await getChannels();
         
@@ -29,7 +31,8 @@ export default function Messages() {
           channelsMap[channel.id] = channel;
         });
         
-        setMessages(messagesData);
+        setMessages(messagesPage.messages);
+        setNextCursor(messagesPage.nextCursor);
         setUsers(usersMap);
         setChannels(channelsMap);
         setLoading(false);
@@ -43,6 +46,30 @@ export default function Messages() {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    // New messages are pushed by the API instead of re-fetching the list
+    return subscribeEvents({
+      message: (message) => {
+        setMessages(current => (
+          current.some(m => m.id === message.id) ? current : [message, ...current]
+        ));
+      },
+    });
+  }, []);
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getMessagesPage(100, nextCursor);
+      setMessages(current => [...current, ...page.messages]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching more messages:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getSentimentColor = (sentiment) => {
     if (!sentiment && sentiment !== 0) return 'bg-gray-200';
     if (sentiment > 0.5) return 'bg-green-500';
@@ -142,6 +169,17 @@ export default function Messages() {
               );
             })}
           </ul>
+          {nextCursor && (
+            <div className="px-4 py-4 sm:px-6 text-center">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 text-sm font-medium rounded-md text-white bg-celo-green disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
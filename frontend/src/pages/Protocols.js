@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getProtocols, getProtocolSentiment } from '../api/api';
+import { getProtocols, getProtocolSentiment, subscribeEvents } from '../api/api';
 
 export default function Protocols() {
   const [protocols, setProtocols] = useState([]);
@@ -38,6 +38,18 @@ export default function Protocols() {
     fetchProtocols();
   }, []);
 
+  useEffect(() => {
+    // Updated aggregates are pushed by the API whenever a protocol gets new messages
+    return subscribeEvents({
+      protocol_sentiment: (summary) => {
+        setProtocols(current => (
+          current.includes(summary.protocol) ? current : [...current, summary.protocol]
+        ));
+        setProtocolDetails(current => ({ ...current, [summary.protocol]: summary }));
+      },
+    });
+  }, []);
+
   const getSentimentColor = (sentiment) => {
     if (!sentiment && sentiment !== 0) return 'bg-gray-200';
     if (sentiment > 0.5) return 'bg-green-500';
@@ -0,0 +1,129 @@
+"""
+Compare API throughput of per-call requests.post against the pooled ApiClient.
+
+The "before" run reproduces the old bot behaviour: every call is a blocking
+requests.post (a fresh TCP connection each time) pushed onto a worker
+thread. The "after" run sends the same calls through ApiClient's shared
+keep-alive pool. Both post the same user payload to /users/, which is
+idempotent, with the given concurrency. Pass --endpoint root to hit GET /
+instead and measure transport overhead without the database.
+
+    python scripts/bench_api_client.py --url http://localhost:8000 -n 2000 -c 20
+
+With --serve a local uvicorn instance is started against DATABASE_URL
+(tables are created if missing), e.g.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python scripts/bench_api_client.py --serve
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.api_client import ApiClient
+
+PAYLOAD = {"discord_id": "bench-user", "username": "bench"}
+
+async def run_requests(url: str, total: int, concurrency: int, endpoint: str) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def call():
+        # A new Session per call mirrors module-level requests.post
+        if endpoint == "root":
+            return requests.get(f"{url}/")
+        return requests.post(f"{url}/users/", json=PAYLOAD)
+
+    async def one():
+        async with semaphore:
+            response = await asyncio.to_thread(call)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+async def run_pooled(url: str, total: int, concurrency: int, endpoint: str, http2: bool) -> float:
+    api = ApiClient(url, max_connections=concurrency, max_keepalive_connections=concurrency, http2=http2)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            if endpoint == "root":
+                (await api.request("GET", "/")).raise_for_status()
+            else:
+                await api.create_user(PAYLOAD)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - start
+    finally:
+        await api.close()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve() -> (subprocess.Popen, str):
+    """Start the API with uvicorn on a free port and wait until it answers"""
+    from db.main import Base, engine
+    import db.models  # noqa: F401
+
+    Base.metadata.create_all(engine)
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(url)
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API did not start")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark API client throughput")
+    parser.add_argument("--url", default=os.getenv("API_URL", "http://localhost:8000"))
+    parser.add_argument("--serve", action="store_true", help="Start a local API instance first")
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--endpoint", choices=["users", "root"], default="users")
+    parser.add_argument("--http2", action="store_true")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if args.serve:
+        process, url = serve()
+
+    try:
+        # Warm up the server (and create the user row) before timing
+        await run_pooled(url, 10, 1, "users", args.http2)
+
+        before = await run_requests(url, args.requests, args.concurrency, args.endpoint)
+        after = await run_pooled(url, args.requests, args.concurrency, args.endpoint, args.http2)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{args.requests} requests to {args.endpoint}, concurrency {args.concurrency}, {url}")
+    print(f"requests, per-call conn: {args.requests / before:8.1f} req/s ({before:.2f}s)")
+    print(f"pooled ApiClient:       {args.requests / after:8.1f} req/s ({after:.2f}s)")
+    print(f"speedup:                {before / after:8.2f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,281 @@
+"""
+Load-test the ingest pipeline end to end, offline.
+
+Replays a message stream through SimpleDiscordBot (work queue, workers,
+handle_message, prefilter, analyzer, API writes) against the OpenAI stub
+and the FastAPI app, both served in-process, and reports:
+
+- throughput in messages per second
+- p50/p90/p99 latency from enqueue until handle_message returns
+- SQL statements executed per message, counted on the API's engines
+- LLM requests per message and prefilter skips
+
+The stream is synthetic by default (a mix of chit-chat and protocol talk),
+or recorded: --replay reads an NDJSON export from GET /messages/export.
+Bot settings come from the usual environment variables, so variants can be
+compared directly:
+
+    python scripts/bench_ingest.py -n 5000 --latency 0.3
+    SENTIMENT_BATCH_SIZE=8 BOT_WORKERS=16 python scripts/bench_ingest.py -n 5000 --latency 0.3
+
+The database defaults to a fresh SQLite file; pass --database-url to run
+against a throwaway PostgreSQL database instead. To guard against
+regressions, save a run with --json and compare later runs with
+--baseline; the script exits with status 1 when throughput, p99 latency
+or DB calls per message get worse by more than --tolerance.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+NOISE = [
+    "gm everyone, hope you all slept well",
+    "lol that meme is too good",
+    "anyone watching the game tonight?",
+    "thanks for the help earlier, really appreciate it",
+    "good morning fam, coffee first",
+    "haha same here, long week",
+    "welcome to the server, glad you're here!",
+    "brb grabbing lunch",
+]
+SIGNAL = [
+    "Morpho vaults on Celo are paying {n}% apy right now",
+    "Ubeswap liquidity dropped {n}% overnight, bearish",
+    "Mento governance proposal {n} passed, cUSD reserve looks healthy",
+    "Moola TVL just crossed ${n}m, bullish",
+    "Aave on Celo might list cEUR as collateral soon",
+    "$CELO staking rewards went up to {n}%",
+    "the Uniswap pool for CELO/USDC has {n}k volume today",
+    "Curve gauge vote for cUSD ends in {n} days",
+]
+
+def synthetic_stream(count: int, users: int, channels: int, noise_ratio: float, seed: int):
+    """(content, user, channel) tuples with a reproducible mix of noise and signal"""
+    rng = random.Random(seed)
+    for i in range(count):
+        if rng.random() < noise_ratio:
+            content = rng.choice(NOISE)
+        else:
+            content = rng.choice(SIGNAL).format(n=rng.randint(1, 500))
+        # Unique suffix so the sentiment cache doesn't turn the run into cache hits
+        yield f"{content} #{i}", rng.randrange(users), rng.randrange(channels)
+
+def recorded_stream(path: str):
+    """(content, user, channel) tuples from an NDJSON message export"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield row["content"], row.get("user_id") or 0, row.get("channel_id") or 0
+
+def fake_message(message_id: int, content: str, user: int, channel: int):
+    """Object with the attributes the bot reads from a discord.Message"""
+    return SimpleNamespace(
+        id=message_id,
+        content=content,
+        created_at=datetime.now(timezone.utc),
+        author=SimpleNamespace(id=10_000 + user, name=f"bench-user-{user}", bot=False),
+        channel=SimpleNamespace(id=20_000 + channel, name=f"bench-channel-{channel}"),
+    )
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def count_statements(engines) -> dict:
+    """Count SQL statements executed on the given engines"""
+    from sqlalchemy import event
+
+    counter = {"statements": 0}
+
+    def on_execute(*args):
+        counter["statements"] += 1
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", on_execute)
+    return counter
+
+async def run(args) -> dict:
+    import httpx
+    from openai import AsyncOpenAI
+
+    import openai_stub
+    from app.agents.main import SimpleDiscordBot
+    from app.main import app
+    from db.main import Base, async_engine, engine
+    import db.models  # noqa: F401
+
+    Base.metadata.create_all(engine)
+    statements = count_statements([engine] + ([async_engine.sync_engine] if async_engine is not None else []))
+
+    openai_stub.settings.latency = args.latency
+    openai_stub.settings.jitter = args.jitter
+    openai_stub.settings.error_rate = args.error_rate
+
+    bot = SimpleDiscordBot("bench")
+    bot.api.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api")
+    analyzer = bot.sentiment_analyzer
+    analyzer.client = AsyncOpenAI(
+        api_key="bench",
+        base_url="http://openai/v1",
+        max_retries=0,
+        timeout=analyzer.timeout,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=openai_stub.app)),
+    )
+
+    if args.replay:
+        stream = list(recorded_stream(args.replay))[:args.messages or None]
+    else:
+        stream = list(synthetic_stream(args.messages, args.users, args.channels, args.noise_ratio, args.seed))
+    # Ids unique per run so repeated runs on one database never hit the duplicate path
+    id_base = time.time_ns() // 1000 * 1000
+    messages = [fake_message(id_base + i, *item) for i, item in enumerate(stream)]
+
+    started = {}
+    latencies = []
+    handle_message = bot.handle_message
+
+    async def timed_handle_message(message):
+        try:
+            return await handle_message(message)
+        finally:
+            latencies.append(time.perf_counter() - started[message.id])
+
+    bot.handle_message = timed_handle_message
+    await bot.start_workers()
+    statements["statements"] = 0
+
+    interval = 1 / args.rate if args.rate else 0
+    start = time.perf_counter()
+    # handle_message prints every message; keep the terminal readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message in messages:
+            started[message.id] = time.perf_counter()
+            await bot.enqueue_message(message)
+            if interval:
+                await asyncio.sleep(max(0.0, start + interval * len(started) - time.perf_counter()))
+        await bot.queue.join()
+        # Messages deferred to the outbox while the queue was full come back through the flusher
+        while bot.outbox is not None and bot.outbox.pending():
+            await asyncio.sleep(0.05)
+            await bot.queue.join()
+    elapsed = time.perf_counter() - start
+    db_statements = statements["statements"]
+
+    queue_stats = bot.queue_stats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await bot.close()
+
+    handled = queue_stats["processed"] + queue_stats["failed"]
+    return {
+        "messages": len(messages),
+        "processed": queue_stats["processed"],
+        "failed": queue_stats["failed"],
+        "dropped": queue_stats["dropped"],
+        "deferred": queue_stats["deferred"],
+        "seconds": elapsed,
+        "messages_per_second": handled / elapsed if elapsed else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p90_ms": percentile(latencies, 0.90) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "db_statements_per_message": db_statements / handled if handled else 0.0,
+        "llm_requests_per_message": queue_stats["openai"]["requests"] / handled if handled else 0.0,
+        "llm_retries": queue_stats["openai"]["retries"],
+        "prefilter_skipped": queue_stats["prefilter"]["skipped"] if queue_stats["prefilter"] else 0,
+        "settings": {
+            "workers": bot.worker_count,
+            "sentiment_batch_size": bot.sentiment_batcher.max_size if bot.sentiment_batcher else 1,
+            "bulk_writes": bot.write_batcher is not None,
+            "prefilter": bot.prefilter is not None,
+            "database": engine.dialect.name,
+            "stub_latency": args.latency,
+            "stub_error_rate": args.error_rate,
+        },
+    }
+
+def report(results: dict):
+    print(f"{results['messages']} messages, settings {results['settings']}")
+    print(f"processed {results['processed']}, failed {results['failed']}, dropped {results['dropped']}, "
+          f"deferred to outbox {results['deferred']} "
+          f"in {results['seconds']:.2f}s")
+    print(f"throughput:          {results['messages_per_second']:10.1f} msg/s")
+    print(f"latency p50/p90/p99: {results['latency_p50_ms']:10.1f} / {results['latency_p90_ms']:.1f} / "
+          f"{results['latency_p99_ms']:.1f} ms")
+    print(f"DB statements/msg:   {results['db_statements_per_message']:10.2f}")
+    print(f"LLM requests/msg:    {results['llm_requests_per_message']:10.2f} "
+          f"({results['llm_retries']} retries, {results['prefilter_skipped']} skipped by prefilter)")
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    checks = [
+        ("messages_per_second", -1),
+        ("latency_p99_ms", 1),
+        ("db_statements_per_message", 1),
+    ]
+    worse = []
+    for metric, direction in checks:
+        before, after = baseline[metric], results[metric]
+        if before and direction * (after - before) / before > tolerance:
+            worse.append(f"{metric}: {before:.2f} -> {after:.2f}")
+    return worse
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Discord ingest pipeline offline")
+    parser.add_argument("-n", "--messages", type=int, default=2000)
+    parser.add_argument("--replay", help="NDJSON export to replay instead of synthetic messages")
+    parser.add_argument("--rate", type=float, default=0, help="Arrival rate in msg/s (0: as fast as possible)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--noise-ratio", type=float, default=0.6, help="Share of chit-chat in the synthetic stream")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.2, help="OpenAI stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Extra random stub latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests answered with 429")
+    parser.add_argument("--database-url", help="Throwaway database (default: a new SQLite file)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    # Configure everything that is read at import time before importing the app
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench_ingest.db"
+    os.environ.setdefault("BOT_OUTBOX_PATH", f"{workdir}/outbox.db")
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("SENTIMENT_CACHE_PATH", "")
+    os.environ.setdefault("RESPONSE_CACHE_REDIS_URL", "")
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    results = asyncio.run(run(args))
+    report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = regressions(results, json.load(f), args.tolerance)
+        if worse:
+            print("Regressions against baseline:\n  " + "\n  ".join(worse))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
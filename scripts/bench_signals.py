@@ -0,0 +1,80 @@
+"""
+Time the protocol signal engine (app/signals.py) on synthetic history.
+
+Fills a SignalStore with N scored messages spread over the lookback
+window and reports the cost of the initial bulk append, of an incremental
+refresh-sized append, and of computing and ranking the signals of every
+protocol, the work GET /signals/protocols does per cache miss:
+
+    python scripts/bench_signals.py --rows 5000000 --protocols 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.signals import SignalStore, rank_signals
+
+def synthetic_rows(count: int, protocols: int, days: float, now: float, seed: int, first_id: int = 1) -> list:
+    rng = np.random.default_rng(seed)
+    names = [f"protocol-{i}" for i in range(protocols)]
+    # Skewed like real chatter: a few protocols get most of the messages
+    codes = np.minimum(rng.zipf(1.3, count) - 1, protocols - 1)
+    timestamps = now - rng.uniform(0, days * 86400, count)
+    sentiment = np.clip(rng.normal(0.1, 0.5, count), -1, 1)
+    confidence = rng.uniform(0.2, 1.0, count)
+    consensus = rng.uniform(0.0, 1.0, count)
+    return [
+        (first_id + i, names[code], ts, s, c, cc, ts)
+        for i, (code, ts, s, c, cc) in enumerate(
+            zip(codes.tolist(), timestamps.tolist(), sentiment.tolist(), confidence.tolist(), consensus.tolist())
+        )
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized protocol signals")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--protocols", type=int, default=100)
+    parser.add_argument("--days", type=float, default=90)
+    parser.add_argument("--new-rows", type=int, default=1000, help="Rows per incremental refresh")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    now = time.time()
+    rows = synthetic_rows(args.rows, args.protocols, args.days, now, args.seed)
+    store = SignalStore(lookback_days=args.days)
+
+    start = time.perf_counter()
+    store.append(rows)
+    print(f"initial append of {len(store):,} rows: {time.perf_counter() - start:.3f}s")
+
+    new_rows = synthetic_rows(args.new_rows, args.protocols, 0.01, now, args.seed + 1, first_id=args.rows + 1)
+    start = time.perf_counter()
+    store.append(new_rows)
+    store.prune(now)
+    print(f"incremental append of {len(new_rows):,} rows: {time.perf_counter() - start:.3f}s")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        ranked = rank_signals(store.protocols, store.compute(now=now), min_messages=3, limit=50)
+        timings.append(time.perf_counter() - start)
+    print(
+        f"compute + rank over {len(store):,} rows, {len(store.protocols)} protocols: "
+        f"median {statistics.median(timings):.3f}s, max {max(timings):.3f}s"
+    )
+    for row in ranked[:5]:
+        print(
+            f"  {row['rank']:>2}. {row['protocol']:<14} signal {row['signal']:+.3f}  "
+            f"momentum {row['momentum']:+.3f}  messages {row['message_count']:,}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Minimal stand-in for the OpenAI chat completions API.
+
+Serves POST /v1/chat/completions with deterministic structured-output
+answers for TextInformation and TextInformationBatch, including the
+x-ratelimit-* headers the async analyzer paces itself with. Latency, error
+rate and the advertised limits are configurable so the analyzer's retry and
+rate-limit handling can be exercised locally:
+
+    python scripts/openai_stub.py --port 8100 --latency 0.2 --error-rate 0.1
+    OPENAI_BASE_URL=http://localhost:8100/v1 python -m app.agents.main
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+KNOWN_PROTOCOLS = ["Celo", "Mento", "Ubeswap", "Moola", "Morpho", "Uniswap", "Aave", "Curve"]
+
+class StubSettings:
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    requests_per_minute = 10000
+    tokens_per_minute = 2000000
+
+settings = StubSettings()
+app = FastAPI(title="OpenAI stub")
+
+def fake_analysis(text: str) -> dict:
+    """Deterministic TextInformation-shaped answer derived from the text"""
+    digest = int(hashlib.sha256(text.encode()).hexdigest(), 16)
+    protocol = next((p for p in KNOWN_PROTOCOLS if p.lower() in text.lower()), None)
+    return {
+        "protocol_name": protocol,
+        "sentiment_score": round((digest % 2001) / 1000 - 1, 3),
+        "confidence": round((digest >> 12) % 101 / 100, 2),
+        "technical_indicators": None,
+        "risk_assessment": "stub",
+        "community_consensus": round((digest >> 24) % 101 / 100, 2),
+    }
+
+def rate_limit_headers() -> dict:
+    return {
+        "x-ratelimit-limit-requests": str(settings.requests_per_minute),
+        "x-ratelimit-remaining-requests": str(settings.requests_per_minute - 1),
+        "x-ratelimit-reset-requests": "6ms",
+        "x-ratelimit-limit-tokens": str(settings.tokens_per_minute),
+        "x-ratelimit-remaining-tokens": str(settings.tokens_per_minute - 1000),
+        "x-ratelimit-reset-tokens": "30ms",
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    delay = settings.latency + random.uniform(0, settings.jitter)
+    if delay:
+        await asyncio.sleep(delay)
+
+    if random.random() < settings.error_rate:
+        headers = rate_limit_headers()
+        headers["x-ratelimit-remaining-requests"] = "0"
+        headers["retry-after"] = "0.1"
+        return JSONResponse(
+            status_code=429,
+            headers=headers,
+            content={"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+
+    user_content = next((m["content"] for m in body["messages"] if m["role"] == "user"), "")
+    schema = body.get("response_format", {}).get("json_schema", {}).get("schema", {})
+    if "items" in schema.get("properties", {}):
+        batch = json.loads(user_content)
+        answer = {"items": [{"index": m["index"], **fake_analysis(m["text"])} for m in batch]}
+    else:
+        answer = fake_analysis(user_content)
+
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+    content = json.dumps(answer)
+    return JSONResponse(
+        headers=rate_limit_headers(),
+        content={
+            "id": f"chatcmpl-stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        },
+    )
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenAI API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=10000, help="Advertised requests per minute")
+    parser.add_argument("--tpm", type=int, default=2000000, help="Advertised tokens per minute")
+    args = parser.parse_args()
+
+    settings.latency = args.latency
+    settings.jitter = args.jitter
+    settings.error_rate = args.error_rate
+    settings.requests_per_minute = args.rpm
+    settings.tokens_per_minute = args.tpm
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()